@@ -4,11 +4,11 @@ import pandas as pd
 import numpy as np
 import argparse
 import json
-import math
 import re
 import os
 import sys
 import csv
+import io
 import socket # -- ip checks
 
 import seaborn as sns
@@ -16,6 +16,12 @@ import matplotlib.pyplot as plt
 
 from jinja2 import Environment, PackageLoader
 
+# -- valid ip address: four dot separated integers in [0, 256) --
+IP_OCTET = r'0*(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])'
+IP_REGEX = re.compile(r'^' + IP_OCTET + r'(?:\.' + IP_OCTET + r'){3}$')
+EMAIL_REGEX = re.compile(r'\w+\@\w+')
+EMAIL_DOMAIN_REGEX = re.compile(r'@([^@]*)')
+
 # --- functions ---
 def get_config(config):
     """ convert json config file into a python dict  """
@@ -24,30 +30,147 @@ def get_config(config):
     return config_dict
 
 # -- load data --
-def get_dataframe(config):
-    """ load csv into python dataframe """
-    df = pd.read_csv(config['input_file'], low_memory=False)
-    return df
+def read_chunks(config):
+    """ reads the csv as text, in chunks of config['chunksize'] rows when given, else as one dataframe """
+    chunksize = config.get('chunksize')
+    if not chunksize:
+        return [pd.read_csv(config['input_file'], dtype=str)]
+    return pd.read_csv(config['input_file'], dtype=str, chunksize=chunksize)
+
+def summarize(config, chunks):
+    """ profiles the csv in a single pass over its chunks of text: only the row count, the hashes of the distinct
+        rows, the memory size and a tally of the distinct values of every column are kept, and merged chunk by
+        chunk, so that no more than one chunk of rows is held in memory. the distinct values of each column are then
+        parsed the way pd.read_csv parses the whole column, duplicates are counted on the text of the rows
+    """
+    target = config['required_features']['EVENT_LABEL']
+    rows = 0
+    row_hashes = []
+    text_memory = {}
+    tallies = {}
+    for chunk in chunks:
+        rows += len(chunk)
+        row_hashes.append(np.unique(pd.util.hash_pandas_object(chunk, index=False).to_numpy()))
+        # -- the labels of the rows are the positions of their values in the tally of the target --
+        tallies[target], labels = tally_values(tallies.get(target), chunk[target])
+        n_labels = len(tallies[target]['hashes'])
+        for column in chunk.columns:
+            text_memory[column] = text_memory.get(column, 0) + chunk[column].memory_usage(index=False)
+            if column == target:
+                values = labels
+            else:
+                tallies[column], values = tally_values(tallies.get(column), chunk[column])
+            tally_labels(tallies[column], values, labels, n_labels)
+
+    label_values = parse_values(tallies[target]['texts'])
+    counts = {}
+    dtypes = {}
+    # -- in the order of the columns of the csv --
+    for column in list(text_memory):
+        tally = tallies.pop(column)
+        values = label_values if column == target else parse_values(tally['texts'])
+        value_codes, label_codes = np.nonzero(tally['counts'])
+        index = pd.MultiIndex.from_arrays([values.take(value_codes), label_values.take(label_codes)],
+                                          names=['value', 'label'])
+        counts[column] = pd.Series(tally['counts'][value_codes, label_codes], index=index)
+        if not (values.is_unique and label_values.is_unique):
+            # -- values with different texts, e.g. 5 and 5.0, can parse alike --
+            counts[column] = counts[column].groupby(level=['value', 'label'], sort=False, dropna=False).sum()
+        dtypes[column] = values.dtype
+
+    dtypes = pd.Series(dtypes, dtype=object)
+    memory_size = sum(text_memory[column] if dtype.kind == 'O' else rows*dtype.itemsize
+                      for column, dtype in dtypes.items())
+    return {
+        "rows"        : rows,
+        "memory_size" : memory_size + pd.RangeIndex(rows).memory_usage(),
+        "duplicates"  : rows - (len(np.unique(np.concatenate(row_hashes))) if row_hashes else 0),
+        "dtypes"      : dtypes,
+        "counts"      : counts,
+    }
+
+def tally_values(tally, column):
+    """ adds the distinct values of a chunk column, missing values included, to the tally of the previous chunks:
+        the 64 bit hashes of the distinct values in order of first appearance, to look them up, and their texts
+        written as csv, to parse them at the end. returns the tally with the position of each row's value in it
+    """
+    if tally is None:
+        tally = {'hashes': pd.Index([], dtype='uint64'), 'texts': io.BytesIO(),
+                 'counts': np.zeros((0, 0), dtype='int64')}
+        tally['texts'].write(b'value\n')
+    codes, values = pd.factorize(column, sort=False, use_na_sentinel=False)
+    hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+    positions = tally['hashes'].get_indexer(hashes)
+    new = positions == -1
+    if new.any():
+        positions[new] = len(tally['hashes']) + np.arange(new.sum())
+        tally['hashes'] = tally['hashes'].append(pd.Index(hashes[new]))
+        pd.DataFrame({'value': values[new]}).to_csv(tally['texts'], index=False, header=False)
+    return tally, positions[codes]
+
+def tally_labels(tally, values, labels, n_labels):
+    """ adds the rows of a chunk to the count of rows of each (value, label) pair of a column's tally, a matrix of
+        its values by labels
+    """
+    counts = tally['counts']
+    counts = np.pad(counts, [(0, len(tally['hashes']) - counts.shape[0]), (0, n_labels - counts.shape[1])])
+    counts += np.bincount(values*n_labels + labels, minlength=counts.size).reshape(counts.shape)
+    tally['counts'] = counts
+
+def parse_values(texts):
+    """ parses the distinct values of a column written as csv, missing values included, the way pd.read_csv parses
+        the whole column: returns them parsed in the same order, with the dtype of the column
+    """
+    texts.seek(0)
+    return pd.Index(pd.read_csv(texts, low_memory=False)['value'])
+
+def present(counts):
+    """ the counts of the (value, label) pairs whose value is not missing """
+    return counts[counts.index.get_level_values('value').notna()]
+
+def get_crosstab(counts, values, name, target, labels=None):
+    """ pd.crosstab(values, labels) of the rows counted by counts, where values holds the value of each counted
+        (value, label) pair, e.g. its domain. labels, when given, are the columns of the crosstab
+    """
+    ctab = counts.groupby([pd.Index(values, name=name), counts.index.get_level_values('label').rename(target)],
+                          sort=False, observed=True).sum().unstack(fill_value=0)
+    if labels is not None:
+        ctab = ctab.reindex(columns=labels, fill_value=0)
+    return sort_crosstab(ctab)
+
+def get_event_timestamp(config, summary):
+    """ parses the event timestamp of each counted (value, label) pair, returns None when it can't be parsed """
+    counts = summary['counts'][config['required_features']['EVENT_TIMESTAMP']]
+    try:
+        return pd.to_datetime(pd.Series(counts.index.get_level_values('value')))
+    except:
+        return None
+
+def get_label_summary(config, summary):
+    """ counts of each label value, computed once and shared by all the checks """
+    label = config['required_features']['EVENT_LABEL']
+    counts = summary['counts'][label].groupby(level='label', sort=False).sum()
+    return counts.sort_values(ascending=False, kind='stable').rename_axis(label).rename('count')
 
 # -- 
-def get_overview(config, df):
+def get_overview(config, summary, event_timestamp=None):
     """ return details of the dataframe and any issues found  """
     overview_msg = {}
-    df = df.copy()
-    column_cnt = len(df.columns)
+    column_cnt = len(summary['dtypes'])
+    if event_timestamp is None:
+        event_timestamp = get_event_timestamp(config, summary)
     try:
-        df['EVENT_TIMESTAMP'] = pd.to_datetime(df[config['required_features']['EVENT_TIMESTAMP']], infer_datetime_format=True)
-        date_range = df['EVENT_TIMESTAMP'].min().strftime('%Y-%m-%d') + ' to ' + df['EVENT_TIMESTAMP'].max().strftime('%Y-%m-%d')
-        day_cnt = (df['EVENT_TIMESTAMP'].max() - df['EVENT_TIMESTAMP'].min()).days 
+        date_range = event_timestamp.min().strftime('%Y-%m-%d') + ' to ' + event_timestamp.max().strftime('%Y-%m-%d')
+        day_cnt = (event_timestamp.max() - event_timestamp.min()).days 
     except:
         overview_msg[config['required_features']['EVENT_TIMESTAMP']] = " Unable to convert" + config['required_features']['EVENT_TIMESTAMP'] + " to timestamp"
         date_range = ""
         day_cnt = 0 
        
-    record_cnt  = df.shape[0]
-    memory_size = df.memory_usage(index=True).sum()
+    record_cnt  = summary['rows']
+    memory_size = summary['memory_size']
     record_size = round(float(memory_size) / record_cnt,2)
-    n_dupe      = record_cnt - len(df.drop_duplicates())
+    n_dupe      = int(summary['duplicates'])
 
     if record_cnt <= 10000:
         overview_msg["Record count"] = "A minimum of 10,000 rows are required to train the model, your dataset contains " + str(record_cnt)
@@ -64,81 +187,77 @@ def get_overview(config, df):
         "overview_cnt"      : len(overview_msg)
     }
 
-    return df, overview_stats
+    return overview_stats
 
-def set_feature(row, config):
+def set_features(df_stats, config):
     """ sets the feature type of each variable in the file, identifies features with issues 
-        as well as the required features. this is the first pass of rules 
+        as well as the required features. this is the first pass of rules, later rules 
+        override earlier ones
     """
-    rulehit = 0
-    feature = ""
-    message = ""
     required_features = config['required_features']
+    dtype = df_stats['_dtype'].astype(str)
+    nunique = df_stats['nunique']
+    nunique_pct = df_stats['nunique_pct']
+    is_numeric = dtype.isin(['float64', 'int64'])
+    is_object = dtype == 'object'
+    
+    feature = pd.Series("", index=df_stats.index, dtype=object)
+    message = pd.Series("", index=df_stats.index, dtype=object)
+    unique_cnt_msg = "(" + nunique.map("{:,}".format).astype(str) + ") unique"
+    unique_pct_msg = "(" + (nunique_pct*100).map("{:.2f}".format).astype(str) + "%) unique"
+    null_pct_msg = "(" + (df_stats['null_pct']*100).map("{:.2f}".format).astype(str) + "%) missing "
     
     # -- assign numeric -- 
-    if ((row._dtype in ['float64', 'int64']) and (row['nunique'] > 1)):
-        feature = "numeric"
-        message = "(" + "{:,}".format(row['nunique']) + ") unique"
-        
+    rule = is_numeric & (nunique > 1)
+    feature[rule], message[rule] = "numeric", unique_cnt_msg[rule]
+    
     # -- assign categorical -- 
-    if ((row._dtype == 'object') and ( row.nunique_pct <= 0.75)):
-        feature = "categorical"
-        message = "(" + "{:.2f}".format(row.nunique_pct*100) + "%) unique"
-        
+    rule = is_object & (nunique_pct <= 0.75)
+    feature[rule], message[rule] = "categorical", unique_pct_msg[rule]
+    
     # -- assign categorical to numerics  -- 
-    if ((row._dtype in ['float64', 'int64']) and ( row['nunique'] <= 1024 )):
-        feature = "categorical"
-        message = "(" + "{:,}".format(row['nunique']) + ") unique"
+    rule = is_numeric & (nunique <= 1024)
+    feature[rule], message[rule] = "categorical", unique_cnt_msg[rule]
     
-     # -- assign binary -- 
-    if (row['nunique'] == 2 ):
-        feature = "categorical"
-        message = "(" + "{:}".format(row['nunique']) + ") binary"
+    # -- assign binary -- 
+    rule = nunique == 2
+    feature[rule], message[rule] = "categorical", "(2) binary"
     
     # -- single value --
-    if (row['nunique'] == 1):
-        rulehit = 1
-        feature = "exclude"
-        message = "(" + "{:}".format(row['nunique']) + ") single value"
+    rulehit = nunique == 1
+    feature[rulehit], message[rulehit] = "exclude", "(1) single value"
     
     # -- null pct --   
-    if (row.null_pct >= 0.50 and (rulehit == 0)):
-        rulehit = 1
-        feature = "exclude"
-        message =  "(" + "{:.2f}".format(row.null_pct*100) + "%) missing "
-
+    rule = (df_stats['null_pct'] >= 0.50) & ~rulehit
+    feature[rule], message[rule] = "exclude", null_pct_msg[rule]
+    rulehit = rulehit | rule
+    
     # -- categorical w. high % unique 
-    if ((row._dtype == 'object') and ( row.nunique_pct >= 0.75)) and (rulehit == 0):
-        rulehit = 1
-        feature = "exclude"
-        message = "(" + "{:.2f}".format(row.nunique_pct*100) + "%) unique"
-    
-     # -- numeric w. extreeme % unique 
-    if ((row._dtype in ['float64', 'int64']) and ( row.nunique_pct >= 0.95)) and (rulehit == 0):
-        rulehit = 1
-        feature = "exclude"
-        message = "(" + "{:.2f}".format(row.nunique_pct*100) + "%) unique"
-    
-    if row._column == required_features['EMAIL_ADDRESS']:
-        feature = "EMAIL_ADDRESS"
-    if row._column == required_features['IP_ADDRESS']:
-        feature = "IP_ADDRESS"
-    if row._column == required_features['EVENT_TIMESTAMP']:
-        feature = "EVENT_TIMESTAMP"
-    if row._column == required_features['EVENT_LABEL']:
-        feature = "EVENT_LABEL"
+    rule = is_object & (nunique_pct >= 0.75) & ~rulehit
+    feature[rule], message[rule] = "exclude", unique_pct_msg[rule]
+    rulehit = rulehit | rule
+    
+    # -- numeric w. extreeme % unique 
+    rule = is_numeric & (nunique_pct >= 0.95) & ~rulehit
+    feature[rule], message[rule] = "exclude", unique_pct_msg[rule]
+    
+    for required in ['EMAIL_ADDRESS', 'IP_ADDRESS', 'EVENT_TIMESTAMP', 'EVENT_LABEL']:
+        feature[df_stats['_column'] == required_features[required]] = required
         
     return feature, message
 
-def get_label(config, df):
+def get_label(config, summary, label_summary=None):
     """ returns stats on the label and performs intial label checks  """
     message = {}
     label = config['required_features']['EVENT_LABEL']
-    label_summary = df[label].value_counts()
-    rowcnt = df.shape[0]
+    if label_summary is None:
+        label_summary = get_label_summary(config, summary)
+    rowcnt = summary['rows']
+    values = summary['counts'][label].index.get_level_values('value')
+    null_count = summary['counts'][label][values.isna()].sum()
     label_dict = {
         "label_field"  : label,
-        "label_values" : df[label].unique(),
+        "label_values" : values.unique().to_numpy(),
         "label_dtype"  : label_summary.dtype,
         "fraud_rate"   : "{:.2f}".format((label_summary.min()/label_summary.sum())*100),
         "fraud_label": str(label_summary.idxmin()),
@@ -146,8 +265,8 @@ def get_label(config, df):
         "legit_rate" : "{:.2f}".format((label_summary.max()/label_summary.sum())*100),
         "legit_count": label_summary.max(),
         "legit_label": str(label_summary.idxmax()),
-        "null_count" : "{:,}".format(df[label].isnull().sum(axis = 0)),
-        "null_rate"  : "{:.2f}".format(df[label].isnull().sum(axis = 0)/rowcnt),
+        "null_count" : "{:,}".format(null_count),
+        "null_rate"  : "{:.2f}".format(null_count/rowcnt),
     }
     
     """
@@ -156,94 +275,93 @@ def get_label(config, df):
     if label_dict['fraud_count'] <= 500:
         message['fraud_count'] = "Fraud count " + label_dict['fraud_count'] + " is less than 500\n"
     
-    if df[label].isnull().sum(axis = 0)/rowcnt >= 0.01:
+    if null_count/rowcnt >= 0.01:
         message['label_nulls'] =   "Your LABEL column contains  " + label_dict["null_count"] +" a significant number of null values"
     
     label_dict['warnings'] = len(message)
     
     return label_dict, message
 
-def get_partition(config, df):
+def get_partition(config, summary, label_summary=None, event_timestamp=None):
     """ evaluates your dataset partitions and checks the distribution of fraud lables """
    
-    df = df.copy()
-    row_count = df.shape[0]
     required_features = config['required_features']
     message = {}
     stats ={}
-    try:
-        df['_event_timestamp'] = pd.to_datetime(df[required_features['EVENT_TIMESTAMP']])
-        df['_dt'] = pd.to_datetime(df['_event_timestamp'].dt.date)
-    except:
+    counts = summary['counts'][required_features['EVENT_TIMESTAMP']]
+    if event_timestamp is None:
+        event_timestamp = get_event_timestamp(config, summary)
+    if event_timestamp is not None:
+        dt = event_timestamp.dt.normalize()
+    else:
         message['_event_timestamp'] = "could not parse " + required_features['EVENT_TIMESTAMP'] + " into a date or timestamp object"
-        df['_event_timestamp'] = df[required_features['EVENT_TIMESTAMP']]
-        df['_dt'] = df['_event_timestamp']
+        dt = pd.Series(counts.index.get_level_values('value'))
     
-    label_summary = df[required_features['EVENT_LABEL']].value_counts()
+    if label_summary is None:
+        label_summary = get_label_summary(config, summary)
      
     legit_label = label_summary.idxmax()
     fraud_label = label_summary.idxmin()
     
-    df = df.sort_values(by=['_event_timestamp']).reset_index(drop=True)
-    ctab = pd.crosstab(df['_dt'].astype(str), df[required_features['EVENT_LABEL']]).reset_index()
+    ctab = get_crosstab(counts, dt.astype(str), '_dt', required_features['EVENT_LABEL']).reset_index()
     stats['labels'] = ctab['_dt'].tolist()
     stats['legit_rates'] = ctab[legit_label].tolist()
     stats['fraud_rates'] = ctab[fraud_label].tolist()
     
-    # -- set partitions -- 
-    df['partition'] = 'training'
-    df.loc[math.ceil(row_count*.7):math.ceil(row_count*.85),'partition'] = 'evaluation'
-    df.loc[math.ceil(row_count*.85):,'partition'] = 'testing'
-    
     message = ""
     
     return stats, message 
 
-def get_stats(config, df):
+def get_stats(config, summary):
     """ generates the key column analysis statistics calls set_features function """
-    df = df.copy()
-    rowcnt = len(df)
-    df_s1  = df.agg(['count', 'nunique',]).transpose().reset_index().rename(columns={"index":"_column"})
+    rowcnt = summary['rows']
+    column_stats = []
+    for column, counts in summary['counts'].items():
+        counts = present(counts)
+        column_stats.append((column, counts.sum(), counts.index.get_level_values('value').nunique()))
+    df_s1  = pd.DataFrame(column_stats, columns=['_column', 'count', 'nunique'])
     df_s1['count'] = df_s1['count'].astype('int64')
     df_s1['nunique'] = df_s1['nunique'].astype('int64')
     df_s1["null"] = (rowcnt - df_s1["count"]).astype('int64')
     df_s1["not_null"] = rowcnt - df_s1["null"]
     df_s1["null_pct"] = df_s1["null"] / rowcnt
     df_s1["nunique_pct"] = df_s1['nunique'] / rowcnt
-    dt = pd.DataFrame(df.dtypes).reset_index().rename(columns={"index":"_column", 0:"_dtype"})
+    dt = pd.DataFrame(summary['dtypes']).reset_index().rename(columns={"index":"_column", 0:"_dtype"})
     df_stats = pd.merge(dt, df_s1, on='_column', how='inner')
     df_stats = df_stats.round(4)
-    df_stats[['_feature', '_message']] = df_stats.apply(lambda x: set_feature(x,config), axis = 1, result_type="expand")
+    df_stats['_feature'], df_stats['_message'] = set_features(df_stats, config)
     
     return df_stats, df_stats.loc[df_stats["_feature"]=="exclude"]
 
-def get_email(config, df):
+def get_email(config, summary, label_summary=None):
     """ gets the email statisitcs and performs email checks """
     message = {}
     required_features = config['required_features']
     email = required_features['EMAIL_ADDRESS']
-    email_recs = df.shape[0]
-    email_null = df[email].isna().sum()
-    emails = pd.Series(pd.unique(df[email].values))
-    email_unique  = len(emails)
-    email_valid = df[email].str.count('\w+\@\w+').sum()
+    counts = summary['counts'][email]
+    emails = pd.Series(counts.index.get_level_values('value'))
+    email_recs = summary['rows']
+    email_null = counts[emails.isna().to_numpy()].sum()
+    email_unique  = emails.nunique(dropna=False)
+    email_valid = int(counts[match_strings(emails, EMAIL_REGEX).to_numpy()].sum())
     email_invalid = email_recs - ( email_valid + email_null) 
 
-    df['domain'] = df[email].str.split('@').str[1]
-    top_10 = df['domain'].value_counts().head(10)
+    domain = emails.str.extract(EMAIL_DOMAIN_REGEX, expand=False)
+    top_10 = counts.groupby(domain.to_numpy(), sort=False).sum().sort_values(ascending=False, kind='stable').head(10)
     top_dict = top_10.to_dict()
     
-    label_summary = df[required_features['EVENT_LABEL']].value_counts()
+    if label_summary is None:
+        label_summary = get_label_summary(config, summary)
     fraud_label   = label_summary.idxmin()
     legit_label   = label_summary.idxmax()
     
-    ctab = pd.crosstab(df['domain'], df[required_features['EVENT_LABEL']],).reset_index()
+    ctab = get_crosstab(counts, domain, 'domain', required_features['EVENT_LABEL']).reset_index()
     ctab['tot'] = ctab[fraud_label] + ctab[legit_label]
     ctab['fraud_rate'] = ctab[fraud_label]/ctab['tot'] 
     ctab = ctab.sort_values(['tot'],ascending=False)
     top_n= ctab.head(10)
     
-    domain_count = df['domain'].nunique()
+    domain_count = domain.nunique()
     domain_list = top_n['domain'].tolist()
     domain_fraud = top_n[fraud_label].tolist()
     domain_legit = top_n[legit_label].tolist()
@@ -252,11 +370,11 @@ def get_email(config, df):
     if email_unique <= 100: 
         message['unique_count'] = "Low number of unique emails: " + str(email_unique)
         
-    if email_null/len(df) >= 0.20:
-        message['null_email'] = "High percentage of null emails: " + '{0: >#016.2f}'.format(email_null/len(df)) + "%"
+    if email_null/email_recs >= 0.20:
+        message['null_email'] = "High percentage of null emails: " + '{0: >#016.2f}'.format(email_null/email_recs) + "%"
         
-    if email_invalid/len(df) >= 0.5:
-        message['invalid_email'] = "High number of invalid emails: " + '{0: >#016.2f}'.format(email_invalid/len(df)) + "%"
+    if email_invalid/email_recs >= 0.5:
+        message['invalid_email'] = "High number of invalid emails: " + '{0: >#016.2f}'.format(email_invalid/email_recs) + "%"
     
     domain_list = list(top_dict.keys())
     #domain_value = list(top_dict.values())
@@ -278,34 +396,39 @@ def get_email(config, df):
     }
     
     return email_dict, message
+def match_strings(values, regex):
+    """ True for the string values that contain a match of the compiled regex, False for anything else """
+    if not pd.api.types.is_string_dtype(values.dtype):
+        return pd.Series(False, index=values.index)
+    return values.str.contains(regex, na=False).astype(bool)
+
 def valid_ip(ip):
     """ checks to insure we have a valid ip address """
-    try:
-        parts = ip.split('.')
-        return len(parts) == 4 and all(0 <= int(part) < 256 for part in parts)
-    except ValueError:
-        return False # one of the 'parts' not convertible to integer
-    except (AttributeError, TypeError):
-        return False # `ip` isn't even a string
+    return isinstance(ip, str) and IP_REGEX.match(ip) is not None
+
+def valid_ips(ips):
+    """ vectorized valid_ip over a column of ip addresses """
+    return match_strings(ips, IP_REGEX)
         
-def get_ip_address(config, df):
+def get_ip_address(config, summary, label_summary=None):
     """ gets ip address statisitcs and performs ip address checks """
     message = {}
     required_features = config['required_features']
     ip = required_features['IP_ADDRESS']
-    ip_recs = df.shape[0] - df[ip].isna().sum()
-    ip_null = df[ip].isna().sum()
-    ips = pd.Series(pd.unique(df[ip].values))
-    ip_unique  = len(ips)
-    df['_ip'] = df[ip].apply(valid_ip)
-    ip_valid = df['_ip'].sum()
+    counts = summary['counts'][ip]
+    ips = pd.Series(counts.index.get_level_values('value'))
+    rowcnt = summary['rows']
+    ip_null = counts[ips.isna().to_numpy()].sum()
+    ip_recs = rowcnt - ip_null
+    ip_unique  = ips.nunique(dropna=False)
+    ip_valid = int(counts[valid_ips(ips).to_numpy()].sum())
     ip_invalid = ip_recs - ip_valid
-    print(ip_null)
-    label_summary = df[required_features['EVENT_LABEL']].value_counts()
+    if label_summary is None:
+        label_summary = get_label_summary(config, summary)
     fraud_label   = label_summary.idxmin()
     legit_label   = label_summary.idxmax()
     
-    ctab = pd.crosstab(df[required_features['IP_ADDRESS']], df[required_features['EVENT_LABEL']],).reset_index()
+    ctab = get_crosstab(counts, ips, ip, required_features['EVENT_LABEL']).reset_index()
     
     ctab['tot'] = ctab[fraud_label] + ctab[legit_label]
     ctab['fraud_rate'] = ctab[fraud_label]/ctab['tot'] 
@@ -320,11 +443,11 @@ def get_ip_address(config, df):
     if ip_unique <= 100: 
         message['unique_count'] = "Low number of unique ip addresses: " + str(ip_unique)
         
-    if ip_null/len(df) >= 0.20:
-        message['null_ip'] = "High percentage of null ip addresses: " + '{0: >#016.2f}'.format(ip_null/len(df)) + "%"
+    if ip_null/rowcnt >= 0.20:
+        message['null_ip'] = "High percentage of null ip addresses: " + '{0: >#016.2f}'.format(ip_null/rowcnt) + "%"
         
-    if ip_invalid/len(df) >= 0.5:
-        message['invalid_ip'] = "High number of invalid ip addresses: " + '{0: >#016.2f}'.format(ip_invalid/len(df)) + "%"
+    if ip_invalid/rowcnt >= 0.5:
+        message['invalid_ip'] = "High number of invalid ip addresses: " + '{0: >#016.2f}'.format(ip_invalid/rowcnt) + "%"
     
     ip_dict = {
         "ip_addr"    : ip,
@@ -343,18 +466,27 @@ def get_ip_address(config, df):
     
     return ip_dict, message
 
-def col_stats(df, target, column):
-    """ generates column statisitcs for categorical columns """
-    legit = df[target].value_counts().idxmax()
-    fraud = df[target].value_counts().idxmin()
+def sort_crosstab(ctab):
+    """ sorts values and labels like pd.crosstab, values of mixed types that can't be compared keep their order """
+    for axis in [0, 1]:
+        try:
+            ctab = ctab.sort_index(axis=axis)
+        except TypeError:
+            pass
+    return ctab
+
+def col_stats(ctab, label_summary):
+    """ generates column statisitcs for categorical columns from their crosstab with the label """
+    legit = label_summary.idxmax()
+    fraud = label_summary.idxmin()
     try:
-        cat_summary = pd.crosstab(df[column],df[target]).reset_index().sort_values(fraud, ascending=False).reset_index(drop=True).head(10).rename(columns={legit:"legit", fraud:"fraud"})
+        cat_summary = ctab.reset_index().sort_values(fraud, ascending=False).reset_index(drop=True).head(10).rename(columns={legit:"legit", fraud:"fraud"})
         cat_summary['total'] = cat_summary['fraud'] + cat_summary['legit']
         cat_summary['fraud_pct'] = cat_summary['fraud']/(cat_summary['fraud']+ cat_summary['legit'])
         cat_summary['legit_pct'] = 1 - cat_summary['fraud_pct']
         cat_summary = cat_summary.sort_values('fraud_pct', ascending=False).round(4)
     except:
-        cat_summary = pd.crosstab(df[column],df[target]).reset_index().sort_values(legit, ascending=True).reset_index(drop=True).head(10).rename(columns={legit:"legit", fraud:"fraud"})
+        cat_summary = ctab.reset_index().sort_values(legit, ascending=True).reset_index(drop=True).head(10).rename(columns={legit:"legit", fraud:"fraud"})
         cat_summary['fraud'] = 0
         cat_summary['total'] = cat_summary['legit']
         cat_summary['fraud_pct'] = 0.0
@@ -362,58 +494,71 @@ def col_stats(df, target, column):
         cat_summary = cat_summary.sort_values('fraud_pct', ascending=False).round(4)
     return cat_summary  
     
-def get_categorical(config, df_stats, df):
+def get_categorical(config, df_stats, summary, label_summary=None):
     """ gets categorical feature stats: count, nunique, nulls  """
     required_features = config['required_features']
-    features = df_stats.loc[df_stats['_feature']=='categorical']._column.tolist()
     target = required_features['EVENT_LABEL']
-    df = df[features + [target]].copy()
-    rowcnt = len(df)
-    df_s1  = df.agg(['count', 'nunique',]).transpose().reset_index().rename(columns={"index":"_column"})
-    df_s1['count'] = df_s1['count'].astype('int64')
-    df_s1['nunique'] = df_s1['nunique'].astype('int64')
-    df_s1["null"] = (rowcnt - df_s1["count"]).astype('int64')
-    df_s1["not_null"] = rowcnt - df_s1["null"]
-    df_s1["null_pct"] = df_s1["null"] / rowcnt
-    df_s1["nunique_pct"] = df_s1['nunique'] / rowcnt
-    dt = pd.DataFrame(df.dtypes).reset_index().rename(columns={"index":"_column", 0:"_dtype"})
-    df_stats = pd.merge(dt, df_s1, on='_column', how='inner').round(4)
+    features = [column for column in df_stats.loc[df_stats['_feature']=='categorical']._column.tolist() if column != target]
+    if label_summary is None:
+        label_summary = get_label_summary(config, summary)
+    stat_columns = ['_column', '_dtype', 'count', 'nunique', 'null', 'not_null', 'null_pct', 'nunique_pct']
  
     cat_list = []
-    for rec in df_stats.to_dict('records'):
-        if rec['_column'] != target:
-            cat_summary = col_stats(df, target, rec['_column'])
-            rec['top_n'] = cat_summary[rec['_column']].tolist()
-            rec['top_n_count'] = cat_summary['total'].tolist()
-            rec['fraud_pct'] = cat_summary['fraud_pct'].tolist()
-            rec['legit_pct'] = cat_summary['legit_pct'].tolist()
-            rec['fraud_count'] = cat_summary['fraud'].tolist()
-            rec['legit_count'] = cat_summary['legit'].tolist()
-            cat_list.append(rec)
+    for rec in df_stats.loc[df_stats['_column'].isin(features), stat_columns].to_dict('records'):
+        counts = summary['counts'][rec['_column']]
+        ctab = get_crosstab(counts, counts.index.get_level_values('value'), rec['_column'], target, label_summary.index)
+        cat_summary = col_stats(ctab, label_summary)
+        rec['top_n'] = cat_summary[rec['_column']].tolist()
+        rec['top_n_count'] = cat_summary['total'].tolist()
+        rec['fraud_pct'] = cat_summary['fraud_pct'].tolist()
+        rec['legit_pct'] = cat_summary['legit_pct'].tolist()
+        rec['fraud_count'] = cat_summary['fraud'].tolist()
+        rec['legit_count'] = cat_summary['legit'].tolist()
+        cat_list.append(rec)
  
     return cat_list
 
-def ncol_stats(df, target, column):
-    """ calcuates numeric column statstiics """
-    df = df.copy()
-    n = df[column].nunique()
+def quantile_edges(values, counts, q):
+    """ the edges of pd.qcut(x, q) where x holds each of the values counts times: the quantiles of x at
+        np.linspace(0, 1, q + 1), interpolated between its sorted values like np.percentile does
+    """
+    order = np.argsort(values, kind='stable')
+    values = values[order]
+    ends = np.cumsum(counts[order])
+    n = ends[-1]
+    quantiles = np.linspace(0, 1, q + 1) * 100.0 / 100
+    positions = n * quantiles + (1 + quantiles * (1 - 1 - 1)) - 1
+    last = positions >= n - 1
+    previous = np.where(last, n - 1, np.floor(positions))
+    gamma = positions - previous
+    below = values[np.searchsorted(ends, previous, side='right')]
+    above = values[np.searchsorted(ends, np.where(last, n - 1, previous + 1), side='right')]
+    diff = above - below
+    return np.where(gamma >= 0.5, above - diff * (1 - gamma), below + diff * gamma)
+
+def ncol_stats(counts, target, label_summary):
+    """ calcuates numeric column statstiics from the counts of its (value, label) pairs """
+    counts = present(counts)
+    values = counts.index.get_level_values('value').to_numpy(dtype='float64')
+    n = len(np.unique(values))
     # -- rice rule -- 
     k = int(round(2*(n**(1/3)),0)) 
-    # -- bin that mofo -- 
+    # -- bin that mofo, like pd.qcut(x, q=k, duplicates='drop') -- 
     try:
-        df['bin'] = pd.qcut(df[column], q=k, duplicates='drop')
-        legit = df[target].value_counts().idxmax()
-        fraud = df[target].value_counts().idxmin()
+        bins = pd.cut(values, quantile_edges(values, counts.to_numpy(), k), include_lowest=True, precision=3, duplicates='drop')
+        n_bins = pd.Series(bins).nunique()
+        legit = label_summary.idxmax()
+        fraud = label_summary.idxmin()
         try:
-            num_summary = pd.crosstab(df['bin'],df[target]).reset_index().rename(columns={legit:"legit", fraud:"fraud"})
+            num_summary = get_crosstab(counts, bins, 'bin', target).reset_index().rename(columns={legit:"legit", fraud:"fraud"})
             num_summary['total'] = num_summary['fraud'] + num_summary['legit']
-            num_summary['empty_label'] = [""] * df['bin'].nunique()
+            num_summary['empty_label'] = [""] * n_bins
             num_summary['bin_label'] = num_summary['bin'].astype(str)
         except:
-            num_summary = pd.crosstab(df['bin'],df[target]).reset_index().rename(columns={legit:"legit", fraud:"fraud"})
+            num_summary = get_crosstab(counts, bins, 'bin', target).reset_index().rename(columns={legit:"legit", fraud:"fraud"})
             num_summary['fraud'] = 0
             num_summary['total'] = num_summary['legit']
-            num_summary['empty_label'] = [""] * df['bin'].nunique()
+            num_summary['empty_label'] = [""] * n_bins
             num_summary['bin_label'] = num_summary['bin'].astype(str)
     except:
         num_summary = pd.DataFrame()
@@ -425,27 +570,35 @@ def ncol_stats(df, target, column):
 
     return num_summary  
     
-def get_numerics( config, df_stats, df):
+def get_numerics( config, df_stats, summary, label_summary=None):
     """ gets numeric feature descriptive statsitics and graph detalis """
     required_features = config['required_features']
-    features = df_stats.loc[df_stats['_feature']=='numeric']._column.tolist()
     target = required_features['EVENT_LABEL']
+    features = [column for column in df_stats.loc[df_stats['_feature']=='numeric']._column.tolist() if column != target]
+    if label_summary is None:
+        label_summary = get_label_summary(config, summary)
 
-    df = df[features + [target]].copy()
-    rowcnt = len(df)
-    df_s1  = df.agg(['count', 'nunique','mean','min','max']).transpose().reset_index().rename(columns={"index":"_column"})
+    rowcnt = summary['rows']
+    column_stats = []
+    for column in features:
+        counts = present(summary['counts'][column])
+        values = counts.index.get_level_values('value').to_numpy(dtype='float64')
+        weights = counts.to_numpy()
+        column_stats.append((column, weights.sum(), len(np.unique(values)),
+                             (values*weights).sum()/weights.sum(), values.min(), values.max()))
+    df_s1  = pd.DataFrame(column_stats, columns=['_column', 'count', 'nunique', 'mean', 'min', 'max'])
     df_s1['count'] = df_s1['count'].astype('int64')
     df_s1['nunique'] = df_s1['nunique'].astype('int64')
     df_s1["null"] = (rowcnt - df_s1["count"]).astype('int64')
     df_s1["not_null"] = rowcnt - df_s1["null"]
     df_s1["null_pct"] = df_s1["null"] / rowcnt
     df_s1["nunique_pct"] = df_s1['nunique'] / rowcnt
-    dt = pd.DataFrame(df.dtypes).reset_index().rename(columns={"index":"_column", 0:"_dtype"})
+    dt = pd.DataFrame(summary['dtypes'][features]).reset_index().rename(columns={"index":"_column", 0:"_dtype"})
     df_stats = pd.merge(dt, df_s1, on='_column', how='inner').round(4)
     num_list = []
     for rec in df_stats.to_dict('records'):
-        if rec['_column'] != target and rec['count'] > 1:
-            n_summary = ncol_stats(df, target, rec['_column'])
+        if rec['count'] > 1:
+            n_summary = ncol_stats(summary['counts'][rec['_column']], target, label_summary)
             rec['bin_label'] = n_summary['bin_label'].tolist()
             rec['legit_count'] = n_summary['legit'].tolist()
             rec['fraud_count'] = n_summary['fraud'].tolist()
@@ -462,15 +615,17 @@ def profile_report(config):
     profile= env.get_template('profile.html')
     
     # -- all the checks -- 
-    df = get_dataframe(config)
-    df, overview_stats = get_overview(config, df)
-    df_stats, warnings = get_stats(config, df)
-    lbl_stats, lbl_warnings = get_label(config, df)
-    p_stats, p_warnings = get_partition(config, df)
-    e_stats, e_warnings = get_email(config, df)
-    i_stats, i_warnings = get_ip_address(config, df)
-    cat_rec = get_categorical(config, df_stats, df)
-    num_rec = get_numerics( config, df_stats, df)
+    summary = summarize(config, read_chunks(config))
+    event_timestamp = get_event_timestamp(config, summary)
+    label_summary = get_label_summary(config, summary)
+    overview_stats = get_overview(config, summary, event_timestamp)
+    df_stats, warnings = get_stats(config, summary)
+    lbl_stats, lbl_warnings = get_label(config, summary, label_summary)
+    p_stats, p_warnings = get_partition(config, summary, label_summary, event_timestamp)
+    e_stats, e_warnings = get_email(config, summary, label_summary)
+    i_stats, i_warnings = get_ip_address(config, summary, label_summary)
+    cat_rec = get_categorical(config, df_stats, summary, label_summary)
+    num_rec = get_numerics( config, df_stats, summary, label_summary)
     
     # -- render the report 
     profile_results = profile.render(file = config['input_file'], 
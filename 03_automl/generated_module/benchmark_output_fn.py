@@ -0,0 +1,61 @@
+"""Compares memory and latency of the dense and sparse response encoders of sagemaker_serve.output_fn.
+
+python benchmark_output_fn.py --rows 3000 --features 10000 --density 0.002
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from scipy import sparse
+
+from sagemaker_containers.beta.framework import encoders
+
+from candidate_data_processors import sagemaker_serve
+
+
+def _dense_csv(X, y):
+    """The previous text/csv path: densify the whole matrix and encode it in one go."""
+    return len(encoders.encode(np.column_stack((np.ravel(y), X.todense())), 'text/csv'))
+
+
+def _streaming_csv(X, y):
+    """Consumes the chunks one by one, as the model server does when writing the response."""
+    return sum(len(chunk) for chunk in sagemaker_serve._iter_csv_chunks(X, y))
+
+
+def _streaming_libsvm(X, y):
+    return sum(len(chunk) for chunk in sagemaker_serve._iter_libsvm_chunks(X, y))
+
+
+def _measure(encode, X, y):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = encode(X, y)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=3000)
+    parser.add_argument('--features', type=int, default=10000)
+    parser.add_argument('--density', type=float, default=0.002)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    X = sparse.random(args.rows, args.features, density=args.density, format='csr', random_state=rng)
+    y = rng.randint(0, 5, size=args.rows).astype('float64')
+
+    print('{:<18} {:>10} {:>14} {:>16}'.format('encoder', 'seconds', 'peak MiB', 'response MiB'))
+    for name, encode in (('dense csv', _dense_csv),
+                         ('streaming csv', _streaming_csv),
+                         ('streaming libsvm', _streaming_libsvm)):
+        elapsed, peak, size = _measure(encode, X, y)
+        print('{:<18} {:>10.3f} {:>14.1f} {:>16.1f}'.format(name, elapsed, peak / 2 ** 20, size / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
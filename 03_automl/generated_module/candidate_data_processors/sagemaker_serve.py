@@ -42,6 +42,81 @@ def _sparsify_if_needed(x):
     return x
 
 
+# Number of rows densified or formatted at a time by the streaming text encoders.
+_ENCODE_CHUNK_SIZE = int(os.getenv('AUTOML_ENCODE_CHUNK_SIZE', '128'))
+
+_LIBSVM_CONTENT_TYPES = ('text/libsvm', 'text/x-libsvm')
+
+
+def _iter_csv_chunks(X, y=None, chunk_size=_ENCODE_CHUNK_SIZE):
+    """Yields the csv encoding of the target and features, chunk_size rows at a time.
+
+    Only one chunk of a sparse matrix is densified at a time, the output is identical to
+    encoding the dense matrix in one go.
+
+    Parameters
+    ----------
+    X : array-like or scipy.sparse matrix
+        2D array of features
+
+    y : array-like or None
+        targets, written as first column when present
+
+    chunk_size : int
+        number of rows per chunk
+
+    Returns
+    -------
+    : generator of str
+        csv formatted chunks
+
+    """
+    for start in range(0, X.shape[0], chunk_size):
+        chunk = X[start:start + chunk_size]
+        chunk = chunk.toarray() if sparse.issparse(chunk) else np.asarray(chunk)
+        if y is not None:
+            chunk = np.column_stack((np.ravel(y)[start:start + chunk_size], chunk))
+        stream = io.StringIO()
+        np.savetxt(stream, chunk, delimiter=',', fmt='%s')
+        yield stream.getvalue()
+
+
+def _iter_libsvm_chunks(X, y=None, chunk_size=_ENCODE_CHUNK_SIZE):
+    """Yields the libsvm encoding of the target and features, chunk_size rows at a time.
+
+    Rows are written directly from the CSR representation as ``<target> <index>:<value> ...``
+    with zero-based feature indices, zeros are never materialized. Every libsvm row starts
+    with a label, so a placeholder target of 0 is written when y is None, e.g. in feature
+    transform mode.
+
+    Parameters
+    ----------
+    X : array-like or scipy.sparse matrix
+        2D array of features
+
+    y : array-like or None
+        targets, written as first field of every row
+
+    chunk_size : int
+        number of rows per chunk
+
+    Returns
+    -------
+    : generator of str
+        libsvm formatted chunks
+
+    """
+    X = sparse.csr_matrix(X)
+    targets = np.ravel(y) if y is not None else np.zeros(X.shape[0], dtype=int)
+    for start in range(0, X.shape[0], chunk_size):
+        lines = []
+        for row in range(start, min(start + chunk_size, X.shape[0])):
+            begin, end = X.indptr[row], X.indptr[row + 1]
+            fields = ['{}:{}'.format(index, value) for index, value in zip(X.indices[begin:end], X.data[begin:end])]
+            lines.append(' '.join([str(targets[row])] + fields))
+        yield '\n'.join(lines) + '\n'
+
+
 def _split_features_target(x):
     """Returns the features and target by splitting the input array."""
     if os.getenv('AUTOML_TRANSFORM_MODE') == 'feature-transform':
@@ -248,12 +323,25 @@ def output_fn(prediction, accept_type):
             mimetype=accept_type
         )
 
+    if accept_type in _LIBSVM_CONTENT_TYPES:
+        return worker.Response(
+            response=_iter_libsvm_chunks(X, y),
+            status=http_client.OK,
+            mimetype=accept_type
+        )
+
     if accept_type == 'text/csv':
-        if y is not None:
-            X = np.column_stack(
-                (np.ravel(y), X.todense() if sparse.issparse(X) else X)
+        if sparse.issparse(X):
+            # Stream the sparse features instead of densifying the whole matrix.
+            return worker.Response(
+                response=_iter_csv_chunks(X, y),
+                status=http_client.OK,
+                mimetype=accept_type
             )
 
+        if y is not None:
+            X = np.column_stack((np.ravel(y), X))
+
         return worker.Response(
             response=encoders.encode(X, accept_type),
             status=http_client.OK,
@@ -0,0 +1,63 @@
+import io
+
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.datasets import load_svmlight_file
+
+pytest.importorskip("sagemaker_containers")
+pytest.importorskip("sagemaker_sklearn_extension")
+
+from sagemaker_containers.beta.framework import encoders  # noqa: E402
+
+from candidate_data_processors import sagemaker_serve  # noqa: E402
+
+
+@pytest.fixture
+def features():
+    rng = np.random.RandomState(0)
+    X = rng.uniform(size=(50, 20)) * (rng.uniform(size=(50, 20)) < 0.1)
+    # Keep an all-zero row, which has no feature fields in libsvm.
+    X[3] = 0
+    return sparse.csr_matrix(X), rng.randint(0, 5, size=50).astype('float64')
+
+
+def _parse_libsvm(chunks, n_features):
+    return load_svmlight_file(io.BytesIO(''.join(chunks).encode()), n_features=n_features, zero_based=True)
+
+
+def test_streaming_csv_matches_dense_encoding(features):
+    X, y = features
+    dense = encoders.encode(np.column_stack((np.ravel(y), X.todense())), 'text/csv')
+
+    assert ''.join(sagemaker_serve._iter_csv_chunks(X, y, chunk_size=7)) == dense
+    assert ''.join(sagemaker_serve._iter_csv_chunks(X, chunk_size=7)) == encoders.encode(X.toarray(), 'text/csv')
+
+
+def test_libsvm_round_trip(features):
+    X, y = features
+
+    parsed_X, parsed_y = _parse_libsvm(sagemaker_serve._iter_libsvm_chunks(X, y, chunk_size=7), X.shape[1])
+
+    np.testing.assert_array_equal(parsed_X.toarray(), X.toarray())
+    np.testing.assert_array_equal(parsed_y, y)
+
+
+def test_libsvm_without_target_writes_placeholder_label(features):
+    X, _ = features
+
+    parsed_X, parsed_y = _parse_libsvm(sagemaker_serve._iter_libsvm_chunks(X.toarray()), X.shape[1])
+
+    np.testing.assert_array_equal(parsed_X.toarray(), X.toarray())
+    np.testing.assert_array_equal(parsed_y, np.zeros(X.shape[0]))
+
+
+def test_sparse_recordio_matches_sparsified_dense_input(features, monkeypatch):
+    monkeypatch.setenv('AUTOML_SPARSE_ENCODE_RECORDIO_PROTOBUF', '1')
+    X, y = features
+    accept_type = 'application/x-recordio-protobuf'
+
+    sparse_response = sagemaker_serve.output_fn((X, y), accept_type)
+    dense_response = sagemaker_serve.output_fn((X.toarray(), y), accept_type)
+
+    assert sparse_response.get_data() == dense_response.get_data()
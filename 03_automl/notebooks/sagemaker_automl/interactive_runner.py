@@ -4,6 +4,7 @@ This package contains helper classes and functions that are used in the candidat
 """
 import concurrent
 import logging
+import os
 import sys
 from concurrent.futures.thread import ThreadPoolExecutor
 
@@ -11,6 +12,7 @@ import sagemaker
 
 from sagemaker_automl.common import execute_steps
 from sagemaker_automl.local_candidate import AutoMLLocalCandidate
+from sagemaker_automl.local_fit import fit_candidates_locally
 
 logging.basicConfig(
     stream=sys.stdout,
@@ -137,6 +139,53 @@ class AutoMLInteractiveRunner:
                     "Successfully fit {} data transformers".format(success_count)
                 )
 
+    def fit_data_transformers_locally(self, X, y, parallel_jobs=2, share_vocabulary=True):
+        """Fit data transformers from all candidates in a local process pool instead of SageMaker jobs
+
+        Each data processing module (e.g. dpp0) is fitted once, even if several candidates use it. Candidates whose
+        text vectorizers tokenize the same column alike share a single tokenization and n-gram count.
+
+        Args:
+            X (numpy.ndarray): 2D array of features without the target column, e.g. from
+                `sagemaker_sklearn_extension.externals.read_csv_data`
+            y (numpy.ndarray): target column
+            parallel_jobs (int): num of worker processes
+            share_vocabulary (bool): tokenize and count n-grams once for candidates that tokenize alike
+        Returns: a dict of step name to wall clock seconds
+        """
+        processor_modules = {}
+        for candidate in self.candidates.values():
+            step = candidate.data_transformer_step
+            processor_modules[step.name] = (
+                step.name,
+                os.path.join(step.source_module_path, "candidate_data_processors", f"{step.name}.py"),
+            )
+
+        models, timings = fit_candidates_locally(
+            processor_modules, X, y, parallel_jobs=parallel_jobs, share_vocabulary=share_vocabulary
+        )
+
+        for candidate_pipeline_name, candidate in self.candidates.items():
+            candidate.set_local_data_transformer(models[candidate.data_transformer_step.name])
+            logging.info(
+                "Successfully fit local data transformer for {}".format(
+                    candidate_pipeline_name
+                )
+            )
+
+        return timings
+
+    def transform_data_locally(self, candidate_pipeline_name, X):
+        """Transform data with the data transformer of a candidate that was fitted by `fit_data_transformers_locally`
+
+        Args:
+            candidate_pipeline_name (str): name of the candidate pipeline
+            X (numpy.ndarray): 2D array in the format the candidate's data processing module transforms
+        Returns: the transformed data
+        """
+        candidate = self.candidates[candidate_pipeline_name]
+        return candidate.local_data_transformer.transform(X)
+
     def _process_data_transformer_future(self, candidate_pipeline_name, future):
 
         try:
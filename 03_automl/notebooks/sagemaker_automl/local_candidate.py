@@ -211,6 +211,19 @@ class AutoMLLocalCandidate:
             and self._state["data_transformer"]["trained"]
         )
 
+    def set_local_data_transformer(self, model):
+        """Stores a data transformer model that was fitted locally, see
+        `AutoMLInteractiveRunner.fit_data_transformers_locally`"""
+        self._state["local_data_transformer"] = model
+
+    @property
+    def local_data_transformer(self):
+        if "local_data_transformer" not in self._state:
+            raise AutoMLLocalCandidateNotTrained(
+                "AutoML Candidate data transformers has not been fitted locally yet"
+            )
+        return self._state["local_data_transformer"]
+
     def get_data_transformer_model(
         self, role, sagemaker_session, transform_mode=None, **kwargs
     ):
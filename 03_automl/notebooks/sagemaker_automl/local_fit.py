@@ -0,0 +1,288 @@
+"""SageMaker AutoPilot Helpers.
+
+This package contains helper classes and functions that are used in the candidates definition notebook.
+"""
+import importlib.util
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Parameters of the text vectorizers that determine how documents are read, tokenized and counted. Candidates that
+# agree on all of them share one tokenization and n-gram count of the text columns.
+TOKENIZATION_PARAMS = (
+    "input",
+    "encoding",
+    "decode_error",
+    "strip_accents",
+    "lowercase",
+    "preprocessor",
+    "tokenizer",
+    "stop_words",
+    "token_pattern",
+    "ngram_range",
+    "analyzer",
+    "binary",
+)
+
+# Parameters of MultiColumnTfidfVectorizer that limit the vocabulary in ways the shared counts do not reproduce. Text
+# vectorizers that set them are fitted without shared counts.
+UNSHARED_VOCABULARY_PARAMS = {"vocabulary_sizes": None, "ignore_overflow": False}
+
+
+def load_processor_module(name, path):
+    """Imports a candidate data processing module (e.g. dpp0) from its source file"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def find_shared_text_vectorizer(feature_transform):
+    """Finds the text vectorizer whose n-gram counts can be shared between candidates.
+
+    Supported is the layout generated for text features: a pipeline whose first step is a ColumnTransformer with a
+    single transformer, which is a pipeline made of one MultiColumnTfidfVectorizer applied to one column, without a
+    fixed vocabulary and without the UNSHARED_VOCABULARY_PARAMS.
+
+    Args:
+        feature_transform (sklearn.pipeline.Pipeline): the unfitted feature transform of a candidate
+    Returns: a tuple (vectorizer, column index) or None when the feature transform has a different layout
+    """
+    try:
+        _, column_transformer = feature_transform.steps[0]
+        (_, text_processors, columns), = column_transformer.transformers
+        (_, vectorizer), = text_processors.steps
+        (column,) = columns
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+    if type(vectorizer).__name__ != "MultiColumnTfidfVectorizer" or vectorizer.vocabulary is not None:
+        return None
+    params = vectorizer.get_params()
+    if any(params.get(name, default) != default for name, default in UNSHARED_VOCABULARY_PARAMS.items()):
+        return None
+    if column_transformer.remainder != "drop":
+        return None
+    return vectorizer, column
+
+
+def tokenization_params(vectorizer):
+    """Returns the parameters of the text vectorizer that `count_terms` passes on to its CountVectorizer
+
+    Parameters the vectorizer does not expose are left out, the CountVectorizer uses the same defaults.
+    """
+    params = vectorizer.get_params()
+    return {name: params[name] for name in TOKENIZATION_PARAMS if name in params}
+
+
+def tokenization_key(vectorizer, column):
+    params = tokenization_params(vectorizer)
+    stop_words = params.get("stop_words")
+    if stop_words is not None and not isinstance(stop_words, str):
+        # A list of stop words is not hashable, and neither its order nor duplicates change the tokenization.
+        params["stop_words"] = frozenset(stop_words)
+    return (column,) + tuple(sorted(params.items()))
+
+
+def count_terms(documents, params):
+    """Tokenizes the documents once and counts the n-grams of the full corpus
+
+    Returns: a tuple (count matrix in CSR format, array of terms sorted like the count matrix columns)
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    counter = CountVectorizer(dtype=np.int64, **params)
+    counts = counter.fit_transform(documents).tocsr()
+    terms = np.array(sorted(counter.vocabulary_, key=counter.vocabulary_.get), dtype=object)
+    return counts, terms
+
+
+def derive_vocabulary(counts, max_df=1.0, min_df=1, max_features=None, dtype=np.float64):
+    """Selects the vocabulary TfidfVectorizer would learn with these pruning parameters from shared counts
+
+    Args:
+        counts (scipy.sparse.csr_matrix): document-term counts of the full corpus
+        max_df (float or int): ignore terms with a higher document frequency (proportion if float)
+        min_df (float or int): ignore terms with a lower document frequency (proportion if float)
+        max_features (int): keep only the most frequent terms across the corpus
+        dtype (type): dtype of the vectorizer, ties between equally frequent terms are broken like it does
+    Returns: sorted array of the selected column indices of counts
+    """
+    n_documents = counts.shape[0]
+    max_doc_count = max_df if isinstance(max_df, (int, np.integer)) else max_df * n_documents
+    min_doc_count = min_df if isinstance(min_df, (int, np.integer)) else min_df * n_documents
+
+    document_frequencies = np.bincount(counts.indices, minlength=counts.shape[1])
+    selected = np.flatnonzero(
+        (document_frequencies <= max_doc_count) & (document_frequencies >= min_doc_count)
+    )
+
+    if max_features is not None and len(selected) > max_features:
+        term_frequencies = np.asarray(counts[:, selected].sum(axis=0)).ravel().astype(dtype)
+        selected = np.sort(selected[(-term_frequencies).argsort()[:max_features]])
+    return selected
+
+
+def fit_candidate(candidate_name, module_name, module_path, X, y, shared_terms=None):
+    """Fits the feature and label transforms of one candidate, used as process pool task.
+
+    When shared_terms is given, the text vectorizer is fitted from the shared counts: only the idf weights are
+    computed, the text column is not tokenized again and the TF-IDF features are passed straight to the remaining
+    steps of the feature transform.
+
+    Args:
+        candidate_name (str): name of the candidate, used for logging
+        module_name (str): name of the data processing module, e.g. `dpp0`
+        module_path (str): path to the source file of the data processing module
+        X (numpy.ndarray): 2D array of features
+        y (numpy.ndarray): target column
+        shared_terms (tuple): optional. Counts and terms of the text column, see `count_terms`
+    Returns: a tuple (fitted AutoMLTransformer, dict of step name to wall clock seconds)
+    """
+    from sagemaker_sklearn_extension.externals import AutoMLTransformer
+
+    timings = OrderedDict()
+    start = time.perf_counter()
+
+    module = load_processor_module(module_name, module_path)
+    feature_transform = module.build_feature_transform()
+    label_transform = module.build_label_transform() if hasattr(module, "build_label_transform") else None
+
+    y_transformed = y
+    if label_transform is not None:
+        y_transformed = label_transform.fit_transform(y)
+    timings["fit_label_transform"] = time.perf_counter() - start
+
+    if shared_terms is not None:
+        start = time.perf_counter()
+        vectorizer, column = find_shared_text_vectorizer(feature_transform)
+        counts, terms = shared_terms
+        selected = derive_vocabulary(
+            counts,
+            max_df=vectorizer.max_df,
+            min_df=vectorizer.min_df,
+            max_features=vectorizer.max_features,
+            dtype=vectorizer.dtype,
+        )
+        timings["derive_vocabulary"] = time.perf_counter() - start
+        if len(selected) == 0:
+            logging.info(
+                "[{}] No terms remain after pruning the shared vocabulary, fitting without it".format(candidate_name)
+            )
+            shared_terms = None
+
+    if shared_terms is not None:
+        start = time.perf_counter()
+        features = _fit_text_features_from_counts(
+            feature_transform, vectorizer, counts[:, selected], terms[selected], X
+        )
+        timings["fit_text_features"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if len(feature_transform.steps) > 1:
+            tail = feature_transform[1:].fit(features, y_transformed)
+            feature_transform.steps[1:] = tail.steps
+        timings["fit_remaining_steps"] = time.perf_counter() - start
+    else:
+        start = time.perf_counter()
+        feature_transform.fit(X, y_transformed)
+        timings["fit_feature_transform"] = time.perf_counter() - start
+
+    return AutoMLTransformer(module.HEADER, feature_transform, label_transform), timings
+
+
+def _fit_text_features_from_counts(feature_transform, vectorizer, counts, terms, X):
+    """Fits the first step of the feature transform with a fixed vocabulary and the idf weights of the full corpus.
+
+    Returns: the TF-IDF features of the full corpus
+    """
+    from sklearn.feature_extraction.text import TfidfTransformer
+
+    tfidf = TfidfTransformer(
+        norm=vectorizer.norm,
+        use_idf=vectorizer.use_idf,
+        smooth_idf=vectorizer.smooth_idf,
+        sublinear_tf=vectorizer.sublinear_tf,
+    )
+    features = tfidf.fit_transform(counts.astype(vectorizer.dtype))
+
+    # With a fixed vocabulary, fitting the column transformer on one document sets up all its fitted state without
+    # tokenizing the corpus. Only the idf weights and the output format depend on the full corpus.
+    vectorizer.set_params(vocabulary={term: idx for idx, term in enumerate(terms)})
+    column_transformer = feature_transform.steps[0][1]
+    column_transformer.fit(X[:1])
+    _, fitted_text_processors, _ = column_transformer.transformers_[0]
+    fitted_vectorizer = fitted_text_processors.steps[-1][1].vectorizers_[0]
+    if vectorizer.use_idf:
+        fitted_vectorizer.idf_ = tfidf.idf_
+    column_transformer.sparse_output_ = (
+        features.nnz / max(features.shape[0] * features.shape[1], 1) < column_transformer.sparse_threshold
+    )
+    return features if column_transformer.sparse_output_ else features.toarray()
+
+
+def fit_candidates_locally(candidates, X, y, parallel_jobs=2, share_vocabulary=True):
+    """Fits the data transformers of the candidates in a process pool.
+
+    Candidates whose text vectorizers tokenize the same column the same way (e.g. dpp0 and dpp2 which only differ in
+    max_df, min_df and downstream steps) share a single tokenization and n-gram count, from which each candidate
+    derives its own vocabulary.
+
+    Args:
+        candidates (dict[str, tuple]): candidate name mapped to (data processing module name, module source path)
+        X (numpy.ndarray): 2D array of features, without the target column
+        y (numpy.ndarray): target column
+        parallel_jobs (int): number of worker processes
+        share_vocabulary (bool): tokenize and count n-grams once for candidates that tokenize alike
+    Returns: a tuple (dict of candidate name to fitted AutoMLTransformer, dict of timings in seconds)
+    """
+    timings = OrderedDict()
+    shared_keys = {}
+    shared_params = {}
+
+    if share_vocabulary:
+        for candidate_name, (module_name, module_path) in candidates.items():
+            module = load_processor_module(module_name, module_path)
+            found = find_shared_text_vectorizer(module.build_feature_transform())
+            if found is not None:
+                key = tokenization_key(*found)
+                shared_keys[candidate_name] = key
+                shared_params[key] = tokenization_params(found[0])
+
+    models = {}
+    with ProcessPoolExecutor(max_workers=parallel_jobs) as executor:
+        count_futures = {
+            key: (executor.submit(count_terms, X[:, key[0]], params), time.perf_counter())
+            for key, params in shared_params.items()
+        }
+        shared_terms = {}
+        for key, (future, start) in count_futures.items():
+            shared_terms[key] = future.result()
+            step_name = "count_terms[column={}, analyzer={}]".format(key[0], dict(key[1:])["analyzer"])
+            timings[step_name] = time.perf_counter() - start
+            logging.info("{} took {:.1f}s".format(step_name, timings[step_name]))
+
+        fit_futures = {}
+        for candidate_name, (module_name, module_path) in candidates.items():
+            key = shared_keys.get(candidate_name)
+            fit_futures[candidate_name] = executor.submit(
+                fit_candidate,
+                candidate_name,
+                module_name,
+                module_path,
+                X,
+                y,
+                shared_terms.get(key) if key is not None else None,
+            )
+
+        for candidate_name, future in fit_futures.items():
+            model, candidate_timings = future.result()
+            models[candidate_name] = model
+            for step_name, seconds in candidate_timings.items():
+                timings["{}:{}".format(candidate_name, step_name)] = seconds
+                logging.info("[{}] {} took {:.1f}s".format(candidate_name, step_name, seconds))
+
+    return models, timings
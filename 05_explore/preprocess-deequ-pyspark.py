@@ -11,9 +11,11 @@ subprocess.check_call([sys.executable, '-m', 'pip', 'install', '--no-deps', 'pyd
 subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'pandas==1.1.4'])
 
 import pyspark
+from pyspark import StorageLevel
 from pyspark.sql import SparkSession
 from pyspark.sql.types import StructField, StructType, StringType, IntegerType, DoubleType
 from pyspark.sql.functions import *
+from pyspark.sql.utils import AnalysisException
 
 from pydeequ.analyzers import *
 from pydeequ.checks import *
@@ -22,6 +24,114 @@ from pydeequ.suggestions import *
 
 # PySpark Deequ GitHub Repo:  https://github.com/awslabs/python-deequ
 
+
+def review_check(spark):
+    return Check(spark, CheckLevel.Error, "Review Check") \
+        .hasSize(lambda x: x >= 200000) \
+        .hasMin("star_rating", lambda x: x == 1.0) \
+        .hasMax("star_rating", lambda x: x == 5.0)  \
+        .isComplete("review_id")  \
+        .isUnique("review_id")  \
+        .isComplete("marketplace")  \
+        .isContainedIn("marketplace", ["US", "UK", "DE", "JP", "FR"])
+
+
+def profile_metrics():
+    # Metrics of the AnalysisRunner of the default mode as (entity, instance, name, aggregate),
+    # so they can be computed for every partition with a single groupBy
+    return [
+        ('Dataset', '*', 'Size', count(lit(1))),
+        ('Column', 'review_id', 'Completeness', count('review_id') / count(lit(1))),
+        ('Column', 'review_id', 'ApproxCountDistinct', approx_count_distinct('review_id')),
+        ('Column', 'star_rating', 'Mean', avg('star_rating')),
+        ('Column', 'top star_rating', 'Compliance', avg(when(expr('star_rating >= 4.0'), 1.0).otherwise(0.0))),
+        ('Multicolumn', 'total_votes,star_rating', 'Correlation', corr('total_votes', 'star_rating')),
+        ('Multicolumn', 'total_votes,helpful_votes', 'Correlation', corr('total_votes', 'helpful_votes')),
+    ]
+
+
+def partition_metrics(dataset, partition_column):
+    # One row per partition and metric, laid out like the success metrics of Deequ
+    metric_definitions = profile_metrics()
+    aggregated = dataset \
+        .groupBy(partition_column) \
+        .agg(*[aggregate.alias('metric_{}'.format(idx))
+               for idx, (_, _, _, aggregate) in enumerate(metric_definitions)])
+    metrics = array(*[struct(lit(entity).alias('entity'),
+                             lit(instance).alias('instance'),
+                             lit(name).alias('name'),
+                             col('metric_{}'.format(idx)).cast('double').alias('value'))
+                      for idx, (entity, instance, name, _) in enumerate(metric_definitions)])
+    return aggregated.select(partition_column, explode(metrics).alias('metric')).select(partition_column, 'metric.*')
+
+
+def profiled_partitions(spark, s3_output_analyze_data, partition_column):
+    # Partitions profiled by previous runs are the partitions of the dataset-metrics output
+    try:
+        metrics = spark.read.parquet('{}/dataset-metrics'.format(s3_output_analyze_data))
+    except AnalysisException:
+        return set()
+    return set(row[0] for row in metrics.select(partition_column).distinct().collect())
+
+
+def profile(spark, dataset, s3_output_analyze_data, partition_column):
+    """Profiles the partitions of the dataset that have not been profiled yet.
+
+    The parsed dataset is persisted once. The metrics of all new partitions are computed in a single
+    grouped scan and appended to the partitioned dataset-metrics Parquet dataset. The review checks
+    apply to the dataset as a whole (its size, unique review ids), so they run once on the full
+    dataset and their results replace the previous ones.
+    """
+    done = profiled_partitions(spark, s3_output_analyze_data, partition_column)
+    print('Already profiled partitions: {}'.format(sorted(done)))
+
+    dataset = dataset.persist(StorageLevel.MEMORY_AND_DISK)
+    partitions = [row[0] for row in dataset.select(partition_column).distinct().collect()]
+    new_partitions = sorted(partition for partition in partitions
+                            if partition is not None and partition not in done)
+    print('Profiling partitions: {}'.format(new_partitions))
+    if not new_partitions:
+        dataset.unpersist()
+        return
+
+    new_dataset = dataset.where(col(partition_column).isin(new_partitions))
+    partition_metrics(new_dataset, partition_column) \
+        .write \
+        .mode('append') \
+        .partitionBy(partition_column) \
+        .parquet('{}/dataset-metrics'.format(s3_output_analyze_data))
+
+    verificationResult = VerificationSuite(spark) \
+        .onData(dataset) \
+        .addCheck(review_check(spark)) \
+        .run()
+    print(f"Verification Run Status: {verificationResult.status}")
+
+    VerificationResult.checkResultsAsDataFrame(spark, verificationResult) \
+        .write \
+        .mode('overwrite') \
+        .parquet('{}/constraint-checks'.format(s3_output_analyze_data))
+    VerificationResult.successMetricsAsDataFrame(spark, verificationResult) \
+        .write \
+        .mode('overwrite') \
+        .parquet('{}/success-metrics'.format(s3_output_analyze_data))
+
+    # Suggest new checks and constraints from the new partitions only
+    suggestionsResult = ConstraintSuggestionRunner(spark) \
+                 .onData(new_dataset) \
+                 .addConstraintRule(DEFAULT()) \
+                 .run()
+
+    suggestions = suggestionsResult["constraint_suggestions"]
+    if suggestions:
+        spark.createDataFrame(spark.sparkContext.parallelize(suggestions)) \
+            .write \
+            .mode('overwrite') \
+            .parquet('{}/constraint-suggestions'.format(s3_output_analyze_data))
+
+    dataset.unpersist()
+
+
 def main():
     args_iter = iter(sys.argv[1:])
     args = dict(zip(args_iter, args_iter))
@@ -31,6 +141,10 @@ def main():
     print(s3_input_data)
     s3_output_analyze_data = args['s3_output_analyze_data'].replace('s3://', 's3a://')
     print(s3_output_analyze_data)
+    # 'profile' computes the metrics of new partitions in a single grouped scan,
+    # see profile()
+    mode = args.get('mode', 'default')
+    partition_column = args.get('partition_column', 'product_category')
 
     spark = SparkSession \
         .builder \
@@ -61,6 +175,11 @@ def main():
                              sep="\t",
                              quote="")
 
+    if mode == 'profile':
+        profile(spark, dataset, s3_output_analyze_data, partition_column)
+        spark.stop()
+        return
+
     # Calculate statistics on the dataset
     analysisResult = AnalysisRunner(spark) \
                         .onData(dataset) \
@@ -86,15 +205,7 @@ def main():
     # Check data quality
     verificationResult = VerificationSuite(spark) \
         .onData(dataset) \
-        .addCheck(
-            Check(spark, CheckLevel.Error, "Review Check") \
-                .hasSize(lambda x: x >= 200000) \
-                .hasMin("star_rating", lambda x: x == 1.0) \
-                .hasMax("star_rating", lambda x: x == 5.0)  \
-                .isComplete("review_id")  \
-                .isUnique("review_id")  \
-                .isComplete("marketplace")  \
-                .isContainedIn("marketplace", ["US", "UK", "DE", "JP", "FR"])) \
+        .addCheck(review_check(spark)) \
         .run()
 
     print(f"Verification Run Status: {verificationResult.status}")
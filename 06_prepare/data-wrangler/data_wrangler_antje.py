@@ -132,239 +132,406 @@ class OperatorCustomerError(Exception):
 from sagemaker_dataprep.compute.operators.utils import (
     dispatch,
     default_spark_with_trained_parameters,
-from pyspark.ml.feature import (
-    VectorAssembler,
-    StandardScaler,
-    StandardScalerModel,
-    RobustScaler,
-    RobustScalerModel,
-    MinMaxScaler,
-    MinMaxScalerModel,
-    MaxAbsScaler,
-    MaxAbsScalerModel,
-)
-from pyspark.ml.functions import vector_to_array
+from pyspark.ml.feature import MinMaxScalerModel, RobustScalerModel, StandardScalerModel
 from pyspark.sql import functions as sf
 from pyspark.sql.types import NumericType
 
 
+# The single column scalers are fitted and applied through their multi column counterparts, which store plain
+# statistics in the trained parameters instead of a serialized Spark ML model. Trained parameters of flows that were
+# fitted with the Spark ML scalers are upgraded with process_numeric_upgrade_legacy_scaler_parameters.
 def process_numeric_standard_scaler(
     df, input_column=None, center=None, scale=None, output_column=None, trained_parameters=None
 ):
     expects_column(df, input_column, "Input column")
     expects_valid_column_name(output_column, "Output column", nullable=True)
-    process_numeric_expects_numeric_column(df, input_column)
+    trained_parameters = process_numeric_upgrade_legacy_scaler_parameters(
+        trained_parameters,
+        {"input_column": input_column, "center": center, "scale": scale},
+        {"input_columns": [input_column], "center": center, "scale": scale},
+        input_column,
+        StandardScalerModel,
+        lambda model: {"mean": float(model.mean[0]), "std": float(model.std[0])},
+    )
+
+    return process_numeric_multi_column_standard_scaler(
+        df,
+        input_columns=[input_column],
+        center=center,
+        scale=scale,
+        output_columns=[output_column] if output_column else None,
+        trained_parameters=trained_parameters,
+    )
 
-    temp_vector_col = temp_col_name(df)
-    assembled = VectorAssembler(inputCols=[input_column], outputCol=temp_vector_col, handleInvalid="keep").transform(df)
-    assembled_wo_nans = VectorAssembler(
-        inputCols=[input_column], outputCol=temp_vector_col, handleInvalid="skip"
-    ).transform(df)
-    temp_normalized_vector_col = temp_col_name(assembled)
 
-    trained_parameters = load_trained_parameters(
-        trained_parameters, {"input_column": input_column, "center": center, "scale": scale}
+def process_numeric_robust_scaler(
+    df,
+    input_column=None,
+    lower_quantile=None,
+    upper_quantile=None,
+    center=None,
+    scale=None,
+    output_column=None,
+    trained_parameters=None,
+):
+    expects_column(df, input_column, "Input column")
+    expects_valid_column_name(output_column, "Output column", nullable=True)
+    operator_parameters = {
+        "center": center,
+        "scale": scale,
+        "lower_quantile": lower_quantile,
+        "upper_quantile": upper_quantile,
+    }
+    # Only the median and the quantile range are used for scaling, the range is stored as [0, range].
+    trained_parameters = process_numeric_upgrade_legacy_scaler_parameters(
+        trained_parameters,
+        {"input_column": input_column, **operator_parameters},
+        {"input_columns": [input_column], **operator_parameters},
+        input_column,
+        RobustScalerModel,
+        lambda model: {"quantiles": [0.0, float(model.median[0]), float(model.range[0])]},
+    )
+
+    return process_numeric_multi_column_robust_scaler(
+        df,
+        input_columns=[input_column],
+        lower_quantile=lower_quantile,
+        upper_quantile=upper_quantile,
+        center=center,
+        scale=scale,
+        output_columns=[output_column] if output_column else None,
+        trained_parameters=trained_parameters,
+    )
+
+
+def process_numeric_min_max_scaler(
+    df, input_column=None, min=None, max=None, output_column=None, trained_parameters=None
+):
+    expects_column(df, input_column, "Input column")
+    expects_valid_column_name(output_column, "Output column", nullable=True)
+    trained_parameters = process_numeric_upgrade_legacy_scaler_parameters(
+        trained_parameters,
+        {"input_column": input_column, "min": min, "max": max,},
+        {"input_columns": [input_column], "min": min, "max": max,},
+        input_column,
+        MinMaxScalerModel,
+        lambda model: {"min": float(model.originalMin[0]), "max": float(model.originalMax[0])},
+    )
+
+    return process_numeric_multi_column_min_max_scaler(
+        df,
+        input_columns=[input_column],
+        min=min,
+        max=max,
+        output_columns=[output_column] if output_column else None,
+        trained_parameters=trained_parameters,
+    )
+
+
+def process_numeric_max_absolute_scaler(df, input_column=None, output_column=None, trained_parameters=None):
+    expects_column(df, input_column, "Input column")
+    expects_valid_column_name(output_column, "Output column", nullable=True)
+    # The Spark ML based max absolute scaler stored a MinMaxScalerModel of the input column.
+    trained_parameters = process_numeric_upgrade_legacy_scaler_parameters(
+        trained_parameters,
+        {"input_column": input_column,},
+        {"input_columns": [input_column],},
+        input_column,
+        MinMaxScalerModel,
+        lambda model: {"max_abs": max(abs(float(model.originalMin[0])), abs(float(model.originalMax[0])))},
     )
 
-    scaler_model, scaler_model_loaded = load_pyspark_model_from_trained_parameters(
-        trained_parameters, StandardScalerModel, "scaler_model"
+    return process_numeric_multi_column_max_absolute_scaler(
+        df,
+        input_columns=[input_column],
+        output_columns=[output_column] if output_column else None,
+        trained_parameters=trained_parameters,
     )
 
-    if scaler_model is None:
-        scaler = StandardScaler(
-            inputCol=temp_vector_col,
-            outputCol=temp_normalized_vector_col,
-            withStd=parse_parameter(bool, scale, "scale", True),
-            withMean=parse_parameter(bool, center, "center", False),
+
+def process_numeric_upgrade_legacy_scaler_parameters(
+    trained_parameters, legacy_operator_parameters, operator_parameters, input_column, model_factory, to_statistics
+):
+    """Converts trained parameters stored by the Spark ML based single column scalers.
+
+    Those were hashed with the "input_column" operator parameter and kept the fitted model as "scaler_model". The
+    statistics of that model are stored as "scaler_statistics" under the hash of the multi column operator
+    parameters, so existing flows keep their fit instead of being refitted.
+    """
+    if not trained_parameters or trained_parameters.get("_hash") != hash_parameters(legacy_operator_parameters):
+        return trained_parameters
+
+    upgraded_parameters = {"_hash": hash_parameters(operator_parameters)}
+    scaler_model, _ = load_pyspark_model_from_trained_parameters(trained_parameters, model_factory, "scaler_model")
+    if scaler_model is not None:
+        statistics = {input_column: to_statistics(scaler_model)}
+        upgraded_parameters["scaler_statistics"] = encode_compact_parameters(statistics)
+    return upgraded_parameters
+
+
+def process_numeric_expects_numeric_column(df, input_column):
+    column_type = df.schema[input_column].dataType
+    if not isinstance(column_type, NumericType):
+        raise OperatorSparkOperatorCustomerError(
+            f'Numeric column required. Please cast column to a numeric type first. Column "{input_column}" has type {column_type.simpleString()}.'
         )
-        scaler_model = fit_and_save_model(trained_parameters, "scaler_model", scaler, assembled_wo_nans)
 
-    output_df = transform_using_trained_model(scaler_model, assembled, scaler_model_loaded)
 
-    # convert the resulting vector back to numeric
-    temp_flattened_vector_col = temp_col_name(output_df)
-    output_df = output_df.withColumn(temp_flattened_vector_col, vector_to_array(temp_normalized_vector_col))
+def process_numeric_scale_values(df, **kwargs):
+    return dispatch(
+        "scaler",
+        [df],
+        kwargs,
+        {
+            "Standard scaler": (process_numeric_standard_scaler, "standard_scaler_parameters"),
+            "Robust scaler": (process_numeric_robust_scaler, "robust_scaler_parameters"),
+            "Min-max scaler": (process_numeric_min_max_scaler, "min_max_scaler_parameters"),
+            "Max absolute scaler": (process_numeric_max_absolute_scaler, "max_absolute_scaler_parameters"),
+        },
+    )
+
+
+def process_numeric_multi_column_standard_scaler(
+    df, input_columns=None, center=None, scale=None, output_columns=None, trained_parameters=None
+):
+    input_columns, output_columns = process_numeric_expects_numeric_columns(df, input_columns, output_columns)
+    with_mean = parse_parameter(bool, center, "center", False)
+    with_std = parse_parameter(bool, scale, "scale", True)
 
-    # keep only the final scaled column.
-    output_column = input_column if output_column is None or not output_column else output_column
-    output_column_value = sf.col(temp_flattened_vector_col)[0].alias(output_column)
-    output_df = output_df.withColumn(output_column, output_column_value)
-    final_columns = list(dict.fromkeys((list(df.columns) + [output_column])))
-    output_df = output_df.select(final_columns)
+    trained_parameters = load_trained_parameters(
+        trained_parameters, {"input_columns": input_columns, "center": center, "scale": scale}
+    )
+    statistics = fit_scaler_statistics(
+        trained_parameters,
+        "scaler_statistics",
+        df,
+        input_columns,
+        # Like the Spark ML StandardScaler, a column with a single valid value has a standard deviation of 0.
+        {"mean": "avg({})", "std": "coalesce(stddev_samp({}), CAST(0 AS DOUBLE))"},
+    )
 
+    scaled_columns = {}
+    for input_column, output_column in zip(input_columns, output_columns):
+        mean, std = statistics[input_column]["mean"], statistics[input_column]["std"]
+        value = process_numeric_column_as_double(input_column)
+        if with_mean:
+            value = value - sf.lit(mean)
+        if with_std and std != 0.0:
+            value = value / sf.lit(std)
+        elif with_std:
+            value = sf.when(value.isNull() | sf.isnan(value), value).otherwise(0.0)
+        scaled_columns[output_column] = value
+
+    output_df = process_numeric_select_scaled_columns(df, scaled_columns)
     return default_spark_with_trained_parameters(output_df, trained_parameters)
 
 
-def process_numeric_robust_scaler(
+def process_numeric_multi_column_robust_scaler(
     df,
-    input_column=None,
+    input_columns=None,
     lower_quantile=None,
     upper_quantile=None,
     center=None,
     scale=None,
-    output_column=None,
+    output_columns=None,
     trained_parameters=None,
 ):
-    expects_column(df, input_column, "Input column")
-    expects_valid_column_name(output_column, "Output column", nullable=True)
-    process_numeric_expects_numeric_column(df, input_column)
-
-    temp_vector_col = temp_col_name(df)
-    assembled = VectorAssembler(inputCols=[input_column], outputCol=temp_vector_col, handleInvalid="keep").transform(df)
-    assembled_wo_nans = VectorAssembler(
-        inputCols=[input_column], outputCol=temp_vector_col, handleInvalid="skip"
-    ).transform(df)
-    temp_normalized_vector_col = temp_col_name(assembled)
+    input_columns, output_columns = process_numeric_expects_numeric_columns(df, input_columns, output_columns)
+    lower = parse_parameter(float, lower_quantile, "lower_quantile", 0.25)
+    upper = parse_parameter(float, upper_quantile, "upper_quantile", 0.75)
+    with_centering = parse_parameter(bool, center, "with_centering", False)
+    with_scaling = parse_parameter(bool, scale, "with_scaling", True)
 
     trained_parameters = load_trained_parameters(
         trained_parameters,
         {
-            "input_column": input_column,
+            "input_columns": input_columns,
             "center": center,
             "scale": scale,
             "lower_quantile": lower_quantile,
             "upper_quantile": upper_quantile,
         },
     )
-
-    scaler_model, scaler_model_loaded = load_pyspark_model_from_trained_parameters(
-        trained_parameters, RobustScalerModel, "scaler_model"
+    # Same accuracy as the default relative error (0.001) of the Spark ML RobustScaler.
+    statistics = fit_scaler_statistics(
+        trained_parameters,
+        "scaler_statistics",
+        df,
+        input_columns,
+        {"quantiles": f"percentile_approx({{}}, array({lower}, 0.5, {upper}), 1000)"},
     )
 
-    if scaler_model is None:
-        scaler = RobustScaler(
-            inputCol=temp_vector_col,
-            outputCol=temp_normalized_vector_col,
-            lower=parse_parameter(float, lower_quantile, "lower_quantile", 0.25),
-            upper=parse_parameter(float, upper_quantile, "upper_quantile", 0.75),
-            withCentering=parse_parameter(bool, center, "with_centering", False),
-            withScaling=parse_parameter(bool, scale, "with_scaling", True),
-        )
-        scaler_model = fit_and_save_model(trained_parameters, "scaler_model", scaler, assembled_wo_nans)
-
-    output_df = transform_using_trained_model(scaler_model, assembled, scaler_model_loaded)
-
-    # convert the resulting vector back to numeric
-    temp_flattened_vector_col = temp_col_name(output_df)
-    output_df = output_df.withColumn(temp_flattened_vector_col, vector_to_array(temp_normalized_vector_col))
-
-    # keep only the final scaled column.
-    output_column = input_column if output_column is None or not output_column else output_column
-    output_column_value = sf.col(temp_flattened_vector_col)[0].alias(output_column)
-    output_df = output_df.withColumn(output_column, output_column_value)
-    final_columns = list(dict.fromkeys((list(df.columns) + [output_column])))
-    output_df = output_df.select(final_columns)
+    scaled_columns = {}
+    for input_column, output_column in zip(input_columns, output_columns):
+        lower_value, median, upper_value = statistics[input_column]["quantiles"]
+        value = process_numeric_column_as_double(input_column)
+        if with_centering:
+            value = value - sf.lit(median)
+        if with_scaling:
+            quantile_range = upper_value - lower_value
+            if quantile_range != 0.0:
+                value = value / sf.lit(quantile_range)
+            else:
+                value = sf.when(value.isNull() | sf.isnan(value), value).otherwise(0.0)
+        scaled_columns[output_column] = value
 
+    output_df = process_numeric_select_scaled_columns(df, scaled_columns)
     return default_spark_with_trained_parameters(output_df, trained_parameters)
 
 
-def process_numeric_min_max_scaler(
-    df, input_column=None, min=None, max=None, output_column=None, trained_parameters=None
+def process_numeric_multi_column_min_max_scaler(
+    df, input_columns=None, min=None, max=None, output_columns=None, trained_parameters=None
 ):
-    expects_column(df, input_column, "Input column")
-    expects_valid_column_name(output_column, "Output column", nullable=True)
-    process_numeric_expects_numeric_column(df, input_column)
-
-    temp_vector_col = temp_col_name(df)
-    assembled = VectorAssembler(inputCols=[input_column], outputCol=temp_vector_col, handleInvalid="keep").transform(df)
-    assembled_wo_nans = VectorAssembler(
-        inputCols=[input_column], outputCol=temp_vector_col, handleInvalid="skip"
-    ).transform(df)
-    temp_normalized_vector_col = temp_col_name(assembled)
+    input_columns, output_columns = process_numeric_expects_numeric_columns(df, input_columns, output_columns)
+    min_value = parse_parameter(float, min, "min", 0.0)
+    max_value = parse_parameter(float, max, "max", 1.0)
 
     trained_parameters = load_trained_parameters(
-        trained_parameters, {"input_column": input_column, "min": min, "max": max,}
+        trained_parameters, {"input_columns": input_columns, "min": min, "max": max,}
     )
-
-    scaler_model, scaler_model_loaded = load_pyspark_model_from_trained_parameters(
-        trained_parameters, MinMaxScalerModel, "scaler_model"
+    statistics = fit_scaler_statistics(
+        trained_parameters, "scaler_statistics", df, input_columns, {"min": "min({})", "max": "max({})"},
     )
 
-    if scaler_model is None:
-        scaler = MinMaxScaler(
-            inputCol=temp_vector_col,
-            outputCol=temp_normalized_vector_col,
-            min=parse_parameter(float, min, "min", 0.0),
-            max=parse_parameter(float, max, "max", 1.0),
-        )
-        scaler_model = fit_and_save_model(trained_parameters, "scaler_model", scaler, assembled_wo_nans)
-
-    output_df = transform_using_trained_model(scaler_model, assembled, scaler_model_loaded)
-
-    # convert the resulting vector back to numeric
-    temp_flattened_vector_col = temp_col_name(output_df)
-    output_df = output_df.withColumn(temp_flattened_vector_col, vector_to_array(temp_normalized_vector_col))
-
-    # keep only the final scaled column.
-    output_column = input_column if output_column is None or not output_column else output_column
-    output_column_value = sf.col(temp_flattened_vector_col)[0].alias(output_column)
-    output_df = output_df.withColumn(output_column, output_column_value)
-    final_columns = list(dict.fromkeys((list(df.columns) + [output_column])))
-    output_df = output_df.select(final_columns)
+    scaled_columns = {}
+    for input_column, output_column in zip(input_columns, output_columns):
+        original_min, original_max = statistics[input_column]["min"], statistics[input_column]["max"]
+        value = process_numeric_column_as_double(input_column)
+        original_range = original_max - original_min
+        if original_range != 0.0:
+            value = (value - sf.lit(original_min)) / sf.lit(original_range) * sf.lit(max_value - min_value)
+            value = value + sf.lit(min_value)
+        else:
+            value = sf.when(value.isNull() | sf.isnan(value), value).otherwise(sf.lit(0.5 * (max_value + min_value)))
+        scaled_columns[output_column] = value
 
+    output_df = process_numeric_select_scaled_columns(df, scaled_columns)
     return default_spark_with_trained_parameters(output_df, trained_parameters)
 
 
-def process_numeric_max_absolute_scaler(df, input_column=None, output_column=None, trained_parameters=None):
-    expects_column(df, input_column, "Input column")
-    expects_valid_column_name(output_column, "Output column", nullable=True)
-    process_numeric_expects_numeric_column(df, input_column)
+def process_numeric_multi_column_max_absolute_scaler(
+    df, input_columns=None, output_columns=None, trained_parameters=None
+):
+    input_columns, output_columns = process_numeric_expects_numeric_columns(df, input_columns, output_columns)
 
-    temp_vector_col = temp_col_name(df)
-    assembled = VectorAssembler(inputCols=[input_column], outputCol=temp_vector_col, handleInvalid="keep").transform(df)
-    assembled_wo_nans = VectorAssembler(
-        inputCols=[input_column], outputCol=temp_vector_col, handleInvalid="skip"
-    ).transform(df)
-    temp_normalized_vector_col = temp_col_name(assembled)
+    trained_parameters = load_trained_parameters(trained_parameters, {"input_columns": input_columns,})
+    statistics = fit_scaler_statistics(
+        trained_parameters,
+        "scaler_statistics",
+        df,
+        input_columns,
+        {"max_abs": "max(abs({}))"},
+    )
 
-    trained_parameters = load_trained_parameters(trained_parameters, {"input_column": input_column,})
+    scaled_columns = {}
+    for input_column, output_column in zip(input_columns, output_columns):
+        max_abs = statistics[input_column]["max_abs"]
+        value = process_numeric_column_as_double(input_column)
+        scaled_columns[output_column] = value / sf.lit(max_abs) if max_abs != 0.0 else value
 
-    scaler_model, scaler_model_loaded = load_pyspark_model_from_trained_parameters(
-        trained_parameters, MinMaxScalerModel, "scaler_model"
-    )
+    output_df = process_numeric_select_scaled_columns(df, scaled_columns)
+    return default_spark_with_trained_parameters(output_df, trained_parameters)
 
-    if scaler_model is None:
-        scaler = MinMaxScaler(inputCol=temp_vector_col, outputCol=temp_normalized_vector_col)
-        scaler_model = fit_and_save_model(trained_parameters, "scaler_model", scaler, assembled_wo_nans)
 
-    output_df = transform_using_trained_model(scaler_model, assembled, scaler_model_loaded)
+def process_numeric_expects_numeric_columns(df, input_columns, output_columns):
+    """Validates the multi column scaler parameters and returns the input and output column lists.
 
-    scaler = MaxAbsScaler(inputCol=temp_vector_col, outputCol=temp_normalized_vector_col)
+    Output columns default to the input columns, i.e. the inputs are scaled in place.
+    """
+    if isinstance(input_columns, str):
+        input_columns = [input_columns]
+    expects_parameter(input_columns, "Input columns", condition=len(input_columns or []) > 0)
+    input_columns = list(dict.fromkeys(input_columns))
+    for input_column in input_columns:
+        expects_column(df, input_column, "Input columns")
+        process_numeric_expects_numeric_column(df, input_column)
+
+    if not output_columns:
+        return input_columns, input_columns
+    if isinstance(output_columns, str):
+        output_columns = [output_columns]
+    expects_parameter(output_columns, "Output columns", condition=len(output_columns) == len(input_columns))
+    for output_column in output_columns:
+        expects_valid_column_name(output_column, "Output columns")
+    output_columns = [
+        output_column if output_column else input_column
+        for input_column, output_column in zip(input_columns, output_columns)
+    ]
+    return input_columns, output_columns
+
+
+def process_numeric_column_as_double(input_column):
+    """Mirrors VectorAssembler(handleInvalid="keep"), which turns missing values into NaN."""
+    return sf.coalesce(sf.col(f"`{input_column}`").cast("double"), sf.lit(float("nan")))
+
+
+def fit_scaler_statistics(trained_parameters, name, df, input_columns, aggregations):
+    """Computes the statistics of all input columns in a single aggregation and stores them as trained parameters.
+
+    Like VectorAssembler(handleInvalid="skip") for the Spark ML scalers, null and NaN values are ignored. The
+    statistics are stored with encode_compact_parameters and previously fitted statistics are reused when they are
+    present in the trained parameters.
 
-    output_df = scaler.fit(assembled_wo_nans).transform(assembled)
+    Args:
+        trained_parameters: trained parameters of the operator, updated with the fitted statistics
+        name: key of the statistics in the trained parameters
+        df: spark dataframe to fit on
+        input_columns: numeric columns to fit
+        aggregations: dict mapping a statistic name to a spark-sql aggregate expression, with {} as the placeholder
+            for the column
 
-    # convert the resulting vector back to numeric
-    temp_flattened_vector_col = temp_col_name(output_df)
-    output_df = output_df.withColumn(temp_flattened_vector_col, vector_to_array(temp_normalized_vector_col))
+    Returns: dict mapping each input column to a dict of statistic name to value
 
-    # keep only the final scaled column.
-    output_column = input_column if output_column is None or not output_column else output_column
-    output_column_value = sf.col(temp_flattened_vector_col)[0].alias(output_column)
-    output_df = output_df.withColumn(output_column, output_column_value)
-    final_columns = list(dict.fromkeys((list(df.columns) + [output_column])))
-    output_df = output_df.select(final_columns)
+    """
+    statistics = load_compact_parameters(trained_parameters, name)
+    if statistics is not None and all(column in statistics for column in input_columns):
+        return statistics
+
+    aggregate_expr = []
+    for idx, input_column in enumerate(input_columns):
+        column = f"CAST(`{input_column}` AS DOUBLE)"
+        column = f"CASE WHEN isnan({column}) THEN NULL ELSE {column} END"
+        for statistic, aggregation in aggregations.items():
+            aggregate_expr.append(f"{aggregation.format(column)} AS `{idx}_{statistic}`")
+    row = df.selectExpr(*aggregate_expr).collect()[0].asDict()
+
+    statistics = {}
+    for idx, input_column in enumerate(input_columns):
+        column_statistics = {statistic: row[f"{idx}_{statistic}"] for statistic in aggregations}
+        if any(value is None for value in column_statistics.values()):
+            raise OperatorSparkOperatorCustomerError(
+                f'Unable to fit scaler. Column "{input_column}" does not contain any valid numeric values.'
+            )
+        statistics[input_column] = column_statistics
 
-    return default_spark_with_trained_parameters(output_df, trained_parameters)
+    trained_parameters[name] = encode_compact_parameters(statistics)
+    return statistics
 
 
-def process_numeric_expects_numeric_column(df, input_column):
-    column_type = df.schema[input_column].dataType
-    if not isinstance(column_type, NumericType):
-        raise OperatorSparkOperatorCustomerError(
-            f'Numeric column required. Please cast column to a numeric type first. Column "{input_column}" has type {column_type.simpleString()}.'
-        )
+def process_numeric_select_scaled_columns(df, scaled_columns):
+    """Replaces or appends the scaled columns with a single projection."""
+    scaled_columns = dict(scaled_columns)
+    projection = [
+        scaled_columns.pop(column).alias(column) if column in scaled_columns else sf.col(f"`{column}`")
+        for column in df.columns
+    ]
+    projection += [value.alias(column) for column, value in scaled_columns.items()]
+    return df.select(*projection)
 
 
-def process_numeric_scale_values(df, **kwargs):
+def process_numeric_scale_columns(df, **kwargs):
     return dispatch(
         "scaler",
         [df],
         kwargs,
         {
-            "Standard scaler": (process_numeric_standard_scaler, "standard_scaler_parameters"),
-            "Robust scaler": (process_numeric_robust_scaler, "robust_scaler_parameters"),
-            "Min-max scaler": (process_numeric_min_max_scaler, "min_max_scaler_parameters"),
-            "Max absolute scaler": (process_numeric_max_absolute_scaler, "max_absolute_scaler_parameters"),
+            "Standard scaler": (process_numeric_multi_column_standard_scaler, "standard_scaler_parameters"),
+            "Robust scaler": (process_numeric_multi_column_robust_scaler, "robust_scaler_parameters"),
+            "Min-max scaler": (process_numeric_multi_column_min_max_scaler, "min_max_scaler_parameters"),
+            "Max absolute scaler": (
+                process_numeric_multi_column_max_absolute_scaler,
+                "max_absolute_scaler_parameters",
+            ),
         },
     )
 
@@ -467,14 +634,20 @@ def athena_delete_tmp_table(glue_client, ctas_table_name):
                 )
 
 
+ATHENA_CREATED_DATABASES = set()
+
+
 def athena_create_database_if_not_exists(glue_client):
     # This method creates the sagemaker_data_wranger database in the Glue data catalog if it doesn't exist
     # already. This database is used to create and delete temporary tables that are created by the Athena CTAS
-    # execution. Method is a no-op if the database exists already.
+    # execution. Method is a no-op if the database exists already or was created earlier in this process.
 
     database_name = "sagemaker_data_wrangler"
+    if database_name in ATHENA_CREATED_DATABASES:
+        return
     create_database_request = {"DatabaseInput": {"Name": database_name}}
     glue_create_database_core(client=glue_client, request=create_database_request)
+    ATHENA_CREATED_DATABASES.add(database_name)
 
 
 def athena_start_query_execution(dataset_definition, client):
@@ -518,6 +691,88 @@ def athena_start_query_execution(dataset_definition, client):
     }
 
 
+def athena_wait_for_query_executions(
+    client, query_execution_ids, initial_delay=0.5, max_delay=10.0, backoff_factor=2.0, sleep=None
+):
+    """Polls several Athena query executions until none of them is QUEUED or RUNNING.
+
+    The delay between polling rounds starts at initial_delay and grows by backoff_factor up to max_delay, so short
+    queries return quickly while long ones are not polled needlessly.
+
+    Returns: dict mapping query execution id to its last `get_query_execution` response
+    """
+    import time
+
+    sleep = time.sleep if sleep is None else sleep
+    responses = {}
+    pending = list(dict.fromkeys(query_execution_ids))
+    delay = initial_delay
+    while True:
+        still_pending = []
+        for query_execution_id in pending:
+            request = {"QueryExecutionId": query_execution_id}
+            response = athena_get_query_execution_core(client=client, request=request)
+            responses[query_execution_id] = response
+            state = athena_parse_query_execution_state(get_query_execution_response=response).upper()
+            if state in ("RUNNING", "QUEUED"):
+                still_pending.append(query_execution_id)
+        pending = still_pending
+        if not pending:
+            return responses
+        sleep(delay)
+        delay = min(delay * backoff_factor, max_delay)
+
+
+def athena_query_hash(dataset_definition):
+    """Identifies the result of an Athena dataset definition, used to reuse the output of identical queries."""
+    import hashlib
+    import json
+
+    key = {
+        name: dataset_definition.get(name)
+        for name in ("catalogName", "databaseName", "queryString", "outputFormat", "s3OutputLocation")
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def athena_default_result_manifest_path():
+    import os
+    import tempfile
+
+    return os.path.join(tempfile.gettempdir(), "sagemaker_data_wrangler_athena_results.json")
+
+
+def athena_load_result_manifest(manifest_path):
+    import json
+
+    try:
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning("Ignoring unreadable Athena result manifest %s: %s", manifest_path, e)
+        return {}
+
+
+def athena_save_result_manifest(manifest_path, manifest):
+    import json
+    import os
+
+    tmp_path = f"{manifest_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(tmp_path, manifest_path)
+
+
+def athena_find_reusable_result(manifest, query_hash, reuse_ttl_seconds, now):
+    """Returns the manifest entry of an identical query that completed less than reuse_ttl_seconds ago."""
+    entry = manifest.get(query_hash)
+    if entry is None or now - entry["completed_at"] > reuse_ttl_seconds:
+        return None
+    return entry
+
+
 from enum import Enum
 
 from pyspark.sql.types import BooleanType, DateType, DoubleType, LongType, StringType
@@ -866,6 +1121,64 @@ def expects_parameter_value_in_list(key, value, items):
         raise OperatorSparkOperatorCustomerError(f"Illegal parameter value. {key} expected to be in {items}, but given {value}")
 
 
+import hashlib
+import json
+from collections import OrderedDict
+
+
+def encode_compact_parameters(values):
+    """Encodes the fitted values of a simple operator (e.g. scaler statistics) as plain JSON.
+
+    Complex estimators keep using encode_pyspark_model. The content hash guards against stored values that were
+    modified or truncated.
+    """
+    serialized = json.dumps(values, sort_keys=True, separators=(",", ":"))
+    return {
+        "format": "json",
+        "content_hash": hashlib.sha256(serialized.encode("utf-8")).hexdigest(),
+        "values": json.loads(serialized),
+    }
+
+
+def decode_compact_parameters(encoded):
+    if not isinstance(encoded, dict) or encoded.get("format") != "json":
+        raise ValueError(f"Unsupported trained parameters format: {type(encoded).__name__}")
+    serialized = json.dumps(encoded["values"], sort_keys=True, separators=(",", ":"))
+    if hashlib.sha256(serialized.encode("utf-8")).hexdigest() != encoded.get("content_hash"):
+        raise ValueError("Content hash of trained parameters does not match their values")
+    return encoded["values"]
+
+
+def load_compact_parameters(trained_parameters, name):
+    if trained_parameters is None or name not in trained_parameters:
+        return None
+
+    try:
+        return decode_compact_parameters(trained_parameters[name])
+    except Exception as e:
+        logging.error(f"Could not decode {name} from trained_parameters: {e}")
+        del trained_parameters[name]
+        return None
+
+
+# Decoded models keyed by (operator parameters _hash, name, content hash of the encoded model), so that repeated
+# executions in the same process do not unzip and load the model through the JVM again.
+PYSPARK_MODEL_CACHE = OrderedDict()
+PYSPARK_MODEL_CACHE_SIZE = 32
+
+
+def pyspark_model_cache_key(trained_parameters, name):
+    encoded = trained_parameters[name]
+    return trained_parameters.get("_hash"), name, hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def cache_pyspark_model(key, model):
+    PYSPARK_MODEL_CACHE[key] = model
+    PYSPARK_MODEL_CACHE.move_to_end(key)
+    while len(PYSPARK_MODEL_CACHE) > PYSPARK_MODEL_CACHE_SIZE:
+        PYSPARK_MODEL_CACHE.popitem(last=False)
+
+
 def encode_pyspark_model(model):
     with tempfile.TemporaryDirectory() as dirpath:
         dirpath = os.path.join(dirpath, "model")
@@ -927,7 +1240,12 @@ def load_pyspark_model_from_trained_parameters(trained_parameters, model_factory
         return None, False
 
     try:
+        cache_key = pyspark_model_cache_key(trained_parameters, name)
+        if cache_key in PYSPARK_MODEL_CACHE and isinstance(PYSPARK_MODEL_CACHE[cache_key], model_factory):
+            PYSPARK_MODEL_CACHE.move_to_end(cache_key)
+            return PYSPARK_MODEL_CACHE[cache_key], True
         model = decode_pyspark_model(model_factory, trained_parameters[name])
+        cache_pyspark_model(cache_key, model)
         return model, True
     except Exception as e:
         logging.error(f"Could not decode PySpark model {name} from trained_parameters: {e}")
@@ -938,6 +1256,7 @@ def load_pyspark_model_from_trained_parameters(trained_parameters, model_factory
 def fit_and_save_model(trained_parameters, name, algorithm, df):
     model = algorithm.fit(df)
     trained_parameters[name] = encode_pyspark_model(model)
+    cache_pyspark_model(pyspark_model_cache_key(trained_parameters, name), model)
     return model
 
 
@@ -967,31 +1286,30 @@ from pyspark.sql.types import (
 
 
 
-def type_inference(df):  # noqa: C901 # pylint: disable=R0912
+TYPE_INFERENCE_METHODS = ("pandas", "spark", "elementwise")
+
+
+def type_inference(df, method="pandas"):  # noqa: C901 # pylint: disable=R0912
     """Core type inference logic
 
     Args:
         df: spark dataframe
+        method: how the per column insights are computed. "pandas" runs vectorized predicates over the
+            collected sample, "spark" computes all predicates for all string columns in a single aggregation
+            without collecting the sample, "elementwise" applies the scalar predicates cell by cell.
 
     Returns: dict a schema that maps from column name to mohave datatype
 
     """
+    expects_parameter_value_in_list("method", method, TYPE_INFERENCE_METHODS)
     columns_to_infer = [col for (col, col_type) in df.dtypes if col_type == "string"]
 
-    pandas_df = df.toPandas()
-    report = {}
-    for (columnName, _) in pandas_df.iteritems():
-        if columnName in columns_to_infer:
-            column = pandas_df[columnName].values
-            report[columnName] = {
-                "sum_string": len(column),
-                "sum_numeric": sum_is_numeric(column),
-                "sum_integer": sum_is_integer(column),
-                "sum_boolean": sum_is_boolean(column),
-                "sum_date": sum_is_date(column),
-                "sum_null_like": sum_is_null_like(column),
-                "sum_null": sum_is_null(column),
-            }
+    if method == "spark":
+        report = type_inference_report_spark(df, columns_to_infer)
+    elif method == "pandas":
+        report = type_inference_report_pandas(df, columns_to_infer)
+    else:
+        report = type_inference_report_elementwise(df, columns_to_infer)
 
     # Analyze
     numeric_threshold = 0.8
@@ -1031,6 +1349,143 @@ def type_inference(df):  # noqa: C901 # pylint: disable=R0912
     return column_types
 
 
+def type_inference_report_elementwise(df, columns_to_infer):
+    """Computes the type inference insights by applying the scalar predicates to every cell"""
+    pandas_df = df.toPandas()
+    report = {}
+    for (columnName, _) in pandas_df.iteritems():
+        if columnName in columns_to_infer:
+            column = pandas_df[columnName].values
+            report[columnName] = {
+                "sum_string": len(column),
+                "sum_numeric": sum_is_numeric(column),
+                "sum_integer": sum_is_integer(column),
+                "sum_boolean": sum_is_boolean(column),
+                "sum_date": sum_is_date(column),
+                "sum_null_like": sum_is_null_like(column),
+                "sum_null": sum_is_null(column),
+            }
+    return report
+
+
+INTEGER_REGEX = r"^\s*[+-]?[0-9]+\s*$"
+DATE_REGEX = r"^[0-9]{4}-[0-9]{2}-[0-9]{2}$"
+NULL_LIKE_REGEX = r"(?i)^(null|none|nil|na|nan)"
+WHITESPACE_REGEX = r"^\s+$"
+
+
+def type_inference_report_pandas(df, columns_to_infer):
+    """Computes the type inference insights with vectorized pandas predicates, one pass per predicate and column"""
+    if not columns_to_infer:
+        return {}
+
+    pandas_df = df.select(*[f"`{col}`" for col in columns_to_infer]).toPandas()
+    report = {}
+    for col in columns_to_infer:
+        report[col] = type_inference_insights_pandas(pandas_df[col])
+    return report
+
+
+def type_inference_insights_pandas(column):
+    """Vectorized equivalent of the sum_is_* helpers for a single pandas series of strings"""
+    strings = column.astype(object)
+
+    numbers = pd.to_numeric(strings, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    is_numeric = np.isfinite(numbers)
+    is_integer = is_numeric & strings.str.match(INTEGER_REGEX, na=False).to_numpy(dtype=bool)
+
+    is_boolean = strings.str.lower().isin(["true", "false"])
+
+    date_like = strings.str.match(DATE_REGEX, na=False)
+    is_date = pd.to_datetime(strings.where(date_like), format="%Y-%m-%d", errors="coerce").notna()
+
+    num_is_null_like = (
+        np.count_nonzero(strings.str.len().eq(0))
+        + np.count_nonzero(strings.str.match(NULL_LIKE_REGEX, na=False))
+        + np.count_nonzero(strings.str.match(WHITESPACE_REGEX, na=False))
+    )
+
+    return {
+        "sum_string": len(strings),
+        "sum_numeric": np.count_nonzero(is_numeric),
+        "sum_integer": np.count_nonzero(is_integer),
+        "sum_boolean": np.count_nonzero(is_boolean),
+        "sum_date": np.count_nonzero(is_date),
+        "sum_null_like": num_is_null_like,
+        "sum_null": np.count_nonzero(pd.isnull(strings)),
+    }
+
+
+def type_inference_report_spark(df, columns_to_infer):
+    """Computes the type inference insights for all string columns in a single Spark aggregation
+
+    CAST to double yields null for values that cannot be parsed when ANSI mode is disabled (the Spark 3.0
+    default), so it is used in place of try_cast which only exists from Spark 3.2 onwards.
+    """
+    if not columns_to_infer:
+        return {}
+
+    def count_if(condition):
+        return f.sum(f.when(condition, 1).otherwise(0))
+
+    aggregations = [f.count(f.lit(1)).alias("sum_string")]
+    for idx, col_name in enumerate(columns_to_infer):
+        column = f.col(f"`{col_name}`")
+        as_double = column.cast(DoubleType())
+        is_numeric = as_double.isNotNull() & ~f.isnan(as_double) & (f.abs(as_double) != float("inf"))
+        is_null_like = (
+            count_if(f.length(column) == 0)
+            + count_if(column.rlike(NULL_LIKE_REGEX))
+            + count_if(column.rlike(WHITESPACE_REGEX))
+        )
+        aggregations += [
+            count_if(is_numeric).alias(f"{idx}_sum_numeric"),
+            count_if(is_numeric & column.rlike(INTEGER_REGEX)).alias(f"{idx}_sum_integer"),
+            count_if(f.lower(column).isin("true", "false")).alias(f"{idx}_sum_boolean"),
+            count_if(column.rlike(DATE_REGEX) & f.to_date(column, "yyyy-MM-dd").isNotNull()).alias(
+                f"{idx}_sum_date"
+            ),
+            is_null_like.alias(f"{idx}_sum_null_like"),
+            count_if(column.isNull()).alias(f"{idx}_sum_null"),
+        ]
+
+    row = df.agg(*aggregations).collect()[0].asDict()
+    report = {}
+    for idx, col_name in enumerate(columns_to_infer):
+        insights = {"sum_string": row["sum_string"]}
+        for key in ("sum_numeric", "sum_integer", "sum_boolean", "sum_date", "sum_null_like", "sum_null"):
+            insights[key] = row[f"{idx}_{key}"] or 0
+        report[col_name] = insights
+    return report
+
+
+def benchmark_type_inference(df, methods=TYPE_INFERENCE_METHODS, repeats=3):
+    """Times type_inference for each method on the same dataframe
+
+    Args:
+        df: spark dataframe, typically the inference sample
+        methods: type inference methods to compare
+        repeats: number of runs per method, the fastest run is reported
+
+    Returns: dict mapping method to a dict with the best wall clock time in seconds and the inferred schema
+
+    """
+    import time
+
+    df = df.cache()
+    df.count()
+    results = {}
+    for method in methods:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            schema = type_inference(df, method=method)
+            timings.append(time.perf_counter() - start)
+        results[method] = {"seconds": min(timings), "schema": schema}
+    df.unpersist()
+    return results
+
+
 def _is_numeric_single(x):
     try:
         x_float = float(x)
@@ -1202,65 +1657,163 @@ def validate_schema(df, schema):
             )
 
 
-def athena_source(spark, mode, dataset_definition, trained_parameters=None):  # noqa: C901
+def athena_source(
+    spark, mode, dataset_definition, trained_parameters=None, reuse_ttl_seconds=None, result_manifest_path=None
+):
     """Represents a source that handles Athena.
 
     Note: Input dataset_definition is a Mohave specific dataset definition and is different from Processing Job
     dataset definition.
+
+    When reuse_ttl_seconds is set, the Parquet output of an identical query that completed within the TTL is read
+    directly instead of executing the query again. Completed queries are recorded in a local manifest.
     """
+    return athena_sources(
+        spark,
+        mode,
+        [dataset_definition],
+        reuse_ttl_seconds=reuse_ttl_seconds,
+        result_manifest_path=result_manifest_path,
+    )[0]
 
-    import time
+
+def athena_sources(spark, mode, dataset_definitions, reuse_ttl_seconds=None, result_manifest_path=None):
+    """Represents several Athena sources whose queries are started concurrently.
+
+    Returns: list with one source output per dataset definition, in the same order
+    """
     import boto3
 
     athena_client = boto3.client("athena")
     glue_client = boto3.client("glue")
 
-    athena_create_database_if_not_exists(glue_client=glue_client)
-    trained_parameters = athena_start_query_execution(dataset_definition=dataset_definition, client=athena_client)
-
-    query_execution_id = trained_parameters["query_execution_id"]
-    ctas_table_name = trained_parameters["ctas_table_name"]
-    request = {"QueryExecutionId": query_execution_id}
-    response = athena_get_query_execution_core(client=athena_client, request=request)
-    state = athena_parse_query_execution_state(get_query_execution_response=response).upper()
-
-    while state in ("RUNNING", "QUEUED"):
-        time.sleep(5)
-        response = athena_get_query_execution_core(client=athena_client, request=request)
-        state = athena_parse_query_execution_state(get_query_execution_response=response).upper()
-
-    if state == "SUCCEEDED":
-        ctas_s3_output_location = trained_parameters["ctas_s3_output_location"]
-        path = ctas_s3_output_location.replace("s3://", "s3a://")
-        athena_delete_tmp_table(glue_client=glue_client, ctas_table_name=ctas_table_name)
-        # clear ctas_table_name once we delete temp table
-        trained_parameters["ctas_table_name"] = ""
-        try:
-            return default_spark_with_trained_parameters_and_state(
-                df=spark.read.parquet(path), trained_parameters=trained_parameters, state=get_execution_state(state),
-            )
-        except Exception as e:
-            raise RuntimeError(
-                f"Error while reading Athena ctas output from S3 location: {path}, with the exception: {e}"
-            )
-    if state in ("FAILED", "CANCELLED"):
-        try:
-            message = response["QueryExecution"]["Status"]["StateChangeReason"]
-        except Exception as e:  # pylint: disable=W0703
-            message = str(e)
-            logging.error(message)
-        raise RuntimeError(f"Athena query execution did not complete with the following message: {message}")
+    return athena_sources_core(
+        spark,
+        dataset_definitions,
+        athena_client=athena_client,
+        glue_client=glue_client,
+        reuse_ttl_seconds=reuse_ttl_seconds,
+        result_manifest_path=result_manifest_path,
+    )
+
 
-    raise RuntimeError("Unknown Athena query state: {}".format(state))
+def athena_sources_core(  # noqa: C901
+    spark,
+    dataset_definitions,
+    athena_client,
+    glue_client,
+    reuse_ttl_seconds=None,
+    result_manifest_path=None,
+    sleep=None,
+    clock=None,
+):
+    import time
 
+    clock = time.time if clock is None else clock
+    reuse_results = reuse_ttl_seconds is not None and reuse_ttl_seconds > 0
+    result_manifest_path = result_manifest_path or athena_default_result_manifest_path()
+    manifest = athena_load_result_manifest(result_manifest_path) if reuse_results else {}
+    manifest_updated = False
 
-def infer_and_cast_type(df, spark, inference_data_sample_size=1000, trained_parameters=None):
+    outputs = [None] * len(dataset_definitions)
+    started = {}
+    # CTAS temp tables of started queries that still have to be deleted, also when a query fails.
+    tmp_table_names = {}
+    try:
+        for idx, dataset_definition in enumerate(dataset_definitions):
+            query_hash = athena_query_hash(dataset_definition)
+            reusable = None
+            if reuse_results:
+                reusable = athena_find_reusable_result(manifest, query_hash, reuse_ttl_seconds, clock())
+            if reusable is not None:
+                path = reusable["ctas_s3_output_location"].replace("s3://", "s3a://")
+                try:
+                    outputs[idx] = default_spark_with_trained_parameters_and_state(
+                        df=spark.read.parquet(path),
+                        trained_parameters={
+                            "query_execution_id": reusable["query_execution_id"],
+                            "ctas_table_name": "",
+                            "ctas_s3_output_location": reusable["ctas_s3_output_location"],
+                        },
+                        state=get_execution_state("SUCCEEDED"),
+                    )
+                    logging.debug("Reusing Athena query result %s for query hash %s", path, query_hash)
+                    continue
+                except Exception as e:  # pylint: disable=W0703
+                    logging.warning("Could not reuse Athena query result %s, executing the query again: %s", path, e)
+                    del manifest[query_hash]
+                    manifest_updated = True
+
+            athena_create_database_if_not_exists(glue_client=glue_client)
+            trained_parameters = athena_start_query_execution(
+                dataset_definition=dataset_definition, client=athena_client
+            )
+            started[idx] = (query_hash, trained_parameters)
+            tmp_table_names[idx] = trained_parameters["ctas_table_name"]
+
+        query_execution_ids = [trained_parameters["query_execution_id"] for _, trained_parameters in started.values()]
+        responses = athena_wait_for_query_executions(athena_client, query_execution_ids, sleep=sleep)
+
+        for idx, (query_hash, trained_parameters) in started.items():
+            response = responses[trained_parameters["query_execution_id"]]
+            state = athena_parse_query_execution_state(get_query_execution_response=response).upper()
+
+            if state == "SUCCEEDED":
+                ctas_table_name = trained_parameters["ctas_table_name"]
+                ctas_s3_output_location = trained_parameters["ctas_s3_output_location"]
+                path = ctas_s3_output_location.replace("s3://", "s3a://")
+                athena_delete_tmp_table(glue_client=glue_client, ctas_table_name=ctas_table_name)
+                del tmp_table_names[idx]
+                # clear ctas_table_name once we delete temp table
+                trained_parameters["ctas_table_name"] = ""
+                try:
+                    outputs[idx] = default_spark_with_trained_parameters_and_state(
+                        df=spark.read.parquet(path),
+                        trained_parameters=trained_parameters,
+                        state=get_execution_state(state),
+                    )
+                except Exception as e:
+                    raise RuntimeError(
+                        f"Error while reading Athena ctas output from S3 location: {path}, with the exception: {e}"
+                    )
+                if reuse_results:
+                    manifest[query_hash] = {
+                        "query_execution_id": trained_parameters["query_execution_id"],
+                        "ctas_s3_output_location": ctas_s3_output_location,
+                        "completed_at": clock(),
+                    }
+                    manifest_updated = True
+                continue
+            if state in ("FAILED", "CANCELLED"):
+                try:
+                    message = response["QueryExecution"]["Status"]["StateChangeReason"]
+                except Exception as e:  # pylint: disable=W0703
+                    message = str(e)
+                    logging.error(message)
+                raise RuntimeError(f"Athena query execution did not complete with the following message: {message}")
+
+            raise RuntimeError("Unknown Athena query state: {}".format(state))
+    finally:
+        for ctas_table_name in tmp_table_names.values():
+            try:
+                athena_delete_tmp_table(glue_client=glue_client, ctas_table_name=ctas_table_name)
+            except Exception as e:  # pylint: disable=W0703
+                logging.warning("Could not delete Athena temp table %s: %s", ctas_table_name, e)
+        if manifest_updated:
+            athena_save_result_manifest(result_manifest_path, manifest)
+    return outputs
+
+
+def infer_and_cast_type(
+    df, spark, inference_data_sample_size=1000, inference_method="pandas", trained_parameters=None
+):
     """Infer column types for spark dataframe and cast to inferred data type.
 
     Args:
         df: spark dataframe
         spark: spark session
         inference_data_sample_size: number of row data used for type inference
+        inference_method: one of TYPE_INFERENCE_METHODS, see type_inference
         trained_parameters: trained_parameters to determine if we need infer data types
 
     Returns: a dict of pyspark df with column data type casted and trained parameters
@@ -1273,7 +1826,7 @@ def infer_and_cast_type(df, spark, inference_data_sample_size=1000, trained_para
         # limit first 1000 rows to do type inference
 
         limit_df = df.limit(inference_data_sample_size)
-        schema = type_inference(limit_df)
+        schema = type_inference(limit_df, method=inference_method)
     else:
         schema = trained_parameters["schema"]
         try:
@@ -1291,7 +1844,13 @@ def infer_and_cast_type(df, spark, inference_data_sample_size=1000, trained_para
 def process_numeric(df, spark, **kwargs):
 
     return dispatch(
-        "operator", [df], kwargs, {"Scale values": (process_numeric_scale_values, "scale_values_parameters"),},
+        "operator",
+        [df],
+        kwargs,
+        {
+            "Scale values": (process_numeric_scale_values, "scale_values_parameters"),
+            "Scale columns": (process_numeric_scale_columns, "scale_columns_parameters"),
+        },
     )
 
 
@@ -0,0 +1,224 @@
+import ast
+import math
+import os
+import re
+import types
+
+import pytest
+
+pytest.importorskip("pyspark")
+pytest.importorskip("botocore")
+
+FLOW_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_wrangler_antje.py")
+
+
+def load_flow_definitions():
+    """Loads the operators of the exported flow script without creating its Spark session or running the flow."""
+    with open(FLOW_SCRIPT) as flow_script:
+        source = flow_script.read()
+    # The export keeps a truncated import of the Data Wrangler utils, which the script defines itself.
+    source = re.sub(r"^from sagemaker_dataprep\.[\w.]+ import \(\n(?:[ \t]+.*\n)*", "", source, flags=re.MULTILINE)
+    tree = ast.parse(source)
+    flow_names = re.compile(r"spark$|op_\d+_output$")
+    tree.body = [
+        node
+        for node in tree.body
+        if not (
+            isinstance(node, ast.Assign)
+            and any(isinstance(target, ast.Name) and flow_names.match(target.id) for target in node.targets)
+        )
+    ]
+    module = types.ModuleType("data_wrangler_antje")
+    exec(compile(tree, FLOW_SCRIPT, "exec"), module.__dict__)
+    return module
+
+
+@pytest.fixture(scope="module")
+def flow():
+    return load_flow_definitions()
+
+
+@pytest.fixture(scope="module")
+def spark():
+    from pyspark.sql import SparkSession
+
+    return SparkSession.builder.master("local[1]").getOrCreate()
+
+
+def baseline_scaler_model(spark, scaler, values):
+    from pyspark.ml.feature import VectorAssembler
+
+    df = spark.createDataFrame([(value,) for value in values], "x double")
+    assembled = VectorAssembler(inputCols=["x"], outputCol="vector").transform(df)
+    return scaler.setInputCol("vector").setOutputCol("scaled").fit(assembled)
+
+
+def test_standard_scaler_reuses_baseline_trained_parameters(flow, spark):
+    from pyspark.ml.feature import StandardScaler
+
+    scaler_model = baseline_scaler_model(spark, StandardScaler(withMean=True, withStd=True), [1.0, 3.0])
+    trained_parameters = {
+        "_hash": flow.hash_parameters({"input_column": "x", "center": True, "scale": True}),
+        "scaler_model": flow.encode_pyspark_model(scaler_model),
+    }
+    # Refitting on this dataframe would give a mean of 15.
+    df = spark.createDataFrame([(10.0,), (20.0,), (None,)], "x double")
+
+    for _ in range(2):
+        result = flow.process_numeric_standard_scaler(
+            df, input_column="x", center=True, scale=True, trained_parameters=trained_parameters
+        )
+        values = [row["x"] for row in result["default"].collect()]
+        assert values[:2] == pytest.approx([8.0 / math.sqrt(2.0), 18.0 / math.sqrt(2.0)])
+        assert math.isnan(values[2])
+        trained_parameters = result["trained_parameters"]
+
+    assert "scaler_model" not in trained_parameters
+    statistics = flow.decode_compact_parameters(trained_parameters["scaler_statistics"])
+    assert statistics == {"x": {"mean": pytest.approx(2.0), "std": pytest.approx(math.sqrt(2.0))}}
+
+
+def test_max_absolute_scaler_reuses_baseline_trained_parameters(flow, spark):
+    from pyspark.ml.feature import MinMaxScaler
+
+    scaler_model = baseline_scaler_model(spark, MinMaxScaler(), [-4.0, 2.0])
+    trained_parameters = {
+        "_hash": flow.hash_parameters({"input_column": "x",}),
+        "scaler_model": flow.encode_pyspark_model(scaler_model),
+    }
+    df = spark.createDataFrame([(1.0,), (8.0,)], "x double")
+
+    result = flow.process_numeric_max_absolute_scaler(
+        df, input_column="x", output_column="x_scaled", trained_parameters=trained_parameters
+    )
+
+    assert [row["x_scaled"] for row in result["default"].collect()] == pytest.approx([0.25, 2.0])
+    statistics = flow.decode_compact_parameters(result["trained_parameters"]["scaler_statistics"])
+    assert statistics == {"x": {"max_abs": 4.0}}
+
+
+def test_multi_column_scalers_keep_missing_values_of_constant_columns(flow, spark):
+    df = spark.createDataFrame([(5.0, 1.0), (None, 1.0), (float("nan"), None)], "single double, constant double")
+
+    for operator in (
+        flow.process_numeric_multi_column_standard_scaler,
+        flow.process_numeric_multi_column_robust_scaler,
+    ):
+        result = operator(df, input_columns=["single", "constant"])
+        rows = result["default"].collect()
+        assert [row["single"] for row in rows][0] == 0.0
+        assert all(math.isnan(row["single"]) for row in rows[1:])
+        assert [row["constant"] for row in rows][:2] == [0.0, 0.0]
+        assert math.isnan(rows[2]["constant"])
+
+
+class StubAthenaClient:
+    """Returns the given states, one per `get_query_execution` call, for the queries in the order they start."""
+
+    def __init__(self, *query_states):
+        self.query_states = list(query_states)
+        self.states = {}
+
+    def start_query_execution(self, **request):
+        query_execution_id = f"query-{len(self.states)}"
+        self.states[query_execution_id] = list(self.query_states.pop(0))
+        return {"QueryExecutionId": query_execution_id}
+
+    def get_query_execution(self, QueryExecutionId):
+        states = self.states[QueryExecutionId]
+        state = states.pop(0) if len(states) > 1 else states[0]
+        return {"QueryExecution": {"Status": {"State": state, "StateChangeReason": f"{QueryExecutionId} {state}"}}}
+
+
+class StubGlueClient:
+    def __init__(self):
+        self.deleted_tables = []
+
+    def create_database(self, **request):
+        pass
+
+    def delete_table(self, DatabaseName, Name):
+        self.deleted_tables.append(Name)
+
+
+class StubSpark:
+    def __init__(self):
+        self.read = types.SimpleNamespace(parquet=lambda path: path)
+
+
+def athena_dataset_definition(query_string):
+    return {
+        "catalogName": "AwsDataCatalog",
+        "databaseName": "dsoaws",
+        "queryString": query_string,
+        "s3OutputLocation": "s3://bucket/athena/",
+        "outputFormat": "parquet",
+    }
+
+
+def test_athena_sources_poll_with_backoff(flow):
+    athena_client = StubAthenaClient(["QUEUED", "RUNNING", "RUNNING", "SUCCEEDED"], ["RUNNING", "SUCCEEDED"])
+    glue_client = StubGlueClient()
+    delays = []
+
+    outputs = flow.athena_sources_core(
+        StubSpark(),
+        [athena_dataset_definition("select 1"), athena_dataset_definition("select 2")],
+        athena_client=athena_client,
+        glue_client=glue_client,
+        sleep=delays.append,
+    )
+
+    assert delays == [0.5, 1.0, 2.0]
+    assert [output["state"]["status"] for output in outputs] == ["SUCCEEDED", "SUCCEEDED"]
+    assert all(output["default"].startswith("s3a://bucket/athena/") for output in outputs)
+    assert len(glue_client.deleted_tables) == 2
+
+
+def test_athena_source_reuses_result_within_ttl(flow, tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    athena_client = StubAthenaClient(["SUCCEEDED"], ["SUCCEEDED"])
+    dataset_definitions = [athena_dataset_definition("select 1")]
+
+    def run(now):
+        return flow.athena_sources_core(
+            StubSpark(),
+            dataset_definitions,
+            athena_client=athena_client,
+            glue_client=StubGlueClient(),
+            reuse_ttl_seconds=60,
+            result_manifest_path=manifest_path,
+            sleep=lambda delay: None,
+            clock=lambda: now,
+        )[0]
+
+    first = run(100.0)
+    reused = run(150.0)
+    expired = run(200.0)
+
+    assert reused["default"] == first["default"]
+    assert reused["trained_parameters"]["query_execution_id"] == "query-0"
+    assert expired["trained_parameters"]["query_execution_id"] == "query-1"
+    assert len(athena_client.states) == 2
+
+
+def test_athena_sources_clean_up_after_failed_query(flow, tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    athena_client = StubAthenaClient(["SUCCEEDED"], ["FAILED"], ["SUCCEEDED"])
+    glue_client = StubGlueClient()
+
+    with pytest.raises(RuntimeError, match="query-1 FAILED"):
+        flow.athena_sources_core(
+            StubSpark(),
+            [athena_dataset_definition(f"select {idx}") for idx in range(3)],
+            athena_client=athena_client,
+            glue_client=glue_client,
+            reuse_ttl_seconds=60,
+            result_manifest_path=manifest_path,
+            sleep=lambda delay: None,
+            clock=lambda: 100.0,
+        )
+
+    assert len(set(glue_client.deleted_tables)) == 3
+    manifest = flow.athena_load_result_manifest(manifest_path)
+    assert [entry["query_execution_id"] for entry in manifest.values()] == ["query-0"]
@@ -0,0 +1,119 @@
+"""Compares CPU throughput of fixed padding and length-bucketed batches with dynamic padding.
+
+A randomly initialised BERT classifier is trained and evaluated on synthetic examples whose token
+lengths follow a log-normal distribution similar to short product reviews.
+
+python benchmark_bucketing.py --examples 2048 --max-seq-length 512 --layers 4 --threads 8
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, RandomSampler, SequentialSampler, TensorDataset
+from torch.utils.data.dataloader import default_collate
+from transformers import BertConfig, BertForSequenceClassification
+
+from fast_bert.bucketing import DynamicPaddingCollator, LengthBucketSampler, get_sequence_lengths
+
+
+def synthetic_dataset(n_examples, max_seq_length, median_length, vocab_size, rng):
+    lengths = np.clip(
+        rng.lognormal(np.log(median_length), 0.6, size=n_examples).astype(int), 8, max_seq_length
+    )
+    input_ids = torch.zeros((n_examples, max_seq_length), dtype=torch.long)
+    input_mask = torch.zeros((n_examples, max_seq_length), dtype=torch.long)
+    for index, length in enumerate(lengths):
+        input_ids[index, :length] = torch.from_numpy(rng.randint(1, vocab_size, size=length))
+        input_mask[index, :length] = 1
+    segment_ids = torch.zeros_like(input_ids)
+    labels = torch.from_numpy(rng.randint(0, 2, size=n_examples))
+    return TensorDataset(input_ids, input_mask, segment_ids, labels)
+
+
+def dataloaders(dataset, batch_size, bucketed):
+    if bucketed:
+        collate = DynamicPaddingCollator()
+        train_dl = DataLoader(
+            dataset,
+            batch_sampler=LengthBucketSampler(get_sequence_lengths(dataset), batch_size),
+            collate_fn=collate,
+        )
+    else:
+        collate = default_collate
+        train_dl = DataLoader(dataset, sampler=RandomSampler(dataset), batch_size=batch_size)
+    eval_dl = DataLoader(
+        dataset, sampler=SequentialSampler(dataset), batch_size=batch_size * 2, collate_fn=collate
+    )
+    return train_dl, eval_dl
+
+
+def run(model, dl, train):
+    optimizer = torch.optim.SGD(model.parameters(), lr=1e-5)
+    model.train(train)
+    n_tokens = n_padded = 0
+    start = time.perf_counter()
+    for input_ids, input_mask, segment_ids, labels in dl:
+        n_tokens += int(input_mask.sum())
+        n_padded += input_ids.numel()
+        if train:
+            loss = model(
+                input_ids, attention_mask=input_mask, token_type_ids=segment_ids, labels=labels
+            )[0]
+            loss.backward()
+            optimizer.step()
+            optimizer.zero_grad()
+        else:
+            with torch.no_grad():
+                model(input_ids, attention_mask=input_mask, token_type_ids=segment_ids)
+    return time.perf_counter() - start, n_tokens / n_padded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--examples", type=int, default=2048)
+    parser.add_argument("--max-seq-length", type=int, default=512)
+    parser.add_argument("--median-length", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--hidden-size", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=30522,
+        hidden_size=args.hidden_size,
+        num_hidden_layers=args.layers,
+        num_attention_heads=max(1, args.hidden_size // 64),
+        intermediate_size=args.hidden_size * 4,
+        max_position_embeddings=max(512, args.max_seq_length),
+    )
+    model = BertForSequenceClassification(config)
+    dataset = synthetic_dataset(
+        args.examples,
+        args.max_seq_length,
+        args.median_length,
+        config.vocab_size,
+        np.random.RandomState(0),
+    )
+
+    print(
+        "{:<10} {:<6} {:>10} {:>14} {:>12}".format(
+            "mode", "pass", "seconds", "examples/s", "real tokens"
+        )
+    )
+    for mode, bucketed in (("standard", False), ("bucketed", True)):
+        train_dl, eval_dl = dataloaders(dataset, args.batch_size, bucketed)
+        for name, dl, train in (("train", train_dl, True), ("eval", eval_dl, False)):
+            seconds, real_fraction = run(model, dl, train)
+            print(
+                "{:<10} {:<6} {:>10.2f} {:>14.1f} {:>11.1f}%".format(
+                    mode, name, seconds, args.examples / seconds, real_fraction * 100
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Measures how feature conversion scales with the number of worker processes.
+
+Synthetic reviews are converted with `convert_examples_to_features` using the BERT vocabulary of
+the test folder, serially and with 2, 4, ... processes up to the number of cores.
+
+python benchmark_conversion.py --examples 100000 --max-seq-length 256
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from transformers import BertTokenizer
+
+from fast_bert.data_cls import InputExample, convert_examples_to_features
+from fast_bert.parallel import convert_in_shards
+
+VOCAB_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "test", "tokenizer_vocab", "bert-base-uncased-vocab.txt"
+)
+
+
+def synthetic_examples(n_examples, median_words, words, rng):
+    lengths = np.maximum(rng.lognormal(np.log(median_words), 0.7, size=n_examples).astype(int), 1)
+    return [
+        InputExample(
+            guid=index,
+            text_a=" ".join(rng.choice(words, size=length)),
+            label=str(rng.randint(0, 2)),
+        )
+        for index, length in enumerate(lengths)
+    ]
+
+
+def job_counts(max_jobs):
+    counts = [1]
+    while counts[-1] * 2 < max_jobs:
+        counts.append(counts[-1] * 2)
+    if max_jobs > 1:
+        counts.append(max_jobs)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--examples", type=int, default=100000)
+    parser.add_argument("--median-words", type=int, default=60)
+    parser.add_argument("--max-seq-length", type=int, default=256)
+    parser.add_argument("--max-jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    tokenizer = BertTokenizer(VOCAB_FILE, do_lower_case=True)
+    # whole words and word pieces, so that the tokenizer has to split some of them
+    vocab = [token for token in tokenizer.vocab if token.isalpha()]
+    rng = np.random.RandomState(0)
+    words = np.array(vocab[:20000] + [a + b for a, b in zip(vocab[:2000], vocab[2000:4000])])
+    examples = synthetic_examples(args.examples, args.median_words, words, rng)
+
+    kwargs = dict(
+        label_list=["0", "1"],
+        max_seq_length=args.max_seq_length,
+        tokenizer=tokenizer,
+        cls_token=tokenizer.cls_token,
+        sep_token=tokenizer.sep_token,
+        cls_token_segment_id=0,
+    )
+
+    print("{:>6} {:>10} {:>14} {:>9}".format("jobs", "seconds", "examples/s", "speedup"))
+    serial_seconds = None
+    for n_jobs in job_counts(args.max_jobs):
+        start = time.perf_counter()
+        results = convert_in_shards(convert_examples_to_features, examples, n_jobs=n_jobs, **kwargs)
+        seconds = time.perf_counter() - start
+        assert sum(len(features) for _, features in results) == len(examples)
+        if serial_seconds is None:
+            serial_seconds = seconds
+        print(
+            "{:>6} {:>10.2f} {:>14.1f} {:>8.2f}x".format(
+                n_jobs, seconds, len(examples) / seconds, serial_seconds / seconds
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import math
+
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+from torch.utils.data.dataloader import default_collate
+
+
+def get_sequence_lengths(dataset):
+    """ number of real (non padding) tokens of each item of a classification dataset
+
+    Works for the TensorDataset built by BertDataBunch, where the second tensor is the input mask,
+    and for datasets exposing a `lengths` array such as MemmapFeatureDataset.
+    """
+    if hasattr(dataset, "lengths"):
+        return np.asarray(dataset.lengths)
+    return dataset.tensors[1].sum(dim=1).numpy()
+
+
+class LengthBucketSampler(Sampler):
+    """ Batch sampler grouping items of similar lengths
+
+    The indices are shuffled and split into pools of `batch_size * bucket_size_multiplier` items.
+    Each pool is sorted by length and cut into batches, and the batches of all pools are shuffled,
+    so that batches hold items of similar lengths while the order of the steps stays random.
+    Without shuffling, the whole dataset is a single pool sorted by length.
+    """
+
+    def __init__(
+        self,
+        lengths,
+        batch_size,
+        shuffle=True,
+        bucket_size_multiplier=100,
+        drop_last=False,
+    ):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.pool_size = (
+            batch_size * bucket_size_multiplier if shuffle else max(len(self.lengths), 1)
+        )
+        self.drop_last = drop_last
+
+    def __iter__(self):
+        n_items = len(self.lengths)
+        if self.shuffle:
+            indices = torch.randperm(n_items).numpy()
+        else:
+            indices = np.arange(n_items)
+
+        batches = []
+        for start in range(0, n_items, self.pool_size):
+            pool = indices[start : start + self.pool_size]
+            pool = pool[np.argsort(self.lengths[pool], kind="stable")]
+            for batch_start in range(0, len(pool), self.batch_size):
+                batch = pool[batch_start : batch_start + self.batch_size]
+                if len(batch) < self.batch_size and self.drop_last:
+                    continue
+                batches.append(batch.tolist())
+
+        if self.shuffle:
+            batches = [batches[i] for i in torch.randperm(len(batches)).tolist()]
+        return iter(batches)
+
+    def __len__(self):
+        n_items = len(self.lengths)
+        full_pools, last_pool = divmod(n_items, self.pool_size)
+        if self.drop_last:
+            return full_pools * (self.pool_size // self.batch_size) + last_pool // self.batch_size
+        return full_pools * math.ceil(self.pool_size / self.batch_size) + math.ceil(
+            last_pool / self.batch_size
+        )
+
+
+class DynamicPaddingCollator(object):
+    """ Collates a batch and drops the padding columns beyond its longest item
+
+    Items are (input_ids, input_mask, segment_ids[, labels]) padded to max_seq_length. The first
+    three tensors are cut to the number of real tokens of the longest item of the batch, on the
+    right or, for left padded models like XLNet, on the left. Labels are left untouched.
+    """
+
+    def __init__(self, pad_on_left=False):
+        self.pad_on_left = pad_on_left
+
+    def __call__(self, items):
+        batch = default_collate(items)
+        input_mask = batch[1]
+        seq_length = input_mask.size(1)
+        length = max(int(input_mask.sum(dim=1).max()), 1)
+        if self.pad_on_left:
+            columns = slice(seq_length - length, seq_length)
+        else:
+            columns = slice(0, length)
+        return [
+            tensor[:, columns].contiguous() if index < 3 else tensor
+            for index, tensor in enumerate(batch)
+        ]
@@ -9,6 +9,7 @@ from pathlib import Path
 import pickle
 import shutil
 from collections import deque, namedtuple
+from functools import partial
 from torch.utils.data import Dataset, DataLoader, SequentialSampler
 from tokenizers import BertWordPieceTokenizer
 from transformers import BertTokenizer
@@ -152,7 +153,12 @@ class BertAbsDataBunch(object):
         logger=None,
         clear_cache=False,
         no_cache=False,
+        num_workers=0,
     ):
+        """
+        `num_workers` DataLoader processes tokenize the batches ahead of the model. The batches
+        are then built on the CPU and moved to the device with `batch_to_device`.
+        """
 
         # just in case someone passes string instead of Path
         if isinstance(data_dir, str):
@@ -173,6 +179,7 @@ class BertAbsDataBunch(object):
         self.max_seq_length = max_seq_length
         self.batch_size_per_gpu = batch_size_per_gpu
         self.device = device
+        self.num_workers = num_workers
         if data_dir:
             self.data_dir = data_dir
             self.cache_dir = data_dir / "lm_cache"
@@ -202,43 +209,37 @@ class BertAbsDataBunch(object):
             dataset = None
 
         if dataset:
-            sampler = SequentialSampler(dataset)
-
-            collate_fn = lambda data: collate(
-                data, self.tokenizer, block_size=self.max_seq_length, device=self.device
-            )
-
-            self.test_dl = DataLoader(
-                dataset,
-                sampler=sampler,
-                batch_size=self.batch_size_per_gpu,
-                collate_fn=collate_fn,
-            )
+            self.test_dl = self.get_dl(dataset)
         else:
             self.test_dl = None
 
-    def get_dl_from_texts(self, texts):
-
-        dataset = SummarizationInMemoryDataset(texts)
-
-        sampler = SequentialSampler(dataset)
-
-        collate_fn = lambda data: collate(
-            data, self.tokenizer, block_size=self.max_seq_length, device=self.device
+    def get_dl(self, dataset):
+        # worker processes cannot move tensors to a cuda device, the batches stay on the cpu
+        collate_fn = partial(
+            collate,
+            tokenizer=self.tokenizer,
+            block_size=self.max_seq_length,
+            device=None if self.num_workers > 0 else self.device,
         )
         return DataLoader(
             dataset,
-            sampler=sampler,
+            sampler=SequentialSampler(dataset),
             batch_size=self.batch_size_per_gpu,
             collate_fn=collate_fn,
+            num_workers=self.num_workers,
         )
 
+    def get_dl_from_texts(self, texts):
+
+        dataset = SummarizationInMemoryDataset(texts)
+        return self.get_dl(dataset)
 
-def collate(data, tokenizer, block_size, device):
+
+def collate(data, tokenizer, block_size, device=None):
     """ Collate formats the data passed to the data loader.
     In particular we tokenize the data batch after batch to avoid keeping them
     all in memory. We output the data as a namedtuple to fit the original BertAbs's
-    API.
+    API. Tensors are left on the cpu when device is None.
     """
     data = [x for x in data if not len(x[1]) == 0]  # remove empty_files
     names = [name for name, _, _ in data]
@@ -268,15 +269,26 @@ def collate(data, tokenizer, block_size, device):
     batch = Batch(
         document_names=names,
         batch_size=len(encoded_stories),
-        src=encoded_stories.to(device),
-        segs=encoder_token_type_ids.to(device),
-        mask_src=encoder_mask.to(device),
+        src=encoded_stories,
+        segs=encoder_token_type_ids,
+        mask_src=encoder_mask,
         tgt_str=summaries,
     )
 
+    if device is not None:
+        batch = batch_to_device(batch, device)
     return batch
 
 
+def batch_to_device(batch, device):
+    """ Moves the tensors of a batch to the device, a no-op for tensors already there """
+    return batch._replace(
+        src=batch.src.to(device),
+        segs=batch.segs.to(device),
+        mask_src=batch.mask_src.to(device),
+    )
+
+
 def encode_for_summarization(story_lines, summary_lines, tokenizer):
     """ Encode the story and summary lines, and join them
     as specified in [1] by using `[SEP] [CLS]` tokens to separate
@@ -343,13 +355,6 @@ def compute_token_type_ids(batch, separator_token_id):
         arXiv preprint arXiv:1908.08345 (2019).
     [2] https://github.com/nlpyang/PreSumm (/src/prepro/data_builder.py, commit fac1217)
     """
-    batch_embeddings = []
-    for sequence in batch:
-        sentence_num = -1
-        embeddings = []
-        for s in sequence:
-            if s == separator_token_id:
-                sentence_num += 1
-            embeddings.append(sentence_num % 2)
-        batch_embeddings.append(embeddings)
-    return torch.tensor(batch_embeddings)
+    # sentence number of each token, -1 before the first separator, taken modulo 2 (so -1 -> 1)
+    sentence_num = (batch == separator_token_id).long().cumsum(dim=1) - 1
+    return sentence_num % 2
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import os
 import torch
 from pathlib import Path
@@ -9,6 +10,21 @@ import shutil
 
 from torch.utils.data import TensorDataset, DataLoader, RandomSampler, SequentialSampler
 from torch.utils.data.distributed import DistributedSampler
+from torch.utils.data.dataloader import default_collate
+
+from .bucketing import DynamicPaddingCollator, LengthBucketSampler, get_sequence_lengths
+
+from .parallel import convert_in_shards
+
+from .feature_cache import (
+    MemmapFeatureDataset,
+    cache_exists,
+    cache_key,
+    hash_file,
+    hash_texts,
+    save_sequences,
+    tokenizer_fingerprint,
+)
 
 from transformers import (
     WEIGHTS_NAME,
@@ -224,6 +240,24 @@ def convert_examples_to_features(
     return features
 
 
+def convert_examples_to_sequences(examples, pad_on_left=False, **kwargs):
+    """ Same as `convert_examples_to_features` without the padding
+
+    Returns:
+        tuple of lists (input_ids, segment_ids, label_ids), token lists being cut to their real tokens
+    """
+    features = convert_examples_to_features(examples, pad_on_left=pad_on_left, **kwargs)
+    real_token = 1 if kwargs.get("mask_padding_with_zero", True) else 0
+    input_ids, segment_ids, label_ids = [], [], []
+    for f in features:
+        length = f.input_mask.count(real_token)
+        tokens = slice(len(f.input_ids) - length, None) if pad_on_left else slice(0, length)
+        input_ids.append(f.input_ids[tokens])
+        segment_ids.append(f.segment_ids[tokens])
+        label_ids.append(f.label_id)
+    return input_ids, segment_ids, label_ids
+
+
 class DataProcessor(object):
     """Base class for data converters for sequence classification data sets."""
 
@@ -384,7 +418,23 @@ class BertDataBunch(object):
         logger=None,
         clear_cache=False,
         no_cache=False,
+        cache_format="torch",
+        bucket_by_length=False,
+        n_jobs=1,
     ):
+        """
+        `cache_format` selects how converted features are cached in `data_dir/cache`:
+            - "torch": the features are pickled with torch.save and loaded in memory
+            - "mmap": contiguous int32 token arrays plus an offsets index, keyed by a hash of
+              the file content, the tokenizer and max_seq_length, memory-mapped on first access
+        `bucket_by_length` pads each batch only up to its longest item instead of max_seq_length,
+        and groups training examples of similar lengths in the same batches. Validation and test
+        batches keep the order of the data.
+        `n_jobs` is the number of processes tokenizing the examples, -1 for one per core. The
+        examples are split in contiguous shards and the features keep the order of the data.
+        """
+        if cache_format not in ("torch", "mmap"):
+            raise ValueError("cache_format must be 'torch' or 'mmap', got {}".format(cache_format))
 
         # just in case someone passes string instead of Path
         if isinstance(data_dir, str):
@@ -414,6 +464,18 @@ class BertDataBunch(object):
         self.multi_label = multi_label
         self.n_gpu = 1
         self.no_cache = no_cache
+        self.cache_format = cache_format
+        self.bucket_by_length = bucket_by_length
+        self.n_jobs = n_jobs
+        if bucket_by_length:
+            self.collate_fn = DynamicPaddingCollator(
+                pad_on_left=bool(model_type in ["xlnet"])
+            )
+        else:
+            self.collate_fn = default_collate
+        self.text_col = text_col
+        self.label_col = label_col
+        self._file_hashes = {}
         self.model_type = model_type
         self.output_mode = "classification"
         if logger is None:
@@ -435,16 +497,7 @@ class BertDataBunch(object):
         if train_file:
             # Train DataLoader
             train_examples = None
-            cached_features_file = os.path.join(
-                self.cache_dir,
-                "cached_{}_{}_{}_{}_{}".format(
-                    self.model_type,
-                    "train",
-                    "multi_label" if self.multi_label else "multi_class",
-                    str(self.max_seq_length),
-                    os.path.basename(train_file),
-                ),
-            )
+            cached_features_file = self.get_cached_features_file("train", train_file)
 
             if os.path.exists(cached_features_file) is False or self.no_cache is True:
                 train_examples = processor.get_train_examples(
@@ -456,24 +509,25 @@ class BertDataBunch(object):
             )
 
             self.train_batch_size = self.batch_size_per_gpu * max(1, self.n_gpu)
-            train_sampler = RandomSampler(train_dataset)
-            self.train_dl = DataLoader(
-                train_dataset, sampler=train_sampler, batch_size=self.train_batch_size
-            )
+            if self.bucket_by_length:
+                train_sampler = LengthBucketSampler(
+                    get_sequence_lengths(train_dataset), self.train_batch_size
+                )
+                self.train_dl = DataLoader(
+                    train_dataset,
+                    batch_sampler=train_sampler,
+                    collate_fn=self.collate_fn,
+                )
+            else:
+                train_sampler = RandomSampler(train_dataset)
+                self.train_dl = DataLoader(
+                    train_dataset, sampler=train_sampler, batch_size=self.train_batch_size
+                )
 
         if val_file:
             # Validation DataLoader
             val_examples = None
-            cached_features_file = os.path.join(
-                self.cache_dir,
-                "cached_{}_{}_{}_{}_{}".format(
-                    self.model_type,
-                    "dev",
-                    "multi_label" if self.multi_label else "multi_class",
-                    str(self.max_seq_length),
-                    os.path.basename(val_file),
-                ),
-            )
+            cached_features_file = self.get_cached_features_file("dev", val_file)
 
             if os.path.exists(cached_features_file) is False:
                 val_examples = processor.get_dev_examples(
@@ -488,7 +542,10 @@ class BertDataBunch(object):
             self.val_batch_size = self.batch_size_per_gpu * 2 * max(1, self.n_gpu)
             val_sampler = SequentialSampler(val_dataset)
             self.val_dl = DataLoader(
-                val_dataset, sampler=val_sampler, batch_size=self.val_batch_size
+                val_dataset,
+                sampler=val_sampler,
+                batch_size=self.val_batch_size,
+                collate_fn=self.collate_fn,
             )
 
         if test_data:
@@ -507,33 +564,148 @@ class BertDataBunch(object):
             self.test_batch_size = self.batch_size_per_gpu * max(1, self.n_gpu)
             test_sampler = SequentialSampler(test_dataset)
             self.test_dl = DataLoader(
-                test_dataset, sampler=test_sampler, batch_size=self.test_batch_size
+                test_dataset,
+                sampler=test_sampler,
+                batch_size=self.test_batch_size,
+                collate_fn=self.collate_fn,
             )
 
-    def get_dl_from_texts(self, texts):
-
-        test_examples = []
-        input_data = []
+    def get_dl_from_texts(self, texts, sort_by_length=None):
+        """
+        DataLoader of the texts to predict. With `sort_by_length` (defaults to `bucket_by_length`)
+        batches are made of texts of similar lengths padded to their longest text, and
+        `dl.batch_sampler` lists the positions of the texts of each batch.
+        """
+        if sort_by_length is None:
+            sort_by_length = self.bucket_by_length
 
-        for index, text in enumerate(texts):
-            test_examples.append(InputExample(index, text, label=None))
-            input_data.append({"id": index, "text": text})
+        test_examples = [
+            InputExample(index, text, label=None) for index, text in enumerate(texts)
+        ]
 
         test_dataset = self.get_dataset_from_examples(
             test_examples, "test", is_test=True, no_cache=True
         )
 
+        if sort_by_length:
+            return DataLoader(
+                test_dataset,
+                batch_sampler=LengthBucketSampler(
+                    get_sequence_lengths(test_dataset),
+                    self.batch_size_per_gpu,
+                    shuffle=False,
+                ),
+                collate_fn=DynamicPaddingCollator(
+                    pad_on_left=bool(self.model_type in ["xlnet"])
+                ),
+            )
+
         test_sampler = SequentialSampler(test_dataset)
         return DataLoader(
-            test_dataset, sampler=test_sampler, batch_size=self.batch_size_per_gpu
+            test_dataset,
+            sampler=test_sampler,
+            batch_size=self.batch_size_per_gpu,
+            collate_fn=self.collate_fn,
         )
 
+    def get_cached_features_file(self, set_type, file_name, examples=None):
+        """ path of the cached features of a data file, or of test examples """
+        if self.cache_format == "torch":
+            return os.path.join(
+                self.cache_dir,
+                "cached_{}_{}_{}_{}_{}".format(
+                    self.model_type,
+                    set_type,
+                    "multi_label" if self.multi_label else "multi_class",
+                    str(self.max_seq_length),
+                    os.path.basename(file_name),
+                ),
+            )
+
+        if set_type == "test":
+            content_hash = hash_texts(example.text_a for example in examples)
+        else:
+            content_hash = self._hash_data_file(file_name)
+        key = cache_key(
+            self.model_type,
+            set_type,
+            self.multi_label,
+            self.max_seq_length,
+            self.text_col,
+            self.label_col,
+            self.labels,
+            content_hash,
+            tokenizer_fingerprint(self.tokenizer),
+        )
+        return os.path.join(self.cache_dir, "mmap_{}_{}".format(set_type, key))
+
+    def _hash_data_file(self, file_name):
+        path = os.path.join(self.data_dir, file_name)
+        stat = os.stat(path)
+        signature = (path, stat.st_size, stat.st_mtime)
+        if signature not in self._file_hashes:
+            self._file_hashes[signature] = hash_file(path)
+        return self._file_hashes[signature]
+
     def save(self, filename="databunch.pkl"):
         tmp_path = self.data_dir / "tmp"
         tmp_path.mkdir(exist_ok=True)
         with open(str(tmp_path / filename), "wb") as f:
             pickle.dump(self, f)
 
+    def _conversion_kwargs(self):
+        return dict(
+            label_list=self.labels,
+            max_seq_length=self.max_seq_length,
+            tokenizer=self.tokenizer,
+            output_mode=self.output_mode,
+            # xlnet has a cls token at the end
+            cls_token_at_end=bool(self.model_type in ["xlnet"]),
+            cls_token=self.tokenizer.cls_token,
+            sep_token=self.tokenizer.sep_token,
+            cls_token_segment_id=2 if self.model_type in ["xlnet"] else 0,
+            # pad on the left for xlnet
+            pad_on_left=bool(self.model_type in ["xlnet"]),
+            pad_token_segment_id=4 if self.model_type in ["xlnet"] else 0,
+        )
+
+    def convert_examples_to_features(self, examples):
+        if self.n_jobs == 1:
+            return convert_examples_to_features(
+                examples, logger=self.logger, **self._conversion_kwargs()
+            )
+
+        features = []
+        for _, shard_features in convert_in_shards(
+            convert_examples_to_features,
+            examples,
+            n_jobs=self.n_jobs,
+            logger=self.logger,
+            **self._conversion_kwargs()
+        ):
+            features.extend(shard_features)
+        return features
+
+    def convert_examples_to_sequences(self, examples):
+        """ unpadded (input_ids, segment_ids, label_ids) of the examples, see `convert_examples_to_sequences` """
+        if self.n_jobs == 1:
+            return convert_examples_to_sequences(
+                examples, logger=self.logger, **self._conversion_kwargs()
+            )
+
+        input_ids, segment_ids, label_ids = [], [], []
+        for _, (shard_ids, shard_segments, shard_labels) in convert_in_shards(
+            convert_examples_to_sequences,
+            examples,
+            n_jobs=self.n_jobs,
+            logger=self.logger,
+            **self._conversion_kwargs()
+        ):
+            input_ids.extend(shard_ids)
+            segment_ids.extend(shard_segments)
+            label_ids.extend(shard_labels)
+        return input_ids, segment_ids, label_ids
+
     def get_dataset_from_examples(
         self, examples, set_type="train", is_test=False, no_cache=False
     ):
@@ -547,16 +719,13 @@ class BertDataBunch(object):
                 "test"
             )  # test is not supposed to be a file - just a list of texts
 
-        cached_features_file = os.path.join(
-            self.cache_dir,
-            "cached_{}_{}_{}_{}_{}".format(
-                self.model_type,
-                set_type,
-                "multi_label" if self.multi_label else "multi_class",
-                str(self.max_seq_length),
-                os.path.basename(file_name),
-            ),
-        )
+        # without a cache, features are kept in memory whatever the cache format
+        if self.cache_format == "mmap" and no_cache is False:
+            return self.get_memmap_dataset_from_examples(
+                examples, set_type, file_name, is_test=is_test
+            )
+
+        cached_features_file = self.get_cached_features_file(set_type, file_name)
 
         if os.path.exists(cached_features_file) and no_cache is False:
             self.logger.info(
@@ -565,22 +734,7 @@ class BertDataBunch(object):
             features = torch.load(cached_features_file)
         else:
             # Create tokenized and numericalized features
-            features = convert_examples_to_features(
-                examples,
-                label_list=self.labels,
-                max_seq_length=self.max_seq_length,
-                tokenizer=self.tokenizer,
-                output_mode=self.output_mode,
-                # xlnet has a cls token at the end
-                cls_token_at_end=bool(self.model_type in ["xlnet"]),
-                cls_token=self.tokenizer.cls_token,
-                sep_token=self.tokenizer.sep_token,
-                cls_token_segment_id=2 if self.model_type in ["xlnet"] else 0,
-                # pad on the left for xlnet
-                pad_on_left=bool(self.model_type in ["xlnet"]),
-                pad_token_segment_id=4 if self.model_type in ["xlnet"] else 0,
-                logger=self.logger,
-            )
+            features = self.convert_examples_to_features(examples)
 
             # Create folder if it doesn't exist
             if no_cache is False:
@@ -617,3 +771,44 @@ class BertDataBunch(object):
             dataset = TensorDataset(all_input_ids, all_input_mask, all_segment_ids)
 
         return dataset
+
+    def get_memmap_dataset_from_examples(
+        self, examples, set_type, file_name, is_test=False
+    ):
+        """ dataset of features read lazily from the memory-mapped cache, built first if needed """
+        pad_on_left = bool(self.model_type in ["xlnet"])
+        pad_token_segment_id = 4 if self.model_type in ["xlnet"] else 0
+
+        cached_features_file = self.get_cached_features_file(
+            set_type, file_name, examples
+        )
+
+        if cache_exists(cached_features_file):
+            self.logger.info(
+                "Loading features from cached file %s", cached_features_file
+            )
+        else:
+            input_ids, segment_ids, label_ids = self.convert_examples_to_sequences(
+                examples
+            )
+
+            labels = None
+            if is_test is False:
+                labels = np.array(
+                    label_ids,
+                    dtype=np.float32 if self.multi_label else np.int64,
+                )
+
+            self.logger.info(
+                "Saving features into cached file %s", cached_features_file
+            )
+            save_sequences(cached_features_file, input_ids, segment_ids, labels)
+
+        return MemmapFeatureDataset(
+            cached_features_file,
+            self.max_seq_length,
+            pad_token=0,
+            pad_token_segment_id=pad_token_segment_id,
+            pad_on_left=pad_on_left,
+            label_dtype=torch.float if self.multi_label else torch.long,
+        )
@@ -17,12 +17,26 @@ from torch.utils.data import (
     RandomSampler,
     SequentialSampler,
     Dataset,
+    IterableDataset,
+    get_worker_info,
 )
 from torch.utils.data.distributed import DistributedSampler
 import spacy
+import numpy as np
 from tqdm import tqdm, trange
 from fastprogress.fastprogress import master_bar, progress_bar
 
+from .feature_cache import (
+    SequenceCache,
+    TokenStream,
+    cache_exists,
+    cache_key,
+    hash_file,
+    save_sequences,
+    save_token_stream,
+    tokenizer_fingerprint,
+)
+
 from transformers import (
     WEIGHTS_NAME,
     BertConfig,
@@ -73,6 +87,7 @@ def create_corpus(text_list, target_path, logger=None):
             text = text.strip()
 
             f.write(text)
+            f.write("\n")
 
 
 #            text_lines = [re.sub(r"\n(\s)*","",str(sent)) for i, sent in enumerate(nlp(str(text)).sents)]
@@ -118,45 +133,184 @@ def fix_html(x: str) -> str:
 
 
 class TextDataset(Dataset):
-    def __init__(self, tokenizer, file_path, cache_path, logger, block_size=512):
+    def __init__(
+        self, tokenizer, file_path, cache_path, logger, block_size=512, cache_format="pickle"
+    ):
+        """
+        `cache_format` "pickle" pickles the list of blocks to `cache_path`, "mmap" stores them as a
+        contiguous int32 array in a directory next to it, keyed by a hash of the corpus, the tokenizer
+        and block_size, and memory-maps it on first access.
+        """
         assert os.path.isfile(file_path)
+        self.cache = None
 
-        if os.path.exists(cache_path):
+        if cache_format == "mmap":
+            cache_path = "{}_{}".format(
+                cache_path,
+                cache_key(hash_file(file_path), tokenizer_fingerprint(tokenizer), block_size),
+            )
+            if cache_exists(cache_path):
+                logger.info("Loading features from cached file %s", cache_path)
+            else:
+                logger.info("Creating features from dataset file %s", file_path)
+                examples = self.tokenize_blocks(tokenizer, file_path, block_size)
+                logger.info("Saving features into cached file %s", cache_path)
+                save_sequences(cache_path, examples)
+            self.cache = SequenceCache(cache_path)
+        elif os.path.exists(cache_path):
             logger.info("Loading features from cached file %s", cache_path)
             with open(cache_path, "rb") as handle:
                 self.examples = pickle.load(handle)
         else:
             logger.info("Creating features from dataset file %s", file_path)
 
-            self.examples = []
-            with open(file_path, encoding="utf-8") as f:
-                text = f.read()
-
-            tokenized_text = tokenizer.convert_tokens_to_ids(tokenizer.tokenize(text))
-
-            while len(tokenized_text) >= block_size:  # Truncate in block of block_size
-
-                self.examples.append(
-                    tokenizer.build_inputs_with_special_tokens(
-                        tokenized_text[:block_size]
-                    )
-                )
-                tokenized_text = tokenized_text[block_size:]
-            # Note that we are loosing the last truncated example here for the sake of simplicity (no padding)
-            # If your dataset is small, first you should loook for a bigger one :-) and second you
-            # can change this behavior by adding (model specific) padding.
+            self.examples = self.tokenize_blocks(tokenizer, file_path, block_size)
 
             logger.info("Saving features into cached file %s", cache_path)
             with open(cache_path, "wb") as handle:
                 pickle.dump(self.examples, handle, protocol=pickle.HIGHEST_PROTOCOL)
 
+    @staticmethod
+    def tokenize_blocks(tokenizer, file_path, block_size):
+        examples = []
+        with open(file_path, encoding="utf-8") as f:
+            text = f.read()
+
+        tokenized_text = tokenizer.convert_tokens_to_ids(tokenizer.tokenize(text))
+
+        # Truncate in block of block_size
+        for start in range(0, len(tokenized_text) - block_size + 1, block_size):
+            examples.append(
+                tokenizer.build_inputs_with_special_tokens(
+                    tokenized_text[start : start + block_size]
+                )
+            )
+        # Note that we are loosing the last truncated example here for the sake of simplicity (no padding)
+        # If your dataset is small, first you should loook for a bigger one :-) and second you
+        # can change this behavior by adding (model specific) padding.
+        return examples
+
     def __len__(self):
+        if self.cache is not None:
+            return len(self.cache)
         return len(self.examples)
 
     def __getitem__(self, item):
+        if self.cache is not None:
+            return torch.from_numpy(self.cache.sequence("input_ids", item).astype(np.int64))
         return torch.tensor(self.examples[item])
 
 
+def tokenize_lines(tokenizer, file_path, chunk_size=1 << 20):
+    """ Tokenizes a text file line by line, yielding lists of about `chunk_size` token ids """
+    chunk = []
+    with open(file_path, encoding="utf-8") as f:
+        for line in f:
+            chunk.extend(tokenizer.convert_tokens_to_ids(tokenizer.tokenize(line)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def block_offsets(num_tokens, block_size, stride=None, pad_last=False):
+    """ Start offsets of the blocks of `block_size` tokens of a token stream
+
+    Blocks start every `stride` tokens (`block_size` by default, a stride shorter than the block
+    gives overlapping windows). The tokens after the last full block are dropped, unless
+    `pad_last` is set in which case one more, shorter block starts at the first of them.
+    """
+    stride = stride or block_size
+    starts = np.arange(0, max(num_tokens - block_size + 1, 0), stride, dtype=np.int64)
+    covered = starts[-1] + block_size if len(starts) else 0
+    if pad_last and covered < num_tokens:
+        starts = np.append(starts, covered)
+    return starts
+
+
+class _TokenBlocks(object):
+    """ Blocks of a token stream cache, with the special tokens of the model added when read """
+
+    def __init__(self, cache_path, tokenizer, block_size=512, stride=None, pad_last=False):
+        self.stream = TokenStream(cache_path)
+        self.tokenizer = tokenizer
+        self.block_size = block_size
+        self.offsets = block_offsets(len(self.stream), block_size, stride, pad_last)
+        self.item_length = len(
+            tokenizer.build_inputs_with_special_tokens([tokenizer.pad_token_id] * block_size)
+        )
+
+    def block(self, index):
+        start = self.offsets[index]
+        ids = self.stream.tokens[start : start + self.block_size].tolist()
+        ids = self.tokenizer.build_inputs_with_special_tokens(ids)
+        if len(ids) < self.item_length:
+            ids += [self.tokenizer.pad_token_id] * (self.item_length - len(ids))
+        return torch.tensor(ids, dtype=torch.long)
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+class LMBlockDataset(_TokenBlocks, Dataset):
+    """ Language model blocks read by offset from a memory-mapped token stream
+
+    Items are LongTensors of `block_size` tokens plus the special tokens of the model. With
+    `pad_last`, the last block is padded with the pad token, which `mask_tokens` never masks and
+    `BertLMDataBunch.attention_mask` masks out.
+    """
+
+    def __getitem__(self, item):
+        return self.block(item)
+
+
+class LMBlockIterableDataset(_TokenBlocks, IterableDataset):
+    """ Language model blocks streamed from a memory-mapped token stream
+
+    Blocks are read in the order of the corpus, or with `shuffle` in a random order of windows of
+    `window_size` consecutive blocks shuffled within each window, so that reads stay close to each
+    other on disk. DataLoader workers all draw the same order of windows, from the base seed of
+    the epoch, and read every `num_workers`-th window of it, so each block is read once per epoch.
+    """
+
+    def __init__(
+        self,
+        cache_path,
+        tokenizer,
+        block_size=512,
+        stride=None,
+        pad_last=False,
+        shuffle=False,
+        window_size=1024,
+    ):
+        super(LMBlockIterableDataset, self).__init__(
+            cache_path, tokenizer, block_size, stride, pad_last
+        )
+        self.shuffle = shuffle
+        self.window_size = window_size
+
+    def __iter__(self):
+        worker_info = get_worker_info()
+        windows = np.arange(0, len(self), self.window_size)
+        if self.shuffle:
+            generator = None
+            if worker_info is not None:
+                # worker seeds are the base seed of the epoch plus the worker id
+                generator = torch.Generator().manual_seed(worker_info.seed - worker_info.id)
+            windows = windows[torch.randperm(len(windows), generator=generator).numpy()]
+
+        if worker_info is not None:
+            windows = windows[worker_info.id :: worker_info.num_workers]
+
+        for start in windows:
+            indices = np.arange(start, min(start + self.window_size, len(self)))
+            if self.shuffle:
+                indices = indices[torch.randperm(len(indices)).numpy()]
+            for index in indices:
+                yield self.block(index)
+
+
 # DataBunch object for language models
 class BertLMDataBunch(object):
     @staticmethod
@@ -172,6 +326,10 @@ class BertLMDataBunch(object):
         logger=None,
         clear_cache=False,
         no_cache=False,
+        cache_format="pickle",
+        block_stride=None,
+        pad_last_block=False,
+        iterable=False,
     ):
 
         train_file = "lm_train.txt"
@@ -198,6 +356,10 @@ class BertLMDataBunch(object):
             logger=logger,
             clear_cache=clear_cache,
             no_cache=no_cache,
+            cache_format=cache_format,
+            block_stride=block_stride,
+            pad_last_block=pad_last_block,
+            iterable=iterable,
         )
 
     def __init__(
@@ -213,7 +375,24 @@ class BertLMDataBunch(object):
         logger=None,
         clear_cache=False,
         no_cache=False,
+        cache_format="pickle",
+        block_stride=None,
+        pad_last_block=False,
+        iterable=False,
     ):
+        """
+        `cache_format` "stream" tokenizes the corpus line by line into a flat token array on disk,
+        keyed by a hash of the corpus and the tokenizer, and reads the blocks from it by offset:
+            - `block_stride` tokens between the starts of consecutive blocks, the block size by
+              default, a shorter stride giving overlapping windows
+            - `pad_last_block` keeps the tokens after the last full block in a padded block
+            - `iterable` streams the blocks with an IterableDataset, shuffled by windows of
+              consecutive blocks, instead of sampling them at random offsets
+        """
+        if cache_format != "stream" and (block_stride or pad_last_block or iterable):
+            raise ValueError(
+                "block_stride, pad_last_block and iterable require cache_format='stream'"
+            )
 
         # just in case someone passes string instead of Path
         if isinstance(data_dir, str):
@@ -239,6 +418,10 @@ class BertLMDataBunch(object):
         self.data_dir = data_dir
         self.cache_dir = data_dir / "lm_cache"
         self.no_cache = no_cache
+        self.cache_format = cache_format
+        self.block_stride = block_stride
+        self.pad_last_block = pad_last_block
+        self.iterable = iterable
         self.model_type = model_type
         if logger is None:
             logger = logging.getLogger()
@@ -255,94 +438,121 @@ class BertLMDataBunch(object):
 
         if train_file:
             # Train DataLoader
-            train_examples = None
-            cached_features_file = os.path.join(
-                self.cache_dir,
-                "cached_{}_{}_{}".format(
-                    self.model_type, "train", str(self.max_seq_length)
-                ),
-            )
-
-            train_filepath = str(self.data_dir / train_file)
-            train_dataset = TextDataset(
-                self.tokenizer,
-                train_filepath,
-                cached_features_file,
-                self.logger,
-                block_size=self.tokenizer.max_len_single_sentence,
-            )
-
+            train_dataset = self.get_dataset(train_file, "train", shuffle=True)
             self.train_batch_size = self.batch_size_per_gpu * max(1, self.n_gpu)
-
-            train_sampler = RandomSampler(train_dataset)
-            self.train_dl = DataLoader(
-                train_dataset, sampler=train_sampler, batch_size=self.train_batch_size
-            )
+            self.train_dl = self.get_dataloader(train_dataset, self.train_batch_size)
 
         if val_file:
             # Val DataLoader
-            val_examples = None
+            val_dataset = self.get_dataset(val_file, "dev", shuffle=True)
+            self.val_batch_size = self.batch_size_per_gpu * 2 * max(1, self.n_gpu)
+            self.val_dl = self.get_dataloader(val_dataset, self.val_batch_size)
+
+    def get_dataset(self, file_name, set_type, shuffle=False):
+        file_path = str(self.data_dir / file_name)
+        block_size = self.tokenizer.max_len_single_sentence
+
+        if self.cache_format != "stream":
             cached_features_file = os.path.join(
                 self.cache_dir,
                 "cached_{}_{}_{}".format(
-                    self.model_type, "dev", str(self.max_seq_length)
+                    self.model_type, set_type, str(self.max_seq_length)
                 ),
             )
-
-            val_filepath = str(self.data_dir / val_file)
-            val_dataset = TextDataset(
+            return TextDataset(
                 self.tokenizer,
-                val_filepath,
+                file_path,
                 cached_features_file,
                 self.logger,
-                block_size=self.tokenizer.max_len_single_sentence,
+                block_size=block_size,
+                cache_format=self.cache_format,
             )
 
-            self.val_batch_size = self.batch_size_per_gpu * 2 * max(1, self.n_gpu)
+        # the token stream does not depend on the block size, all block layouts share it
+        cache_path = os.path.join(
+            self.cache_dir,
+            "tokens_{}_{}_{}".format(
+                self.model_type,
+                set_type,
+                cache_key(hash_file(file_path), tokenizer_fingerprint(self.tokenizer)),
+            ),
+        )
+        if cache_exists(cache_path):
+            self.logger.info("Loading tokens from cached file %s", cache_path)
+        else:
+            self.logger.info("Creating tokens from dataset file %s", file_path)
+            num_tokens = save_token_stream(
+                cache_path, tokenize_lines(self.tokenizer, file_path)
+            )
+            self.logger.info("Saved %d tokens into cached file %s", num_tokens, cache_path)
 
-            val_sampler = RandomSampler(val_dataset)
-            self.val_dl = DataLoader(
-                val_dataset, sampler=val_sampler, batch_size=self.val_batch_size
+        if self.iterable:
+            return LMBlockIterableDataset(
+                cache_path,
+                self.tokenizer,
+                block_size=block_size,
+                stride=self.block_stride,
+                pad_last=self.pad_last_block,
+                shuffle=shuffle,
             )
+        return LMBlockDataset(
+            cache_path,
+            self.tokenizer,
+            block_size=block_size,
+            stride=self.block_stride,
+            pad_last=self.pad_last_block,
+        )
+
+    def get_dataloader(self, dataset, batch_size):
+        if isinstance(dataset, IterableDataset):
+            return DataLoader(dataset, batch_size=batch_size)
+        return DataLoader(dataset, sampler=RandomSampler(dataset), batch_size=batch_size)
 
     # Mask tokens
 
     def mask_tokens(self, inputs, mlm_probability=0.15):
-        """ Prepare masked tokens inputs/labels for masked language modeling: 80% MASK, 10% random, 10% original. """
+        """ Prepare masked tokens inputs/labels for masked language modeling: 80% MASK, 10% random, 10% original.
+
+        A single uniform draw per token decides both whether it is masked (u < p) and how: u < 0.8p is
+        replaced by the mask token, 0.8p <= u < 0.9p by a random word. Special and padding tokens are
+        never masked.
+        """
         labels = inputs.clone()
         # We sample a few tokens in each sequence for masked-LM training (with probability mlm_probability defaults to 0.15 in Bert/RoBERTa)
-
-        masked_indices = torch.bernoulli(
-            torch.full(labels.shape, mlm_probability)
-        ).bool()
-        # do not mask special tokens
-        masked_indices[:, 0] = False
-        masked_indices[:, -1] = False
+        draws = torch.rand(labels.shape)
+        masked_indices = (draws < mlm_probability) & ~self.special_tokens_mask(inputs)
 
         labels[~masked_indices] = -1  # We only compute loss on masked tokens
 
         # 80% of the time, we replace masked input tokens with tokenizer.mask_token ([MASK])
-        indices_replaced = (
-            torch.bernoulli(torch.full(labels.shape, 0.8)).bool() & masked_indices
-        )
+        indices_replaced = masked_indices & (draws < 0.8 * mlm_probability)
         inputs[indices_replaced] = self.tokenizer.convert_tokens_to_ids(
             self.tokenizer.mask_token
         )
 
         # 10% of the time, we replace masked input tokens with random word
         indices_random = (
-            torch.bernoulli(torch.full(labels.shape, 0.5)).bool()
-            & masked_indices
-            & ~indices_replaced
+            masked_indices & ~indices_replaced & (draws < 0.9 * mlm_probability)
         )
-        random_words = torch.randint(
-            len(self.tokenizer), labels.shape, dtype=torch.long
+        inputs[indices_random] = torch.randint(
+            len(self.tokenizer), (int(indices_random.sum()),), dtype=inputs.dtype
         )
-        inputs[indices_random] = random_words[indices_random]
 
         # The rest of the time (10% of the time) we keep the masked input tokens unchanged
         return inputs, labels
 
+    def attention_mask(self, inputs):
+        """ 1 for the tokens of inputs, 0 for the padding of the last block with `pad_last_block` """
+        return (inputs != self.tokenizer.pad_token_id).long()
+
+    def special_tokens_mask(self, inputs):
+        """ True where inputs are special tokens ([CLS], [SEP], padding...) """
+        if getattr(self, "_is_special_token", None) is None:
+            is_special = torch.zeros(len(self.tokenizer), dtype=torch.bool)
+            is_special[self.tokenizer.all_special_ids] = True
+            self._is_special_token = is_special
+        return self._is_special_token[inputs]
+
     def save(self, filename="databunch.pkl"):
         tmp_path = self.data_dir / "tmp"
         tmp_path.mkdir(exist_ok=True)
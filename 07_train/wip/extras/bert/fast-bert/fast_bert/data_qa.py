@@ -11,6 +11,8 @@ import shutil
 from torch.utils.data import TensorDataset, DataLoader, RandomSampler, SequentialSampler
 from torch.utils.data.distributed import DistributedSampler
 
+from .parallel import convert_in_shards
+
 from transformers.tokenization_bert import BasicTokenizer, whitespace_tokenize
 
 from transformers import (WEIGHTS_NAME, 
@@ -366,6 +368,26 @@ def convert_examples_to_features(examples, tokenizer, max_seq_length,
 
     return features
 
+
+def _convert_shard_to_features(examples, **kwargs):
+    return convert_examples_to_features(examples, logger=None, **kwargs)
+
+
+def parallel_convert_examples_to_features(examples, n_jobs=-1, logger=None, **kwargs):
+    """Runs `convert_examples_to_features` on shards of the examples in `n_jobs` processes.
+
+    Features are numbered as if the examples had been converted in a single pass: `example_index` is
+    the position of the example in `examples` and `unique_id` keeps counting from 1000000000.
+    """
+    features = []
+    for start, shard_features in convert_in_shards(
+            _convert_shard_to_features, examples, n_jobs=n_jobs, logger=logger, **kwargs):
+        for feature in shard_features:
+            feature.unique_id = 1000000000 + len(features)
+            feature.example_index += start
+            features.append(feature)
+    return features
+
 def _improve_answer_span(doc_tokens, input_start, input_end, tokenizer,
                          orig_answer_text):
     """Returns tokenized answer spans that better match the annotated answer."""
@@ -448,7 +470,7 @@ class BertQADataBunch(object):
                  version_2_with_negative=True,
                  multi_gpu=True, 
                  model_type='bert', 
-                 logger=None, clear_cache=False, no_cache=False):
+                 logger=None, clear_cache=False, no_cache=False, n_jobs=1):
 
         # just in case someone passes string instead of Path
         if isinstance(data_dir, str):
@@ -474,6 +496,7 @@ class BertQADataBunch(object):
         self.test_dl = None
         self.n_gpu = 1
         self.no_cache = no_cache
+        self.n_jobs = n_jobs
         self.model_type = model_type
         if logger is None:
             logger = logging.getLogger()
@@ -509,13 +532,7 @@ class BertQADataBunch(object):
                                          version_2_with_negative=self.version_2_with_negative, 
                                          logger=self.logger)
                 
-                features = convert_examples_to_features(examples=examples,
-                                                tokenizer=self.tokenizer,
-                                                logger=self.logger,
-                                                max_seq_length=self.max_seq_length,
-                                                doc_stride=self.doc_stride,
-                                                max_query_length=self.max_query_length,
-                                                is_training=True)
+                features = self.convert_examples_to_features(examples, is_training=True)
                 
                 if self.no_cache == False:
                     self.logger.info("Saving features into cached file %s", cached_features_file)
@@ -564,13 +581,7 @@ class BertQADataBunch(object):
                                          version_2_with_negative=self.version_2_with_negative, 
                                          logger=self.logger)
                 
-                features = convert_examples_to_features(examples=examples,
-                                                tokenizer=self.tokenizer,
-                                                logger=self.logger,
-                                                max_seq_length=self.max_seq_length,
-                                                doc_stride=self.doc_stride,
-                                                max_query_length=self.max_query_length,
-                                                is_training=False)
+                features = self.convert_examples_to_features(examples, is_training=False)
                 
                 if self.no_cache == False:
                     self.logger.info("Saving features into cached file %s", cached_features_file)
@@ -595,6 +606,17 @@ class BertQADataBunch(object):
             val_sampler = SequentialSampler(dataset)
             self.val_dl = DataLoader(dataset, sampler=val_sampler, batch_size=self.train_batch_size)
 
+    def convert_examples_to_features(self, examples, is_training):
+        kwargs = dict(tokenizer=self.tokenizer,
+                      max_seq_length=self.max_seq_length,
+                      doc_stride=self.doc_stride,
+                      max_query_length=self.max_query_length,
+                      is_training=is_training)
+        if self.n_jobs == 1:
+            return convert_examples_to_features(examples=examples, logger=self.logger, **kwargs)
+        return parallel_convert_examples_to_features(
+            examples, n_jobs=self.n_jobs, logger=self.logger, **kwargs)
+
     def save(self, filename="databunch.pkl"):
         tmp_path = self.data_dir/'tmp'
         tmp_path.mkdir(exist_ok=True)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+# Bump when the layout of the cache directories changes
+CACHE_VERSION = 1
+
+
+def hash_file(path, block_size=1 << 20):
+    """ sha256 of the content of a file, read block by block """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_texts(texts):
+    """ sha256 of a list of texts """
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(str(text).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def tokenizer_fingerprint(tokenizer):
+    """ sha256 identifying a tokenizer by its class, its settings and its vocabulary """
+    digest = hashlib.sha256()
+    digest.update(type(tokenizer).__name__.encode("utf-8"))
+
+    # file paths depend on where the pretrained files were downloaded, the vocabulary is hashed instead
+    init_kwargs = {
+        key: value
+        for key, value in getattr(tokenizer, "init_kwargs", {}).items()
+        if not key.endswith("_file")
+    }
+    digest.update(json.dumps(init_kwargs, sort_keys=True, default=str).encode("utf-8"))
+
+    if hasattr(tokenizer, "get_vocab"):
+        vocab = tokenizer.get_vocab()
+    else:
+        vocab = dict(getattr(tokenizer, "vocab", getattr(tokenizer, "encoder", {})))
+        vocab.update(getattr(tokenizer, "added_tokens_encoder", {}))
+    for token, index in sorted(vocab.items(), key=lambda item: item[1]):
+        digest.update("{}\t{}\n".format(token, index).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cache_key(*parts):
+    """ short hash of the json encoded parts, used to name cache directories """
+    encoded = json.dumps([CACHE_VERSION] + list(parts), sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:24]
+
+
+def _save_concatenated(path, sequences, offsets, dtype):
+    array = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(int(offsets[-1]),))
+    for index, sequence in enumerate(sequences):
+        array[offsets[index] : offsets[index + 1]] = sequence
+    array.flush()
+    del array
+
+
+def save_sequences(cache_path, input_ids, segment_ids=None, labels=None):
+    """ Writes variable length token sequences as a memory-mapped cache directory
+
+    The token ids of all the sequences are stored back to back in one contiguous int32 array,
+    `offsets[i]:offsets[i + 1]` being the slice of sequence `i`. Segment ids are stored the
+    same way as int8 and labels as one row per sequence. The directory is written under a
+    temporary name and renamed once complete, so a partially written cache is never loaded.
+
+    Args:
+        cache_path: directory to create
+        input_ids: list of lists of token ids, without padding
+        segment_ids: optional list of lists of segment ids, same lengths as input_ids
+        labels: optional array of labels, one per sequence
+    """
+    parent = os.path.dirname(os.path.abspath(cache_path))
+    os.makedirs(parent, exist_ok=True)
+
+    lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(input_ids))
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    tmp_path = tempfile.mkdtemp(prefix=".tmp_", dir=parent)
+    try:
+        _save_concatenated(os.path.join(tmp_path, "input_ids.npy"), input_ids, offsets, np.int32)
+        if segment_ids is not None:
+            _save_concatenated(os.path.join(tmp_path, "segment_ids.npy"), segment_ids, offsets, np.int8)
+        if labels is not None:
+            np.save(os.path.join(tmp_path, "labels.npy"), np.asarray(labels))
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({"version": CACHE_VERSION, "num_sequences": len(lengths)}, f)
+
+        shutil.rmtree(cache_path, ignore_errors=True)
+        os.rename(tmp_path, cache_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def save_token_stream(cache_path, token_chunks):
+    """ Writes chunks of token ids back to back as one flat int32 array on disk
+
+    Chunks are appended to the file as they come, so the whole corpus never has to fit in memory.
+    Like `save_sequences`, the directory is written under a temporary name and renamed once complete.
+
+    Args:
+        cache_path: directory to create
+        token_chunks: iterable of lists or arrays of token ids
+    Returns:
+        number of tokens written
+    """
+    parent = os.path.dirname(os.path.abspath(cache_path))
+    os.makedirs(parent, exist_ok=True)
+
+    tmp_path = tempfile.mkdtemp(prefix=".tmp_", dir=parent)
+    try:
+        num_tokens = 0
+        with open(os.path.join(tmp_path, "tokens.bin"), "wb") as f:
+            for chunk in token_chunks:
+                chunk = np.asarray(chunk, dtype=np.int32)
+                chunk.tofile(f)
+                num_tokens += len(chunk)
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({"version": CACHE_VERSION, "num_tokens": num_tokens}, f)
+
+        shutil.rmtree(cache_path, ignore_errors=True)
+        os.rename(tmp_path, cache_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return num_tokens
+
+
+def cache_exists(cache_path):
+    return os.path.exists(os.path.join(cache_path, "meta.json"))
+
+
+class SequenceCache(object):
+    """ Lazily memory-maps the arrays of a cache directory written by `save_sequences`
+
+    Nothing is read until an array is accessed, and arrays are opened with
+    `numpy.load(mmap_mode="r")`: pages are loaded on demand and shared between the
+    processes (e.g. DataLoader workers) reading the same cache. Only the path is pickled.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self._arrays = {}
+
+    def array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.cache_path, name + ".npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    def has_array(self, name):
+        return os.path.exists(os.path.join(self.cache_path, name + ".npy"))
+
+    @property
+    def offsets(self):
+        return self.array("offsets")
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def sequence(self, name, index):
+        offsets = self.offsets
+        return self.array(name)[offsets[index] : offsets[index + 1]]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getstate__(self):
+        return {"cache_path": self.cache_path, "_arrays": {}}
+
+
+class MemmapFeatureDataset(Dataset):
+    """ Classification features read from a memory-mapped cache
+
+    Items are padded to `max_seq_length` when they are read and have the same layout as the
+    items of the TensorDataset built from `convert_examples_to_features`:
+    (input_ids, input_mask, segment_ids[, label]).
+    """
+
+    def __init__(
+        self,
+        cache_path,
+        max_seq_length,
+        pad_token=0,
+        pad_token_segment_id=0,
+        pad_on_left=False,
+        mask_padding_with_zero=True,
+        label_dtype=torch.long,
+    ):
+        self.cache = SequenceCache(cache_path)
+        self.max_seq_length = max_seq_length
+        self.pad_token = pad_token
+        self.pad_token_segment_id = pad_token_segment_id
+        self.pad_on_left = pad_on_left
+        self.mask_padding_with_zero = mask_padding_with_zero
+        self.label_dtype = label_dtype
+        self.with_labels = self.cache.has_array("labels")
+
+    @property
+    def lengths(self):
+        """ number of real (non padding) tokens of each item """
+        return self.cache.lengths
+
+    def padded_item(self, index, seq_length):
+        """ item `index` padded to `seq_length` tokens """
+        input_ids = self.cache.sequence("input_ids", index)
+        segment_ids = self.cache.sequence("segment_ids", index)
+        length = len(input_ids)
+        if self.pad_on_left:
+            start, end = seq_length - length, seq_length
+        else:
+            start, end = 0, length
+
+        padded_ids = torch.full((seq_length,), self.pad_token, dtype=torch.long)
+        padded_ids[start:end] = torch.from_numpy(input_ids.astype(np.int64))
+        padded_segments = torch.full((seq_length,), self.pad_token_segment_id, dtype=torch.long)
+        padded_segments[start:end] = torch.from_numpy(segment_ids.astype(np.int64))
+        real_token, padding = (1, 0) if self.mask_padding_with_zero else (0, 1)
+        input_mask = torch.full((seq_length,), padding, dtype=torch.long)
+        input_mask[start:end] = real_token
+
+        item = (padded_ids, input_mask, padded_segments)
+        if self.with_labels:
+            item += (torch.tensor(self.cache.array("labels")[index], dtype=self.label_dtype),)
+        return item
+
+    def __getitem__(self, index):
+        return self.padded_item(index, self.max_seq_length)
+
+    def __len__(self):
+        return len(self.cache)
+
+
+class TokenStream(object):
+    """ Lazily memory-maps the flat token array of a cache directory written by `save_token_stream`
+
+    Only the path is pickled, so the stream can be handed to DataLoader workers.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self._tokens = None
+        self._num_tokens = None
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            if len(self) == 0:
+                # an empty file cannot be memory-mapped
+                self._tokens = np.zeros(0, dtype=np.int32)
+            else:
+                self._tokens = np.memmap(
+                    os.path.join(self.cache_path, "tokens.bin"), dtype=np.int32, mode="r"
+                )
+        return self._tokens
+
+    def __len__(self):
+        if self._num_tokens is None:
+            with open(os.path.join(self.cache_path, "meta.json")) as f:
+                self._num_tokens = json.load(f)["num_tokens"]
+        return self._num_tokens
+
+    def __getstate__(self):
+        return {"cache_path": self.cache_path, "_tokens": None, "_num_tokens": None}
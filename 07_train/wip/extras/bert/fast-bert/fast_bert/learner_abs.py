@@ -1,5 +1,5 @@
 import os
-from .data_abs import BertAbsDataBunch
+from .data_abs import BertAbsDataBunch, batch_to_device
 from .learner_util import Learner
 from torch import nn
 from typing import List
@@ -179,7 +179,7 @@ class BertAbsLearner(Learner):
 
         self.model.eval()
         for step, batch in enumerate(dl):
-            # batch = tuple(t.to(self.device) for t in batch)
+            batch = batch_to_device(batch, self.device)
 
             batch_data = self.predictor.translate_batch(batch)
             translations = self.predictor.from_batch(batch_data)
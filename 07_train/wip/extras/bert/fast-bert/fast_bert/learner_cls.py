@@ -1,5 +1,6 @@
 import os
 from .data_cls import BertDataBunch, InputExample, InputFeatures
+from .bucketing import LengthBucketSampler
 from .learner_util import Learner
 from torch import nn
 from typing import List
@@ -528,27 +529,44 @@ class BertLearner(Learner):
         return results
 
     ### Return Predictions ###
-    def predict_batch(self, texts=None):
+    def quantize_for_inference(self):
+        """ Replaces the linear layers of the model with int8 dynamically quantized ones (CPU only) """
+        self.model = torch.quantization.quantize_dynamic(
+            self.model.to("cpu"), {nn.Linear}, dtype=torch.qint8
+        )
+        self.device = torch.device("cpu")
+        return self.model
+
+    def predict_proba(self, texts=None, sort_by_length=None, inference_mode=True):
+        """ Probabilities of each label, one row per text in the order of the texts
 
+        The probabilities are written batch after batch into a preallocated array. With
+        `sort_by_length`, texts are batched by length and written back at their position.
+        """
         if texts:
-            dl = self.data.get_dl_from_texts(texts)
+            dl = self.data.get_dl_from_texts(texts, sort_by_length=sort_by_length)
         elif self.data.test_dl:
             dl = self.data.test_dl
         else:
             dl = self.data.val_dl
 
-        all_logits = None
+        positions = None
+        if isinstance(dl.batch_sampler, LengthBucketSampler):
+            positions = np.concatenate(list(dl.batch_sampler))
+
+        all_probs = np.empty((len(dl.dataset), len(self.data.labels)), dtype=np.float32)
+        offset = 0
 
         self.model.eval()
-        for step, batch in enumerate(dl):
-            batch = tuple(t.to(self.device) for t in batch)
+        with inference_context(inference_mode):
+            for step, batch in enumerate(dl):
+                batch = tuple(t.to(self.device) for t in batch)
 
-            inputs = {"input_ids": batch[0], "attention_mask": batch[1], "labels": None}
+                inputs = {"input_ids": batch[0], "attention_mask": batch[1], "labels": None}
 
-            if self.model_type in ["bert", "xlnet"]:
-                inputs["token_type_ids"] = batch[2]
+                if self.model_type in ["bert", "xlnet"]:
+                    inputs["token_type_ids"] = batch[2]
 
-            with torch.no_grad():
                 outputs = self.model(**inputs)
                 logits = outputs[0]
                 if self.multi_label:
@@ -558,14 +576,62 @@ class BertLearner(Learner):
                 else:
                     logits = logits.softmax(dim=1)
 
-            if all_logits is None:
-                all_logits = logits.detach().cpu().numpy()
-            else:
-                all_logits = np.concatenate(
-                    (all_logits, logits.detach().cpu().numpy()), axis=0
-                )
+                rows = slice(offset, offset + logits.size(0))
+                if positions is None:
+                    all_probs[rows] = logits.cpu().numpy()
+                else:
+                    all_probs[positions[rows]] = logits.cpu().numpy()
+                offset += logits.size(0)
 
-        result_df = pd.DataFrame(all_logits, columns=self.data.labels)
-        results = result_df.to_dict("record")
+        return all_probs
 
-        return [sorted(x.items(), key=lambda kv: kv[1], reverse=True) for x in results]
+    def top_labels(self, probs, top_k=None):
+        """ (label, probability) pairs of each row of probs, by decreasing probability """
+        n_labels = probs.shape[1]
+        if top_k is None or top_k >= n_labels:
+            order = np.argsort(-probs, axis=1, kind="stable")
+        else:
+            candidates = np.argpartition(-probs, top_k - 1, axis=1)[:, :top_k]
+            # stable sort on the label position first so ties keep the order of the labels
+            candidates.sort(axis=1)
+            order = np.take_along_axis(
+                candidates,
+                np.argsort(-np.take_along_axis(probs, candidates, axis=1), axis=1, kind="stable"),
+                axis=1,
+            )
+        labels = np.asarray(self.data.labels, dtype=object)
+        top_probs = np.take_along_axis(probs, order, axis=1).tolist()
+        return [
+            list(zip(row_labels, row_probs))
+            for row_labels, row_probs in zip(labels[order].tolist(), top_probs)
+        ]
+
+    def predict_batch(self, texts=None, top_k=None, sort_by_length=None, inference_mode=True):
+        probs = self.predict_proba(
+            texts, sort_by_length=sort_by_length, inference_mode=inference_mode
+        )
+        return self.top_labels(probs, top_k)
+
+    def predict_batch_iter(
+        self, texts, chunk_size=10000, top_k=None, sort_by_length=None, inference_mode=True
+    ):
+        """ Yields the predictions of each text, converting and predicting `chunk_size` texts at a time """
+        chunk = []
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) == chunk_size:
+                for prediction in self.predict_batch(
+                    chunk, top_k, sort_by_length, inference_mode
+                ):
+                    yield prediction
+                chunk = []
+        if chunk:
+            for prediction in self.predict_batch(chunk, top_k, sort_by_length, inference_mode):
+                yield prediction
+
+
+def inference_context(inference_mode=True):
+    """ torch.inference_mode when requested and available (torch >= 1.9), torch.no_grad otherwise """
+    if inference_mode and hasattr(torch, "inference_mode"):
+        return torch.inference_mode()
+    return torch.no_grad()
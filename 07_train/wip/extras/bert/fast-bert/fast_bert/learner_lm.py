@@ -133,15 +133,18 @@ class BertLMLearner(Learner):
             epoch_loss = 0.0
             for step, batch in enumerate(progress_bar(train_dataloader, parent=pbar)):
 
+                # before mask_tokens, which changes the batch in place
+                attention_mask = self.data.attention_mask(batch)
                 inputs, labels = self.data.mask_tokens(batch)
                 cpu_device = torch.device('cpu')
 
                 inputs = inputs.to(self.device)
                 labels = labels.to(self.device)
+                attention_mask = attention_mask.to(self.device)
 
                 self.model.train()
 
-                outputs = self.model(inputs, masked_lm_labels=labels)
+                outputs = self.model(inputs, attention_mask=attention_mask, masked_lm_labels=labels)
                 loss = outputs[0]  # model outputs are always tuple in pytorch-transformers (see doc)
 
                 if self.n_gpu > 1:
@@ -228,9 +231,12 @@ class BertLMLearner(Learner):
         for step, batch in enumerate(progress_bar(self.data.val_dl)):
             self.model.eval()
             batch = batch.to(self.device)
+            attention_mask = self.data.attention_mask(batch)
+            # padding is not predicted
+            labels = batch.masked_fill(attention_mask == 0, -1)
 
             with torch.no_grad():
-                outputs = self.model(batch, masked_lm_labels=batch)
+                outputs = self.model(batch, attention_mask=attention_mask, masked_lm_labels=labels)
                 tmp_eval_loss = outputs[0]
                 eval_loss += tmp_eval_loss.mean().item()
 
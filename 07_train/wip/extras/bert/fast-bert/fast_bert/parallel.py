@@ -0,0 +1,58 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Conversion function and arguments (e.g. the tokenizer) of the worker process, sent once per worker
+_worker_state = {}
+
+
+def _init_worker(convert_fn, kwargs):
+    _worker_state["convert_fn"] = convert_fn
+    _worker_state["kwargs"] = kwargs
+
+
+def _convert_shard(shard):
+    return _worker_state["convert_fn"](shard, **_worker_state["kwargs"])
+
+
+def resolve_n_jobs(n_jobs):
+    """ number of worker processes, -1 or None meaning one per core """
+    if n_jobs is None or n_jobs < 0:
+        return os.cpu_count() or 1
+    return max(1, n_jobs)
+
+
+def convert_in_shards(
+    convert_fn, items, n_jobs=-1, shard_size=None, logger=None, **kwargs
+):
+    """ Applies `convert_fn(shard, **kwargs)` to contiguous shards of items in a process pool
+
+    `convert_fn` must be a module level function. Its keyword arguments, typically the tokenizer,
+    are pickled once per worker rather than once per shard. Shards are small enough to balance
+    the load between workers and results come back in the order of the items.
+
+    Returns:
+        list of (shard start index, result of convert_fn) in the order of the items
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    if shard_size is None:
+        shard_size = max(1, min(10000, math.ceil(len(items) / (n_jobs * 4))))
+    starts = list(range(0, len(items), shard_size))
+    shards = [items[start : start + shard_size] for start in starts]
+
+    if n_jobs == 1 or len(shards) <= 1:
+        return [(start, convert_fn(shard, **kwargs)) for start, shard in zip(starts, shards)]
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=_init_worker, initargs=(convert_fn, kwargs)
+    ) as executor:
+        for start, shard, result in zip(
+            starts, shards, executor.map(_convert_shard, shards)
+        ):
+            results.append((start, result))
+            if logger:
+                logger.info(
+                    "Converted example %d of %d", start + len(shard), len(items)
+                )
+    return results
@@ -95,12 +95,20 @@ class BertClassificationPredictor(object):
         multi_label=False,
         model_type="bert",
         do_lower_case=True,
+        bucket_by_length=False,
+        quantize=False,
     ):
+        """
+        `bucket_by_length` batches the texts to predict by length and pads each batch to its
+        longest text. `quantize` runs the model on CPU with int8 dynamically quantized linear layers.
+        """
         self.model_path = model_path
         self.label_path = label_path
         self.multi_label = multi_label
         self.model_type = model_type
         self.do_lower_case = do_lower_case
+        self.bucket_by_length = bucket_by_length
+        self.quantize = quantize
 
         self.learner = self.get_learner()
 
@@ -112,7 +120,7 @@ class BertClassificationPredictor(object):
             self.model_path, do_lower_case=self.do_lower_case
         )
 
-        if torch.cuda.is_available():
+        if torch.cuda.is_available() and not self.quantize:
             device = torch.device("cuda")
         else:
             device = torch.device("cpu")
@@ -129,6 +137,7 @@ class BertClassificationPredictor(object):
             multi_label=self.multi_label,
             model_type=self.model_type,
             no_cache=True,
+            bucket_by_length=self.bucket_by_length,
         )
 
         learner = BertLearner.from_pretrained_model(
@@ -145,10 +154,16 @@ class BertClassificationPredictor(object):
             logging_steps=0,
         )
 
+        if self.quantize:
+            learner.quantize_for_inference()
+
         return learner
 
-    def predict_batch(self, texts):
-        return self.learner.predict_batch(texts)
+    def predict_batch(self, texts, top_k=None):
+        return self.learner.predict_batch(texts, top_k=top_k)
+
+    def predict_batch_iter(self, texts, chunk_size=10000, top_k=None):
+        return self.learner.predict_batch_iter(texts, chunk_size=chunk_size, top_k=top_k)
 
     def predict(self, text):
         predictions = self.predict_batch([text])[0]
@@ -0,0 +1,78 @@
+import numpy as np
+import torch
+
+from fast_bert.bucketing import DynamicPaddingCollator, LengthBucketSampler
+
+
+def padded_items(lengths, max_seq_length=16, pad_on_left=False):
+    items = []
+    for index, length in enumerate(lengths):
+        input_ids = torch.zeros(max_seq_length, dtype=torch.long)
+        input_mask = torch.zeros(max_seq_length, dtype=torch.long)
+        tokens = slice(max_seq_length - length, None) if pad_on_left else slice(0, length)
+        input_ids[tokens] = torch.arange(1, length + 1)
+        input_mask[tokens] = 1
+        items.append((input_ids, input_mask, torch.zeros_like(input_ids), torch.tensor(index)))
+    return items
+
+
+def test_sampler_yields_every_index_once():
+    torch.manual_seed(0)
+    lengths = np.random.RandomState(0).randint(1, 64, size=1003)
+    sampler = LengthBucketSampler(lengths, batch_size=16, bucket_size_multiplier=4)
+
+    batches = list(sampler)
+
+    assert len(batches) == len(sampler)
+    assert sorted(index for batch in batches for index in batch) == list(range(len(lengths)))
+    assert all(len(batch) <= 16 for batch in batches)
+
+
+def test_sampler_sorts_batches_within_a_bucket():
+    torch.manual_seed(0)
+    lengths = np.random.RandomState(1).randint(1, 64, size=500)
+
+    for batch in LengthBucketSampler(lengths, batch_size=8, bucket_size_multiplier=10):
+        assert np.all(np.diff(lengths[batch]) >= 0)
+
+    unshuffled = LengthBucketSampler(lengths, batch_size=8, shuffle=False)
+    order = [index for batch in unshuffled for index in batch]
+    assert np.all(np.diff(lengths[order]) >= 0)
+
+
+def test_sampler_drop_last():
+    torch.manual_seed(0)
+    lengths = np.arange(100)
+    sampler = LengthBucketSampler(lengths, batch_size=16, bucket_size_multiplier=2, drop_last=True)
+
+    batches = list(sampler)
+
+    # pools of 32 items: the last pool of 4 items makes no full batch
+    assert len(batches) == len(sampler) == 6
+    assert all(len(batch) == 16 for batch in batches)
+    assert len(set(index for batch in batches for index in batch)) == 96
+
+
+def test_collator_pads_to_the_longest_item_of_the_batch():
+    input_ids, input_mask, segment_ids, labels = DynamicPaddingCollator()(padded_items([3, 7, 5]))
+
+    assert input_ids.shape == input_mask.shape == segment_ids.shape == (3, 7)
+    assert input_mask.sum(dim=1).tolist() == [3, 7, 5]
+    assert input_ids[1].tolist() == list(range(1, 8))
+    assert labels.tolist() == [0, 1, 2]
+
+
+def test_collator_trims_on_the_left_for_left_padded_models():
+    input_ids, input_mask, _, _ = DynamicPaddingCollator(pad_on_left=True)(
+        padded_items([2, 4], pad_on_left=True)
+    )
+
+    assert input_ids.shape == (2, 4)
+    assert input_mask.tolist() == [[0, 0, 1, 1], [1, 1, 1, 1]]
+    assert input_ids[0, 2:].tolist() == [1, 2]
+
+
+def test_collator_keeps_one_column_for_empty_items():
+    input_ids, input_mask, _, _ = DynamicPaddingCollator()(padded_items([0, 0]))
+
+    assert input_ids.shape == input_mask.shape == (2, 1)
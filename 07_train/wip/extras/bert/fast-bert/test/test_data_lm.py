@@ -0,0 +1,76 @@
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+from fast_bert.data_lm import BertLMDataBunch, LMBlockDataset, LMBlockIterableDataset, block_offsets
+from fast_bert.feature_cache import save_token_stream
+
+FIRST_ID = 1000
+
+
+class BlockTokenizer(object):
+    """ The special tokens of a BERT tokenizer, all the datasets use """
+
+    pad_token_id, cls_token_id, sep_token_id = 0, 101, 102
+
+    def build_inputs_with_special_tokens(self, token_ids):
+        return [self.cls_token_id] + list(token_ids) + [self.sep_token_id]
+
+
+def token_stream(tmp_path, num_tokens):
+    cache_path = str(tmp_path / "tokens")
+    save_token_stream(cache_path, [np.arange(FIRST_ID, FIRST_ID + num_tokens)])
+    return cache_path
+
+
+def test_block_offsets():
+    assert block_offsets(10, 4).tolist() == [0, 4]
+    assert block_offsets(10, 4, pad_last=True).tolist() == [0, 4, 8]
+    assert block_offsets(3, 4, pad_last=True).tolist() == [0]
+    assert block_offsets(0, 4, pad_last=True).tolist() == []
+    # overlapping windows
+    assert block_offsets(9, 4, stride=2, pad_last=True).tolist() == [0, 2, 4, 8]
+
+
+def test_block_offsets_pad_last_starts_at_the_first_uncovered_token():
+    # the next stride would start at or past the end of the stream
+    assert block_offsets(9, 4, stride=6, pad_last=True).tolist() == [0, 4]
+    assert block_offsets(11, 4, stride=6, pad_last=True).tolist() == [0, 6, 10]
+
+
+def test_padded_block_is_masked_out(tmp_path):
+    tokenizer = BlockTokenizer()
+    dataset = LMBlockDataset(token_stream(tmp_path, 10), tokenizer, block_size=4, pad_last=True)
+
+    assert len(dataset) == 3
+    last = dataset[2]
+    assert last.tolist() == [
+        tokenizer.cls_token_id, FIRST_ID + 8, FIRST_ID + 9, tokenizer.sep_token_id,
+        tokenizer.pad_token_id, tokenizer.pad_token_id,
+    ]
+
+    data = BertLMDataBunch.__new__(BertLMDataBunch)
+    data.tokenizer = tokenizer
+    assert data.attention_mask(last).tolist() == [1, 1, 1, 1, 0, 0]
+    assert data.attention_mask(dataset[0]).tolist() == [1] * 6
+
+
+def test_shuffled_workers_read_every_block_once(tmp_path):
+    torch.manual_seed(0)
+    block_size, num_blocks = 4, 1000
+    dataset = LMBlockIterableDataset(
+        token_stream(tmp_path, block_size * num_blocks),
+        BlockTokenizer(),
+        block_size=block_size,
+        shuffle=True,
+        window_size=16,
+    )
+    loader = DataLoader(dataset, batch_size=None, num_workers=2)
+
+    orders = []
+    for _ in range(2):
+        # the first token after [CLS] gives the index of the block
+        blocks = [(int(item[1]) - FIRST_ID) // block_size for item in loader]
+        assert sorted(blocks) == list(range(num_blocks))
+        orders.append(blocks)
+    assert orders[0] != orders[1]
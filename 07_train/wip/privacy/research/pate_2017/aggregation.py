@@ -19,7 +19,6 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
-from six.moves import xrange
 
 
 def labels_from_probs(probs):
@@ -40,52 +39,78 @@ def labels_from_probs(probs):
   return np.asarray(labels, dtype=np.int32)
 
 
-def noisy_max(logits, lap_scale, return_clean_votes=False):
+def vote_counts(labels, nb_classes):
   """
-  This aggregation mechanism takes the softmax/logit output of several models
-  resulting from inference on identical inputs and computes the noisy-max of
-  the votes for candidate classes to select a label for each sample: it
-  adds Laplacian noise to label counts and returns the most frequent label.
-  :param logits: logits or probabilities for each sample
-  :param lap_scale: scale of the Laplacian noise to be added to counts
+  Helper function: counts the votes of the teachers for each class and sample
+  in a single scatter-add over all samples.
+  :param labels: array of shape (nb_teachers, nb_samples) holding the label
+                 predicted by each teacher for each sample
+  :param nb_classes: number of candidate classes
+  :return: array of shape (nb_samples, nb_classes) with the vote counts
+  """
+  nb_samples = np.shape(labels)[1]
+  # Offset the labels of each sample so that each (sample, class) pair gets
+  # its own bin
+  bins = labels + nb_classes * np.arange(nb_samples)
+  counts = np.bincount(bins.ravel(), minlength=nb_samples * nb_classes)
+  return counts.reshape((nb_samples, nb_classes))
+
+
+def noisy_max_vectorized(logits, noise_scale, noise_type='laplace',
+                         threshold=None, threshold_sigma=None,
+                         return_clean_votes=False):
+  """
+  Vectorized noisy-max aggregation of the votes of teacher ensembles, for any
+  number of classes. The votes of all samples are counted at once and the
+  noise of all samples and classes is drawn in a single call.
+  With noise_type='laplace' this is the mechanism of noisy_max() below. With
+  noise_type='gaussian' it is GNMax, and if threshold is set it is
+  Confident-GNMax (https://arxiv.org/abs/1802.08908): a sample only gets a
+  label if its largest vote count, plus Gaussian noise of standard deviation
+  threshold_sigma, reaches the threshold.
+  :param logits: logits or probabilities of each teacher for each sample, of
+                 shape (nb_teachers, nb_samples, nb_classes)
+  :param noise_scale: scale of the Laplacian noise, or standard deviation of
+                      the Gaussian noise, added to counts
+  :param noise_type: 'laplace' or 'gaussian'
+  :param threshold: if set, threshold of Confident-GNMax
+  :param threshold_sigma: standard deviation of the Gaussian noise added to
+                          the largest vote counts before thresholding
   :param return_clean_votes: if set to True, also returns clean votes (without
-                      Laplacian noise). This can be used to perform the
-                      privacy analysis of this aggregation mechanism.
+                      noise). This can be used to perform the privacy
+                      analysis of this aggregation mechanism.
   :return: pair of result and (if clean_votes is set to True) the clean counts
            for each class per sample and the original labels produced by
-           the teachers.
+           the teachers. Samples that are not answered are labeled -1.
   """
+  if noise_type not in ('laplace', 'gaussian'):
+    raise ValueError('noise_type must be "laplace" or "gaussian"')
+  if threshold is not None and threshold_sigma is None:
+    raise ValueError('threshold_sigma is required with a threshold')
 
   # Compute labels from logits/probs and reshape array properly
   labels = labels_from_probs(logits)
   labels_shape = np.shape(labels)
   labels = labels.reshape((labels_shape[0], labels_shape[1]))
 
-  # Initialize array to hold final labels
-  result = np.zeros(int(labels_shape[1]))
-
-  if return_clean_votes:
-    # Initialize array to hold clean votes for each sample
-    clean_votes = np.zeros((int(labels_shape[1]), 10))
-
-  # Parse each sample
-  for i in xrange(int(labels_shape[1])):
-    # Count number of votes assigned to each class
-    label_counts = np.bincount(labels[:, i], minlength=10)
-
-    if return_clean_votes:
-      # Store vote counts for export
-      clean_votes[i] = label_counts
+  clean_votes = vote_counts(labels, np.shape(logits)[-1])
 
-    # Cast in float32 to prepare before addition of Laplacian noise
-    label_counts = np.asarray(label_counts, dtype=np.float32)
+  # Sample independent noise for each sample and class
+  if noise_type == 'laplace':
+    noise = np.random.laplace(loc=0.0, scale=float(noise_scale),
+                              size=clean_votes.shape)
+  else:
+    noise = np.random.normal(loc=0.0, scale=float(noise_scale),
+                             size=clean_votes.shape)
 
-    # Sample independent Laplacian noise for each class
-    for item in xrange(10):
-      label_counts[item] += np.random.laplace(loc=0.0, scale=float(lap_scale))
+  # Result is the most frequent label
+  result = np.argmax(clean_votes + noise, axis=1)
 
-    # Result is the most frequent label
-    result[i] = np.argmax(label_counts)
+  if threshold is not None:
+    # Only answer the samples on which the teachers are confident enough
+    noisy_max_votes = np.max(clean_votes, axis=1) + np.random.normal(
+        loc=0.0, scale=float(threshold_sigma), size=len(result))
+    result = np.where(noisy_max_votes >= threshold, result, -1)
 
   # Cast labels to np.int32 for compatibility with deep_cnn.py feed dictionaries
   result = np.asarray(result, dtype=np.int32)
@@ -101,6 +126,26 @@ def noisy_max(logits, lap_scale, return_clean_votes=False):
     return result
 
 
+def noisy_max(logits, lap_scale, return_clean_votes=False):
+  """
+  This aggregation mechanism takes the softmax/logit output of several models
+  resulting from inference on identical inputs and computes the noisy-max of
+  the votes for candidate classes to select a label for each sample: it
+  adds Laplacian noise to label counts and returns the most frequent label.
+  It runs noisy_max_vectorized() with Laplacian noise.
+  :param logits: logits or probabilities for each sample
+  :param lap_scale: scale of the Laplacian noise to be added to counts
+  :param return_clean_votes: if set to True, also returns clean votes (without
+                      Laplacian noise). This can be used to perform the
+                      privacy analysis of this aggregation mechanism.
+  :return: pair of result and (if clean_votes is set to True) the clean counts
+           for each class per sample and the original labels produced by
+           the teachers.
+  """
+  return noisy_max_vectorized(logits, lap_scale, noise_type='laplace',
+                              return_clean_votes=return_clean_votes)
+
+
 def aggregation_most_frequent(logits):
   """
   This aggregation mechanism takes the softmax/logit output of several models
@@ -114,17 +159,8 @@ def aggregation_most_frequent(logits):
   labels_shape = np.shape(labels)
   labels = labels.reshape((labels_shape[0], labels_shape[1]))
 
-  # Initialize array to hold final labels
-  result = np.zeros(int(labels_shape[1]))
-
-  # Parse each sample
-  for i in xrange(int(labels_shape[1])):
-    # Count number of votes assigned to each class
-    label_counts = np.bincount(labels[:, i], minlength=10)
-
-    label_counts = np.asarray(label_counts, dtype=np.int32)
-
-    # Result is the most frequent label
-    result[i] = np.argmax(label_counts)
+  # Count number of votes assigned to each class for all samples
+  label_counts = vote_counts(labels, np.shape(logits)[-1])
 
-  return np.asarray(result, dtype=np.int32)
+  # Result is the most frequent label
+  return np.asarray(np.argmax(label_counts, axis=1), dtype=np.int32)
@@ -0,0 +1,91 @@
+# Copyright 2016 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Tests for pate_2017.aggregation."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+import numpy as np
+
+import aggregation
+
+
+def teacher_logits(nb_teachers, nb_samples, nb_classes, seed=0):
+  """Random one-hot teacher predictions, with a clear plurality per sample."""
+  rng = np.random.RandomState(seed)
+  # Most teachers vote for the sample's true class, the others vote at random
+  true_labels = rng.randint(nb_classes, size=nb_samples)
+  labels = np.where(rng.rand(nb_teachers, nb_samples) < 0.7, true_labels,
+                    rng.randint(nb_classes, size=(nb_teachers, nb_samples)))
+  return np.eye(nb_classes)[labels]
+
+
+class AggregationTest(unittest.TestCase):
+
+  def test_vote_counts(self):
+    labels = np.array([[0, 2], [0, 1], [1, 2]])
+    np.testing.assert_array_equal(aggregation.vote_counts(labels, 3),
+                                  [[2, 1, 0], [0, 1, 2]])
+
+  def test_gaussian_with_small_noise_is_most_frequent(self):
+    for nb_classes in (2, 10, 37):
+      logits = teacher_logits(25, 200, nb_classes, seed=nb_classes)
+      result, clean_votes, _ = aggregation.noisy_max_vectorized(
+          logits, 1e-6, noise_type='gaussian', return_clean_votes=True)
+      self.assertEqual(clean_votes.shape, (200, nb_classes))
+      np.testing.assert_array_equal(result, np.argmax(clean_votes, axis=1))
+      np.testing.assert_array_equal(
+          result, aggregation.aggregation_most_frequent(logits))
+      self.assertEqual(result.dtype, np.int32)
+
+  def test_laplace_with_small_noise_is_most_frequent(self):
+    logits = teacher_logits(25, 200, 7)
+    np.testing.assert_array_equal(
+        aggregation.noisy_max(logits, 1e-6),
+        aggregation.aggregation_most_frequent(logits))
+
+  def test_confident_gnmax_leaves_unconfident_samples_unanswered(self):
+    nb_teachers = 20
+    logits = teacher_logits(nb_teachers, 300, 5)
+    result, clean_votes, _ = aggregation.noisy_max_vectorized(
+        logits, 1e-6, noise_type='gaussian', threshold=14.5,
+        threshold_sigma=1e-6, return_clean_votes=True)
+    confident = np.max(clean_votes, axis=1) >= 14.5
+    self.assertTrue(np.any(confident))
+    self.assertFalse(np.all(confident))
+    np.testing.assert_array_equal(result[~confident], -1)
+    np.testing.assert_array_equal(result[confident],
+                                  np.argmax(clean_votes[confident], axis=1))
+
+    # No sample has more votes than teachers
+    result = aggregation.noisy_max_vectorized(
+        logits, 1e-6, noise_type='gaussian', threshold=nb_teachers + 0.5,
+        threshold_sigma=1e-6)
+    np.testing.assert_array_equal(result, -1)
+
+  def test_value_errors(self):
+    logits = teacher_logits(5, 10, 3)
+    with self.assertRaises(ValueError):
+      aggregation.noisy_max_vectorized(logits, 1., noise_type='uniform')
+    with self.assertRaises(ValueError):
+      aggregation.noisy_max_vectorized(logits, 1., noise_type='gaussian',
+                                       threshold=3)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -57,30 +57,87 @@ flags.DEFINE_string('figures_dir', '', 'Path where figures are written to.')
 
 flags.mark_flag_as_required('counts_file')
 
-def run_analysis(votes, mechanism, noise_scale, params):
+def _rdp_of_queries(votes, mechanism, noise_scale, params, orders):
+  """Computes the privacy cost of each query of a matrix of votes.
+
+  Args:
+    votes: A matrix of votes, where each row contains votes in one instance.
+    mechanism: A name of the mechanism ('lnmax', 'gnmax', or 'gnmax_conf')
+    noise_scale: A mechanism privacy parameter.
+    params: Other privacy parameters.
+    orders: An array of Renyi orders.
+
+  Returns:
+    Four arrays, with one row per query: the RDP cost and its second moment,
+    the RDP cost of the selection step (one row per query and one column per
+    order) and the probability that the query is answered.
+  """
+  n = votes.shape[0]
+  if mechanism == 'lnmax':
+    logq_lnmax = pate.compute_logq_laplace_batch(votes, noise_scale)
+    rdp_query = pate.rdp_pure_eps_batch(logq_lnmax, 2. / noise_scale, orders)
+    rdp_sqrd = rdp_query ** 2
+    rdp_select = np.zeros_like(rdp_query)
+    pr_answered = np.ones(n)
+  elif mechanism == 'gnmax':
+    logq_gmax = pate.compute_logq_gaussian_batch(votes, noise_scale)
+    rdp_query = pate.rdp_gaussian_batch(logq_gmax, noise_scale, orders)
+    rdp_sqrd = rdp_query ** 2
+    rdp_select = np.zeros_like(rdp_query)
+    pr_answered = np.ones(n)
+  elif mechanism == 'gnmax_conf':
+    logq_step1 = pate.compute_logpr_answered_batch(params['t'],
+                                                   params['sigma1'], votes)
+    logq_step2 = pate.compute_logq_gaussian_batch(votes, noise_scale)
+    q_step1 = np.exp(logq_step1)
+    logq_step1_min = np.minimum(logq_step1, np.log1p(-q_step1))
+    rdp_gnmax_step1 = pate.rdp_gaussian_batch(logq_step1_min,
+                                              2 ** .5 * params['sigma1'],
+                                              orders)
+    rdp_gnmax_step2 = pate.rdp_gaussian_batch(logq_step2, noise_scale, orders)
+    q_step1 = q_step1[:, None]
+    rdp_query = rdp_gnmax_step1 + q_step1 * rdp_gnmax_step2
+    # The expression below evaluates
+    #     E[(cost_of_step_1 + Bernoulli(pr_of_step_2) * cost_of_step_2)^2]
+    rdp_sqrd = (
+        rdp_gnmax_step1 ** 2 + 2 * rdp_gnmax_step1 * q_step1 * rdp_gnmax_step2
+        + q_step1 * rdp_gnmax_step2 ** 2)
+    rdp_select = rdp_gnmax_step1
+    pr_answered = q_step1[:, 0]
+  else:
+    raise ValueError(
+        'Mechanism must be one of ["lnmax", "gnmax", "gnmax_conf"]')
+  return rdp_query, rdp_sqrd, rdp_select, pr_answered
+
+
+def _cumsum(total, values):
+  """Running sums of values along the first axis, starting from total.
+
+  Adds the values one by one to total, so that the sums are the same as those
+  accumulated query by query.
+  """
+  return np.cumsum(np.concatenate([[total], values]), axis=0)[1:]
+
+
+def run_analysis(votes, mechanism, noise_scale, params, chunk_size=10000):
   """Computes data-dependent privacy.
 
+  The privacy costs of all queries and orders are computed at once, chunk_size
+  queries at a time, and accumulated over queries with cumulative sums.
+
   Args:
     votes: A matrix of votes, where each row contains votes in one instance.
     mechanism: A name of the mechanism ('lnmax', 'gnmax', or 'gnmax_conf')
     noise_scale: A mechanism privacy parameter.
     params: Other privacy parameters.
+    chunk_size: Number of queries whose costs are computed together, which
+      bounds the memory used to chunk_size times the number of orders.
 
   Returns:
     Four lists: cumulative privacy cost epsilon, how privacy budget is split,
     how many queries were answered, optimal order.
   """
 
-  def compute_partition(order_opt, eps):
-    order_opt_idx = np.searchsorted(orders, order_opt)
-    if mechanism == 'gnmax_conf':
-      p = (rdp_select_cum[order_opt_idx],
-           rdp_cum[order_opt_idx] - rdp_select_cum[order_opt_idx],
-           -math.log(delta) / (order_opt - 1))
-    else:
-      p = (rdp_cum[order_opt_idx], -math.log(delta) / (order_opt - 1))
-    return [x / eps for x in p]  # Ensures that sum(x) == 1
-
   # Short list of orders.
   # orders = np.round(np.concatenate((np.arange(2, 50 + 1, 1),
   #                   np.logspace(np.log10(50), np.log10(1000), num=20))))
@@ -101,58 +158,49 @@ def run_analysis(votes, mechanism, noise_scale, params):
   rdp_select_cum = np.zeros(len(orders))
   answered_sum = 0
 
-  for i in range(n):
-    v = votes[i,]
-    if mechanism == 'lnmax':
-      logq_lnmax = pate.compute_logq_laplace(v, noise_scale)
-      rdp_query = pate.rdp_pure_eps(logq_lnmax, 2. / noise_scale, orders)
-      rdp_sqrd = rdp_query ** 2
-      pr_answered = 1
-    elif mechanism == 'gnmax':
-      logq_gmax = pate.compute_logq_gaussian(v, noise_scale)
-      rdp_query = pate.rdp_gaussian(logq_gmax, noise_scale, orders)
-      rdp_sqrd = rdp_query ** 2
-      pr_answered = 1
-    elif mechanism == 'gnmax_conf':
-      logq_step1 = pate.compute_logpr_answered(params['t'], params['sigma1'], v)
-      logq_step2 = pate.compute_logq_gaussian(v, noise_scale)
-      q_step1 = np.exp(logq_step1)
-      logq_step1_min = min(logq_step1, math.log1p(-q_step1))
-      rdp_gnmax_step1 = pate.rdp_gaussian(logq_step1_min,
-                                          2 ** .5 * params['sigma1'], orders)
-      rdp_gnmax_step2 = pate.rdp_gaussian(logq_step2, noise_scale, orders)
-      rdp_query = rdp_gnmax_step1 + q_step1 * rdp_gnmax_step2
-      # The expression below evaluates
-      #     E[(cost_of_step_1 + Bernoulli(pr_of_step_2) * cost_of_step_2)^2]
-      rdp_sqrd = (
-          rdp_gnmax_step1 ** 2 + 2 * rdp_gnmax_step1 * q_step1 * rdp_gnmax_step2
-          + q_step1 * rdp_gnmax_step2 ** 2)
-      rdp_select_cum += rdp_gnmax_step1
-      pr_answered = q_step1
+  for start in range(0, n, chunk_size):
+    end = min(start + chunk_size, n)
+    rdp_query, rdp_sqrd, rdp_select, pr_answered = _rdp_of_queries(
+        votes[start:end], mechanism, noise_scale, params, orders)
+
+    # Costs of the first i + 1 queries, one row per i.
+    rdp_cums = _cumsum(rdp_cum, rdp_query)
+    rdp_sqrd_cums = _cumsum(rdp_sqrd_cum, rdp_sqrd)
+    rdp_select_cums = _cumsum(rdp_select_cum, rdp_select)
+    answered[start:end] = _cumsum(answered_sum, pr_answered)
+
+    eps_total[start:end], order_opt[start:end] = (
+        pate.compute_eps_from_delta_batch(orders, rdp_cums, delta))
+    order_opt_idx = np.searchsorted(orders, order_opt[start:end])[:, None]
+    rdp_cum_opt = np.take_along_axis(rdp_cums, order_opt_idx, axis=1)[:, 0]
+    delta_opt = -math.log(delta) / (order_opt[start:end] - 1)
+    if mechanism == 'gnmax_conf':
+      rdp_select_opt = np.take_along_axis(rdp_select_cums, order_opt_idx,
+                                          axis=1)[:, 0]
+      p = (rdp_select_opt, rdp_cum_opt - rdp_select_opt, delta_opt)
     else:
-      raise ValueError(
-          'Mechanism must be one of ["lnmax", "gnmax", "gnmax_conf"]')
-
-    rdp_cum += rdp_query
-    rdp_sqrd_cum += rdp_sqrd
-    answered_sum += pr_answered
-
-    answered[i] = answered_sum
-    eps_total[i], order_opt[i] = pate.compute_eps_from_delta(
-        orders, rdp_cum, delta)
-    partition[i] = compute_partition(order_opt[i], eps_total[i])
-
-    if i > 0 and (i + 1) % 1000 == 0:
-      rdp_var = rdp_sqrd_cum / i - (
-          rdp_cum / i) ** 2  # Ignore Bessel's correction.
-      order_opt_idx = np.searchsorted(orders, order_opt[i])
-      eps_std = ((i + 1) * rdp_var[order_opt_idx]) ** .5  # Std of the sum.
-      print(
-          'queries = {}, E[answered] = {:.2f}, E[eps] = {:.3f} (std = {:.5f}) '
-          'at order = {:.2f} (contribution from delta = {:.3f})'.format(
-              i + 1, answered_sum, eps_total[i], eps_std, order_opt[i],
-              -math.log(delta) / (order_opt[i] - 1)))
-      sys.stdout.flush()
+      p = (rdp_cum_opt, delta_opt)
+    # Ensures that sum(x) == 1
+    partition[start:end] = [
+        list(x) for x in np.stack(p, axis=1) / eps_total[start:end, None]]
+
+    for i in range(start, end):
+      if i > 0 and (i + 1) % 1000 == 0:
+        j = i - start
+        rdp_var = rdp_sqrd_cums[j] / i - (
+            rdp_cums[j] / i) ** 2  # Ignore Bessel's correction.
+        eps_std = ((i + 1) * rdp_var[order_opt_idx[j, 0]]) ** .5  # Std of sum.
+        print(
+            'queries = {}, E[answered] = {:.2f}, E[eps] = {:.3f} (std = {:.5f}) '
+            'at order = {:.2f} (contribution from delta = {:.3f})'.format(
+                i + 1, answered[i], eps_total[i], eps_std, order_opt[i],
+                delta_opt[j]))
+        sys.stdout.flush()
+
+    rdp_cum = rdp_cums[-1]
+    rdp_sqrd_cum = rdp_sqrd_cums[-1]
+    rdp_select_cum = rdp_select_cums[-1]
+    answered_sum = answered[end - 1]
 
   return eps_total, partition, answered, order_opt
 
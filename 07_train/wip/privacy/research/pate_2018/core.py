@@ -48,6 +48,16 @@ def _log1mexp(x):
     raise ValueError("Argument must be non-positive.")
 
 
+def _log1mexp_batch(x):
+  """Elementwise _log1mexp of an array of non-positive values."""
+  x = np.asarray(x, dtype=float)
+  if np.any(x > 0):
+    raise ValueError("Argument must be non-positive.")
+  with np.errstate(divide="ignore"):
+    return np.where(x < -1, np.log1p(-np.exp(np.minimum(x, -1))),
+                    np.log(-np.expm1(np.maximum(x, -1))))
+
+
 def compute_eps_from_delta(orders, rdp, delta):
   """Translates between RDP and (eps, delta)-DP.
 
@@ -69,6 +79,31 @@ def compute_eps_from_delta(orders, rdp, delta):
   return eps[idx_opt], orders[idx_opt]
 
 
+def compute_eps_from_delta_batch(orders, rdp, delta):
+  """Translates between RDP and (eps, delta)-DP for many RDP curves at once.
+
+  Args:
+    orders: An array of orders.
+    rdp: A matrix of RDP guarantees, one curve per row and one order per
+      column.
+    delta: Target delta.
+
+  Returns:
+    Pair of arrays (eps, optimal_order), with one entry per row of rdp.
+
+  Raises:
+    ValueError: If input is malformed.
+  """
+  orders = np.asarray(orders)
+  rdp = np.asarray(rdp)
+  if rdp.shape[-1] != len(orders):
+    raise ValueError("Input lists must have the same length.")
+  eps = rdp - math.log(delta) / (orders - 1)
+  idx_opt = np.argmin(eps, axis=-1)
+  eps_opt = np.take_along_axis(eps, idx_opt[..., None], axis=-1)[..., 0]
+  return eps_opt, orders[idx_opt]
+
+
 #####################
 # RDP FOR THE GNMAX #
 #####################
@@ -106,6 +141,30 @@ def compute_logq_gaussian(counts, sigma):
   return min(logq, math.log(1 - (1 / n)))
 
 
+def compute_logq_gaussian_batch(votes, sigma):
+  """Vectorized compute_logq_gaussian over the rows of a matrix of votes.
+
+  Args:
+    votes: A matrix of scores, one query per row.
+    sigma: The standard deviation of the Gaussian noise in the GNMax mechanism.
+
+  Returns:
+    Array of the upper bounds on ln Pr[outcome != argmax] of each query.
+  """
+  votes = np.asarray(votes)
+  num_classes = votes.shape[1]
+  idx_max = np.argmax(votes, axis=1)[:, None]
+  counts_normalized = np.take_along_axis(votes, idx_max, 1) - votes
+  logsf = scipy.stats.norm.logsf(counts_normalized,
+                                 scale=math.sqrt(2 * sigma**2))
+  # Exclude the argmax of each row from the union bound.
+  is_max = np.arange(num_classes) == idx_max
+  logsf[is_max] = -np.inf
+  m = np.max(logsf, axis=1)
+  logq = m + np.log(np.sum(np.exp(logsf - m[:, None]), axis=1))
+  return np.minimum(logq, math.log(1 - (1 / num_classes)))
+
+
 def rdp_data_independent_gaussian(sigma, orders):
   """Computes a data-independent RDP curve for GNMax.
 
@@ -195,6 +254,64 @@ def rdp_gaussian(logq, sigma, orders):
     return ret
 
 
+def rdp_gaussian_batch(logq, sigma, orders):
+  """Vectorized rdp_gaussian over an array of bounds on q.
+
+  Args:
+    logq: Array of natural logarithms of the probability of a non-argmax
+      outcome, one per query.
+    sigma: Standard deviation of Gaussian noise.
+    orders: An array of Renyi orders.
+
+  Returns:
+    Matrix of upper bounds on RDP, one row per query and one column per order.
+
+  Raises:
+    ValueError: If the input is malformed.
+  """
+  logq = np.asarray(logq, dtype=float)[:, None]
+  orders = np.atleast_1d(orders)
+  if np.any(logq > 0) or sigma < 0 or np.any(orders <= 1):
+    raise ValueError("Inputs are malformed.")
+
+  variance = sigma**2
+  ret = np.broadcast_to(orders / variance, (logq.shape[0], len(orders))).copy()
+
+  # If the mechanism's output is fixed, it has 0-DP.
+  fixed = np.isneginf(logq[:, 0])
+  ret[fixed] = 0.
+  logq = logq[~fixed]
+
+  # See rdp_gaussian for the derivation, which is evaluated for all queries
+  # and only kept where its conditions hold.
+  with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+    mu_hi2 = np.sqrt(variance * -logq)
+    mu_hi1 = mu_hi2 + 1
+    mask = np.logical_and(mu_hi1 > orders, mu_hi2 > 1)
+
+    rdp_hi1 = mu_hi1 / variance
+    rdp_hi2 = mu_hi2 / variance
+    log_a2 = (mu_hi2 - 1) * rdp_hi2
+    applies = (np.any(mask, axis=1, keepdims=True) &
+               (logq <= log_a2 - mu_hi2 * (np.log(1 + 1 / (mu_hi1 - 1)) +
+                                           np.log(1 + 1 / (mu_hi2 - 1)))) &
+               (-logq > rdp_hi2))
+    mask &= applies
+
+    valid = np.where(applies, logq, -1.)
+    log1q = _log1mexp_batch(valid)
+    log_a = (orders - 1) * (log1q - _log1mexp_batch(
+        np.where(applies, (logq + rdp_hi2) * (1 - 1 / mu_hi2), -1.)))
+    log_b = (orders - 1) * (rdp_hi1 - logq / (mu_hi1 - 1))
+    log_s = np.logaddexp(log1q + log_a, logq + log_b)
+    dependent = ret[~fixed]
+    dependent[mask] = np.minimum(dependent, log_s / (orders - 1))[mask]
+  ret[~fixed] = dependent
+
+  assert np.all(ret >= 0)
+  return ret
+
+
 def is_data_independent_always_opt_gaussian(num_teachers, num_classes, sigma,
                                             orders):
   """Tests whether data-ind bound is always optimal for GNMax.
@@ -240,6 +357,12 @@ def compute_logpr_answered(t, sigma, counts):
   return scipy.stats.norm.logsf(t - round(max(counts)), scale=sigma)
 
 
+def compute_logpr_answered_batch(t, sigma, votes):
+  """Vectorized compute_logpr_answered over the rows of a matrix of votes."""
+  return scipy.stats.norm.logsf(t - np.round(np.max(votes, axis=1)),
+                                scale=sigma)
+
+
 def compute_rdp_data_independent_threshold(sigma, orders):
   # The input to the threshold mechanism has stability 1, compared to
   # GNMax, which has stability = 2. Hence the sqrt(2) factor below.
@@ -323,6 +446,28 @@ def compute_logq_laplace(counts, lmbd):
   return min(logq, math.log(1 - (1 / len(counts))))
 
 
+def compute_logq_laplace_batch(votes, lmbd):
+  """Vectorized compute_logq_laplace over the rows of a matrix of votes.
+
+  Args:
+    votes: A matrix of scores, one query per row.
+    lmbd: The lambda parameter of the Laplace distribution ~exp(-|x| / lambda).
+
+  Returns:
+    Array of the upper bounds on ln Pr[outcome != argmax] of each query.
+  """
+  votes = np.asarray(votes)
+  num_classes = votes.shape[1]
+  idx_max = np.argmax(votes, axis=1)[:, None]
+  counts_normalized = (votes - np.take_along_axis(votes, idx_max, 1)) / lmbd
+  terms = np.log(2 - counts_normalized) + math.log(.25) + counts_normalized
+  # Exclude the argmax of each row from the union bound.
+  terms[np.arange(num_classes) == idx_max] = -np.inf
+  m = np.max(terms, axis=1)
+  logq = m + np.log(np.sum(np.exp(terms - m[:, None]), axis=1))
+  return np.minimum(logq, math.log(1 - (1 / num_classes)))
+
+
 def rdp_pure_eps(logq, pure_eps, orders):
   """Computes the RDP value given logq and pure privacy eps.
 
@@ -362,6 +507,33 @@ def rdp_pure_eps(logq, pure_eps, orders):
     return ret
 
 
+def rdp_pure_eps_batch(logq, pure_eps, orders):
+  """Vectorized rdp_pure_eps over an array of bounds on q.
+
+  Args:
+    logq: Array of natural logarithms of the probability of a non-optimal
+      outcome, one per query.
+    pure_eps: eps parameter for DP
+    orders: array of moments to compute.
+
+  Returns:
+    Matrix of upper bounds on rdp, one row per query and one column per order.
+  """
+  logq = np.asarray(logq, dtype=float)[:, None]
+  orders = np.atleast_1d(orders)
+  q = np.exp(logq)
+  applies = q <= 1 / (math.exp(pure_eps) + 1)
+  log1q = np.log1p(-np.where(applies, q, 0.))
+  logt_one = log1q + (log1q - _log1mexp_batch(
+      np.where(applies, pure_eps + logq, -1.))) * (orders - 1)
+  logt_two = logq + pure_eps * (orders - 1)
+  log_t = np.where(applies, np.logaddexp(logt_one, logt_two), np.inf)
+
+  return np.minimum(
+      np.minimum(0.5 * pure_eps * pure_eps * orders, log_t / (orders - 1)),
+      pure_eps)
+
+
 def main(argv):
   del argv  # Unused.
 
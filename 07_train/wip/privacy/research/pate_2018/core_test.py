@@ -111,6 +111,46 @@ class PateTest(unittest.TestCase):
       if count % 5 == 0:
         print("")
 
+  def test_gaussian_batch(self):
+    rng = np.random.RandomState(0)
+    votes = rng.multinomial(250, rng.dirichlet(np.ones(10) * .3), size=50)
+    orders = np.array([1.5, 2, 5, 10, 50, 100, 500])
+    for sigma in [5., 40., 200.]:
+      logq = pate.compute_logq_gaussian_batch(votes, sigma)
+      np.testing.assert_allclose(
+          logq, [pate.compute_logq_gaussian(v, sigma) for v in votes])
+      np.testing.assert_allclose(
+          pate.rdp_gaussian_batch(logq, sigma, orders),
+          [pate.rdp_gaussian(x, sigma, orders) for x in logq])
+    np.testing.assert_allclose(
+        pate.compute_logpr_answered_batch(150, 50, votes),
+        [pate.compute_logpr_answered(150, 50, v) for v in votes])
+    # The output of the mechanism is fixed.
+    np.testing.assert_array_equal(
+        pate.rdp_gaussian_batch([-np.inf], 1., orders), [np.zeros(7)])
+
+  def test_laplace_batch(self):
+    rng = np.random.RandomState(0)
+    votes = rng.multinomial(250, rng.dirichlet(np.ones(10) * .3), size=50)
+    orders = np.array([1.5, 2, 5, 10, 50, 100, 500])
+    for lmbd in [5., 50.]:
+      logq = pate.compute_logq_laplace_batch(votes, lmbd)
+      np.testing.assert_allclose(
+          logq, [pate.compute_logq_laplace(v, lmbd) for v in votes])
+      np.testing.assert_allclose(
+          pate.rdp_pure_eps_batch(logq, 2. / lmbd, orders),
+          [pate.rdp_pure_eps(x, 2. / lmbd, orders) for x in logq])
+
+  def test_compute_eps_from_delta_batch(self):
+    orders = np.array([1.1, 2.5, 32., 250.])
+    rdp = np.outer([1e-3, 1., 10.], orders)
+    eps, order_opt = pate.compute_eps_from_delta_batch(orders, rdp, 1e-6)
+    for i in range(len(rdp)):
+      self.assertEqual((eps[i], order_opt[i]),
+                       pate.compute_eps_from_delta(orders, rdp[i], 1e-6))
+    with self.assertRaises(ValueError):
+      pate.compute_eps_from_delta_batch(orders, rdp[:, 1:], 1e-6)
+
   def test_rdp_gaussian(self):
     self._test_rdp_gaussian_value_errors()
     self._test_rdp_gaussian_as_function_of_q()
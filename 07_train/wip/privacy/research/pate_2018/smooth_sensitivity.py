@@ -170,12 +170,190 @@ def _compute_local_sens_gnmax(logq, sigma, num_classes, order):
   return max(beta_bu_q - beta, beta - beta_bl_q)
 
 
+def _compute_data_dep_bound_gnmax_batch(sigma, logq, order):
+  """Vectorized _compute_data_dep_bound_gnmax over an array of logq."""
+  variance = sigma**2
+  mu2 = sigma * np.sqrt(-logq)
+  mu1 = mu2 + 1
+  eps1 = mu1 / variance
+  eps2 = mu2 / variance
+
+  log1q = np.log1p(-np.exp(logq))  # log1q = log(1-q)
+  log_a = (order - 1) * (
+      log1q - (np.log1p(-np.exp((logq + eps2) * (1 - 1 / mu2)))))
+  log_b = (order - 1) * (eps1 - logq / (mu1 - 1))
+
+  return np.logaddexp(log1q + log_a, logq + log_b) / (order - 1)
+
+
+def _compute_rdp_gnmax_batch(sigma, logq, order):
+  """Vectorized _compute_rdp_gnmax over an array of logq."""
+  logq0 = _compute_logq0(sigma, order)
+  dependent = logq < logq0
+  ret = np.full(logq.shape,
+                pate.rdp_data_independent_gaussian(sigma, order), dtype=float)
+  ret[dependent] = _compute_data_dep_bound_gnmax_batch(sigma, logq[dependent],
+                                                       order)
+  return ret
+
+
+def _compute_local_sens_gnmax_batch(logq, sigma, num_classes, order):
+  """Vectorized _compute_local_sens_gnmax over an array of logq."""
+  logq0 = _compute_logq0(sigma, order)
+  logq1 = _compute_logq1(sigma, order, num_classes)
+  logq = np.where((logq1 <= logq) & (logq <= logq0), logq1, logq)
+
+  q = np.exp(logq)
+  erfcinv = scipy.special.erfcinv(2 * q / (num_classes - 1))
+  bu_q = np.minimum(
+      1, (num_classes - 1) / 2 * scipy.special.erfc(-1 / sigma + erfcinv))
+  bl_q = (num_classes - 1) / 2 * scipy.special.erfc(1 / sigma + erfcinv)
+
+  beta = _compute_rdp_gnmax_batch(sigma, logq, order)
+  beta_bu_q = _compute_rdp_gnmax_batch(sigma, np.log(bu_q), order)
+  beta_bl_q = _compute_rdp_gnmax_batch(sigma, np.log(bl_q), order)
+  return np.maximum(beta_bu_q - beta, beta - beta_bl_q)
+
+
 def compute_local_sensitivity_bounds_gnmax(votes, num_teachers, sigma, order):
   """Computes a list of max-LS-at-distance-d for the GNMax mechanism.
 
   A more efficient implementation of Algorithms 4 and 5 working in time
   O(teachers*classes). A naive implementation is O(teachers^2*classes) or worse.
 
+  Args:
+    votes: A numpy array of votes.
+    num_teachers: Total number of voting teachers.
+    sigma: Standard deviation of the Guassian noise.
+    order: The Renyi order.
+
+  Returns:
+    A numpy array of local sensitivities at distances d, 0 <= d <= num_teachers.
+  """
+  votes = np.asarray(votes)
+  if np.all(votes == np.round(votes)):
+    return compute_local_sensitivity_bounds_gnmax_batch(
+        votes[np.newaxis], num_teachers, sigma, order)[0]
+  return _compute_local_sensitivity_bounds_gnmax_loop(votes, num_teachers,
+                                                      sigma, order)
+
+
+def _compute_logq_from_histograms(hist, top, base, logsf_table, num_classes):
+  """Computes logq of GNMax from histograms of the non-argmax votes.
+
+  Args:
+    hist: Matrix of counts, where hist[i, j] is the number of non-argmax votes
+      of query i equal to base + j.
+    top: Array of the argmax votes of the queries.
+    base: The vote of the first column of hist.
+    logsf_table: Array of the log survival function of the Gaussian noise of
+      GNMax at the gaps between top and the other votes, indexed by the gap
+      plus the number of columns of hist.
+    num_classes: The number of classes.
+
+  Returns:
+    Array of logq of each query, as computed by pate.compute_logq_gaussian.
+  """
+  width = hist.shape[1]
+  gaps = top[:, np.newaxis] - base - np.arange(width)
+  with np.errstate(divide="ignore"):
+    terms = np.log(hist) + logsf_table[gaps + width]
+  m = np.max(terms, axis=1)
+  logq = m + np.log(np.sum(np.exp(terms - m[:, np.newaxis]), axis=1))
+  return np.minimum(logq, math.log(1 - (1 / num_classes)))
+
+
+def compute_local_sensitivity_bounds_gnmax_batch(votes, num_teachers, sigma,
+                                                 order):
+  """Computes lists of max-LS-at-distance-d for many GNMax queries at once.
+
+  Takes the same steps as compute_local_sensitivity_bounds_gnmax for each
+  query, but keeps a histogram of the non-argmax votes of each query. A step
+  moves one vote between the argmax and the largest other vote, which changes
+  two counts of the histogram and keeps track of the largest other vote in
+  O(1), without sorting. logq is computed from the histogram and from a table
+  of the log survival function of the Gaussian at all integer gaps, for all
+  queries of the batch that are still walking.
+
+  Args:
+    votes: A matrix of integer votes, one query per row.
+    num_teachers: Total number of voting teachers.
+    sigma: Standard deviation of the Guassian noise.
+    order: The Renyi order.
+
+  Returns:
+    A matrix of local sensitivities at distances d, 0 <= d <= num_teachers,
+    with one row per query.
+  """
+  votes = np.asarray(votes)
+  num_queries, num_classes = votes.shape
+
+  logq0 = _compute_logq0(sigma, order)
+  logq1 = _compute_logq1(sigma, order, num_classes)
+  plateau = _compute_local_sens_gnmax(logq1, sigma, num_classes, order)
+  res = np.full((num_queries, num_teachers), plateau)
+  if num_queries == 0:
+    return res
+
+  votes = -np.sort(-np.round(votes).astype(np.int64), axis=1)
+  top = votes[:, 0].copy()
+  # The non-argmax votes stay between min(votes, 0) and the initial argmax
+  # vote, which grows by at most one per step.
+  base = min(votes.min(), 0)
+  width = votes.max() - base + 1
+  hist = np.zeros((num_queries, width), dtype=np.int64)
+  rows = np.repeat(np.arange(num_queries), num_classes - 1)
+  np.add.at(hist, (rows, votes[:, 1:].ravel() - base), 1)
+  second = votes[:, 1] - base  # Column of the largest non-argmax vote.
+  logsf_table = scipy.stats.norm.logsf(
+      np.arange(-width, width + num_teachers + 1),
+      scale=math.sqrt(2 * sigma**2))
+
+  logq = _compute_logq_from_histograms(hist, top, base, logsf_table,
+                                       num_classes)
+  go_left = logq > logq0  # Otherwise logq < logq1 and we go right.
+  active = go_left | (logq < logq1)
+  logqs, queries, distances = [logq[active]], [np.flatnonzero(active)], [0]
+
+  # See compute_local_sensitivity_bounds_gnmax for the conditions of the walk.
+  active &= np.where(go_left, second + base > 0, True)
+  curr_d = 0
+  while np.any(active) and curr_d + 1 < num_teachers:
+    curr_d += 1
+    idx = np.flatnonzero(active)
+    step = np.where(go_left[idx], -1, 1)  # Change of the second vote.
+    hist[idx, second[idx]] -= 1
+    hist[idx, second[idx] + step] += 1
+    top[idx] -= step
+    # Going left, the largest other vote only decreases when it was unique.
+    moved = (step > 0) | (hist[idx, second[idx]] == 0)
+    second[idx] += np.where(moved, step, 0)
+
+    logq_d = _compute_logq_from_histograms(hist[idx], top[idx], base,
+                                           logsf_table, num_classes)
+    logqs.append(logq_d)
+    queries.append(idx)
+    distances.append(curr_d)
+
+    active[idx] = np.where(go_left[idx],
+                           (logq_d > logq0) & (second[idx] + base > 0),
+                           logq_d < logq1)
+
+  local_sens = _compute_local_sens_gnmax_batch(
+      np.concatenate(logqs), sigma, num_classes, order)
+  res[np.concatenate(queries),
+      np.repeat(distances, [len(q) for q in queries])] = local_sens
+  return res
+
+
+def _compute_local_sensitivity_bounds_gnmax_loop(votes, num_teachers, sigma,
+                                                  order):
+  """Computes a list of max-LS-at-distance-d for the GNMax mechanism.
+
+  Walks the distances one at a time, recomputing logq from all votes at each
+  step. Unlike compute_local_sensitivity_bounds_gnmax_batch, it supports
+  votes that are not integers.
+
   Args:
     votes: A numpy array of votes.
     num_teachers: Total number of voting teachers.
@@ -302,11 +480,20 @@ def compute_discounted_max(beta, a):
 def compute_smooth_sensitivity_gnmax(beta, counts, num_teachers, sigma, order):
   """Computes smooth sensitivity of a single application of GNMax."""
 
-  ls = compute_local_sensitivity_bounds_gnmax(counts, sigma, order,
-                                              num_teachers)
+  ls = compute_local_sensitivity_bounds_gnmax(counts, num_teachers, sigma,
+                                              order)
   return compute_discounted_max(beta, ls)
 
 
+def compute_smooth_sensitivity_gnmax_batch(beta, votes, num_teachers, sigma,
+                                           order):
+  """Computes smooth sensitivities of GNMax for a matrix of votes, one per row."""
+
+  ls = compute_local_sensitivity_bounds_gnmax_batch(votes, num_teachers, sigma,
+                                                    order)
+  return np.max(ls * np.exp(-beta * np.arange(num_teachers)), axis=1)
+
+
 def compute_rdp_of_smooth_sensitivity_gaussian(beta, sigma, order):
   """Computes the RDP curve for the GNSS mechanism.
 
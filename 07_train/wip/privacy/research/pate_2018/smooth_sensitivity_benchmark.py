@@ -0,0 +1,89 @@
+# Copyright 2017 The 'Scalable Private Learning with PATE' Authors All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Benchmark of the local sensitivity bounds of GNMax.
+
+Draws a matrix of synthetic votes, one query per row, and times
+compute_local_sensitivity_bounds_gnmax_batch on the whole matrix against the
+query by query walk of _compute_local_sensitivity_bounds_gnmax_loop on its
+first reference_queries rows, whose results must agree.
+
+Example:
+  python smooth_sensitivity_benchmark.py --num_classes=1000 --num_queries=1000
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+from absl import app
+from absl import flags
+import numpy as np
+
+import smooth_sensitivity as pate_ss
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_integer('num_classes', 1000, 'Number of classes.')
+flags.DEFINE_integer('num_teachers', 250, 'Number of teachers.')
+flags.DEFINE_integer('num_queries', 1000, 'Number of queries.')
+flags.DEFINE_integer('reference_queries', 50,
+                     'Number of queries analyzed one at a time.')
+flags.DEFINE_float('concentration', .01,
+                   'Concentration of the Dirichlet distribution of the votes. '
+                   'Small values give confident teachers.')
+flags.DEFINE_float('sigma', 40., 'Standard deviation of the Gaussian noise.')
+flags.DEFINE_float('order', 20., 'Renyi order.')
+
+
+def main(argv):
+  del argv  # Unused.
+  rng = np.random.RandomState(0)
+  votes = np.stack([
+      rng.multinomial(FLAGS.num_teachers,
+                      rng.dirichlet([FLAGS.concentration] * FLAGS.num_classes))
+      for _ in range(FLAGS.num_queries)
+  ])
+  args = (FLAGS.num_teachers, FLAGS.sigma, FLAGS.order)
+  # Caches logq0 outside of the timed sections.
+  pate_ss.compute_local_sensitivity_bounds_gnmax_batch(votes[:1], *args)
+
+  start = time.perf_counter()
+  expected = [
+      pate_ss._compute_local_sensitivity_bounds_gnmax_loop(v, *args)  # pylint: disable=protected-access
+      for v in votes[:FLAGS.reference_queries]
+  ]
+  loop_seconds = time.perf_counter() - start
+
+  start = time.perf_counter()
+  ls = pate_ss.compute_local_sensitivity_bounds_gnmax_batch(votes, *args)
+  batch_seconds = time.perf_counter() - start
+
+  max_error = np.max(
+      np.abs(ls[:FLAGS.reference_queries] - expected) /
+      np.maximum(np.abs(expected), 1e-300))
+  loop_per_query = loop_seconds / FLAGS.reference_queries
+  batch_per_query = batch_seconds / FLAGS.num_queries
+  print('{:<8} {:>14} {:>10}'.format('method', 'ms per query', 'speedup'))
+  print('{:<8} {:>14.3f} {:>10.1f}'.format('loop', 1000 * loop_per_query, 1.))
+  print('{:<8} {:>14.3f} {:>10.1f}'.format('batch', 1000 * batch_per_query,
+                                           loop_per_query / batch_per_query))
+  print('Maximum relative difference: {:.2e}'.format(max_error))
+
+
+if __name__ == '__main__':
+  app.run(main)
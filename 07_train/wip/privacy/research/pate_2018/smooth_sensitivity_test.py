@@ -62,6 +62,28 @@ class PateSmoothSensitivityTest(unittest.TestCase):
                        [2.73113623988e-6] * 1700)
     self._assert_all_close(out2, answer2)
 
+  def test_compute_local_sensitivity_bounds_gnmax_batch(self):
+    rng = np.random.RandomState(0)
+    num_teachers = 100
+    for sigma, order in [(5., 5.), (40., 20.)]:
+      votes = rng.multinomial(num_teachers, rng.dirichlet([.1] * 20), size=20)
+      out = pate_ss.compute_local_sensitivity_bounds_gnmax_batch(
+          votes, num_teachers, sigma, order)
+      for v, out_v in zip(votes, out):
+        # pylint: disable=protected-access
+        self._assert_all_close(
+            out_v,
+            pate_ss._compute_local_sensitivity_bounds_gnmax_loop(
+                v, num_teachers, sigma, order))
+
+      beta = .4 / order
+      ss = pate_ss.compute_smooth_sensitivity_gnmax_batch(
+          beta, votes, num_teachers, sigma, order)
+      self._assert_all_close(ss, [
+          pate_ss.compute_smooth_sensitivity_gnmax(beta, v, num_teachers, sigma,
+                                                   order) for v in votes
+      ])
+
   def test_compute_local_sensitivity_bounds_threshold(self):
     counts1_3 = np.array([20, 10, 0])
     num_teachers = sum(counts1_3)
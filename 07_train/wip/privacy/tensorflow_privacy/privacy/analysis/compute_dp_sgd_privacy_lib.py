@@ -28,6 +28,7 @@ sys.skip_tf_privacy_import = True
 
 from tensorflow_privacy.privacy.analysis.rdp_accountant import compute_rdp  # pylint: disable=g-import-not-at-top
 from tensorflow_privacy.privacy.analysis.rdp_accountant import get_privacy_spent
+from tensorflow_privacy.privacy.analysis.rdp_calibration import calibrate_noise_multiplier
 
 
 def apply_dp_sgd_analysis(q, sigma, steps, orders, delta):
@@ -64,3 +65,20 @@ def compute_dp_sgd_privacy(n, batch_size, noise_multiplier, epochs, delta):
   steps = int(math.ceil(epochs * n / batch_size))
 
   return apply_dp_sgd_analysis(q, noise_multiplier, steps, orders, delta)
+
+
+def compute_noise(n, batch_size, target_eps, epochs, delta):
+  """Compute the smallest noise multiplier meeting the target epsilon."""
+  q = batch_size / n  # q - the sampling ratio.
+  if q > 1:
+    raise app.UsageError('n must be larger than the batch size.')
+  steps = int(math.ceil(epochs * n / batch_size))
+
+  noise_multiplier, eps, opt_order = calibrate_noise_multiplier(
+      target_eps, delta, q, steps)
+  print('DP-SGD with sampling rate = {:.3g}% iterated over {} steps needs '
+        'noise_multiplier = {:.4g} to satisfy differential privacy with '
+        'eps = {:.3g} and delta = {}.'.format(100 * q, steps, noise_multiplier,
+                                               eps, delta))
+  print('The optimal RDP order is {}.'.format(opt_order))
+  return noise_multiplier
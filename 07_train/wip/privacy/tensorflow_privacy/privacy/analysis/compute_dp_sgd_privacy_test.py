@@ -37,5 +37,15 @@ class ComputeDpSgdPrivacyTest(parameterized.TestCase):
     self.assertAlmostEqual(eps, expected_eps)
     self.assertAlmostEqual(order, expected_order)
 
+  @parameterized.named_parameters(
+      ('Test0', 60000, 150, 0.941870567, 15, 1e-5, 1.3),
+      ('Test1', 100000, 100, 1.70928734, 30, 1e-7, 1.0),
+  )
+  def test_compute_noise(self, n, batch_size, target_eps, epochs, delta,
+                         expected_noise):
+    noise_multiplier = compute_dp_sgd_privacy_lib.compute_noise(
+        n, batch_size, target_eps, epochs, delta)
+    self.assertAlmostEqual(noise_multiplier, expected_noise, delta=2e-4)
+
 if __name__ == '__main__':
   absltest.main()
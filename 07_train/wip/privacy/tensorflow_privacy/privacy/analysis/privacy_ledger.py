@@ -18,10 +18,12 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import threading
 
 import numpy as np
 import tensorflow.compat.v1 as tf
 
+from tensorflow_privacy.privacy.analysis import rdp_accountant
 from tensorflow_privacy.privacy.analysis import tensor_buffer
 from tensorflow_privacy.privacy.dp_query import dp_query
 
@@ -160,6 +162,107 @@ class PrivacyLedger(object):
     return format_ledger(sample_array, query_array)
 
 
+class StreamingPrivacyLedger(object):
+  """Ledger folding each sample into a running RDP instead of recording it.
+
+  The StreamingPrivacyLedger can be used wherever a PrivacyLedger is, e.g. with
+  QueryWithLedger or the `ledger` argument of the DP optimizers. Instead of
+  buffers growing with every sample, it keeps the RDP of the samples so far at
+  a fixed set of orders in an rdp_accountant.RdpAccumulator, so memory is
+  constant and the privacy spent can be queried at any step. The queries of a
+  sample are combined into one effective noise multiplier, as in
+  rdp_accountant.compute_rdp_from_ledger.
+
+  Each finalized sample runs a Python function through tf.numpy_function,
+  which works in eager mode, in tf.function and in graph mode, but not on TPU.
+  """
+
+  def __init__(self,
+               population_size,
+               selection_probability,
+               orders=rdp_accountant.DEFAULT_ORDERS):
+    """Initialize the StreamingPrivacyLedger.
+
+    Args:
+      population_size: An integer (may be variable) specifying the size of the
+        population, i.e. size of the training data used in each epoch.
+      selection_probability: A float (may be variable) specifying the
+        probability each record is included in a sample.
+      orders: An array of RDP orders at which the RDP is accumulated.
+
+    Raises:
+      ValueError: If selection_probability is 0.
+    """
+    if tf.executing_eagerly():
+      if tf.equal(selection_probability, 0):
+        raise ValueError('Selection probability cannot be 0.')
+    elif selection_probability == 0:
+      raise ValueError('Selection probability cannot be 0.')
+
+    self._population_size = population_size
+    self._selection_probability = selection_probability
+    self._accumulator = rdp_accountant.RdpAccumulator(orders)
+    self._lock = threading.Lock()
+
+    # Sum of (noise_stddev / l2_norm_bound)^-2 over the queries of the sample.
+    self._sample_precision = tf.Variable(
+        initial_value=0.0, trainable=False, name='sample_precision')
+
+  def record_sum_query(self, l2_norm_bound, noise_stddev):
+    """Records that a query was issued.
+
+    Args:
+      l2_norm_bound: The maximum l2 norm of the tensor group in the query.
+      noise_stddev: The standard deviation of the noise applied to the sum.
+
+    Returns:
+      An operation recording the sum query to the ledger.
+    """
+    noise_multiplier = tf.cast(noise_stddev, tf.float32) / tf.cast(
+        l2_norm_bound, tf.float32)
+    return self._sample_precision.assign_add(noise_multiplier**-2)
+
+  def _add_step(self, selection_probability, sample_precision):
+    with self._lock:
+      self._accumulator.add_steps(selection_probability,
+                                  sample_precision**-0.5)
+      return np.int64(self._accumulator.steps)
+
+  def finalize_sample(self):
+    """Folds the queries of the sample into the running RDP."""
+    steps = tf.numpy_function(self._add_step, [
+        tf.cast(self._selection_probability, tf.float64),
+        tf.cast(self._sample_precision.read_value(), tf.float64)
+    ], tf.int64)
+    with tf.control_dependencies([steps]):
+      return self._sample_precision.assign(0.0)
+
+  @property
+  def orders(self):
+    return self._accumulator.orders
+
+  @property
+  def steps(self):
+    """Number of samples finalized so far."""
+    return self._accumulator.steps
+
+  def get_rdp(self):
+    """Returns the RDP at all orders of the samples finalized so far."""
+    with self._lock:
+      return self._accumulator.get_rdp()
+
+  def get_privacy_spent(self, target_eps=None, target_delta=None):
+    """Computes delta (or eps) of the samples finalized so far.
+
+    See rdp_accountant.get_privacy_spent.
+
+    Returns:
+      eps, delta, opt_order.
+    """
+    return rdp_accountant.get_privacy_spent(self.orders, self.get_rdp(),
+                                            target_eps, target_delta)
+
+
 class QueryWithLedger(dp_query.DPQuery):
   """A class for DP queries that record events to a PrivacyLedger.
 
@@ -18,9 +18,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
 import tensorflow.compat.v1 as tf
 
 from tensorflow_privacy.privacy.analysis import privacy_ledger
+from tensorflow_privacy.privacy.analysis import rdp_accountant
 from tensorflow_privacy.privacy.dp_query import gaussian_query
 from tensorflow_privacy.privacy.dp_query import nested_query
 from tensorflow_privacy.privacy.dp_query import test_utils
@@ -133,5 +135,77 @@ class PrivacyLedgerTest(tf.test.TestCase):
     self.assertAllClose(sorted(sample_2.queries), sorted(expected_queries))
 
 
+class StreamingPrivacyLedgerTest(tf.test.TestCase):
+
+  def test_fail_on_probability_zero(self):
+    with self.assertRaisesRegexp(ValueError,
+                                 'Selection probability cannot be 0.'):
+      privacy_ledger.StreamingPrivacyLedger(10, 0)
+
+  def test_basic(self):
+    orders = range(2, 33)
+    ledger = privacy_ledger.StreamingPrivacyLedger(10, 0.1, orders)
+    self.assertEqual(ledger.steps, 0)
+    self.assertAllEqual(ledger.get_rdp(), np.zeros(len(orders)))
+
+    for _ in range(3):
+      ledger.record_sum_query(5.0, 1.0)
+      ledger.record_sum_query(2.0, 0.5)
+      ledger.finalize_sample()
+
+    # Two queries with noise multiplier 0.2 and 0.25 at each step.
+    z = (0.2**-2 + 0.25**-2)**-0.5
+    self.assertEqual(ledger.steps, 3)
+    self.assertAllClose(ledger.get_rdp(),
+                        rdp_accountant.compute_rdp(0.1, z, 3, orders))
+
+  def test_matches_privacy_ledger(self):
+    orders = rdp_accountant.DEFAULT_ORDERS
+    selection_probability = tf.Variable(1.0)
+    ledger = privacy_ledger.PrivacyLedger(10, selection_probability)
+    streaming_ledger = privacy_ledger.StreamingPrivacyLedger(
+        10, selection_probability, orders)
+
+    queries = []
+    for ledger_to_use in (ledger, streaming_ledger):
+      query1 = gaussian_query.GaussianAverageQuery(
+          l2_norm_clip=4.0, sum_stddev=2.0, denominator=5.0)
+      query2 = gaussian_query.GaussianAverageQuery(
+          l2_norm_clip=5.0, sum_stddev=8.0, denominator=5.0)
+      query = nested_query.NestedQuery([query1, query2])
+      queries.append(privacy_ledger.QueryWithLedger(query,
+                                                    ledger=ledger_to_use))
+
+    record = [1.0, [12.0, 9.0]]
+    for probability in (0.1, 0.1, 0.2, 0.1):
+      tf.assign(selection_probability, probability)
+      for query in queries:
+        test_utils.run_query(query, [record])
+
+    expected_rdp = rdp_accountant.compute_rdp_from_ledger(
+        ledger.get_formatted_ledger_eager(), orders)
+    self.assertEqual(streaming_ledger.steps, 4)
+    self.assertAllClose(streaming_ledger.get_rdp(), expected_rdp)
+    self.assertAllClose(
+        streaming_ledger.get_privacy_spent(target_delta=1e-5),
+        rdp_accountant.get_privacy_spent(orders, expected_rdp,
+                                         target_delta=1e-5))
+
+  def test_in_function(self):
+    orders = range(2, 33)
+    ledger = privacy_ledger.StreamingPrivacyLedger(10, 0.1, orders)
+
+    @tf.function
+    def step():
+      ledger.record_sum_query(2.0, 3.0)
+      return ledger.finalize_sample()
+
+    for _ in range(5):
+      step()
+    self.assertEqual(ledger.steps, 5)
+    self.assertAllClose(ledger.get_rdp(),
+                        rdp_accountant.compute_rdp(0.1, 1.5, 5, orders))
+
+
 if __name__ == '__main__':
   tf.test.main()
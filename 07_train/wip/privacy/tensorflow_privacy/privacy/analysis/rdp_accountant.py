@@ -15,9 +15,12 @@
 """RDP analysis of the Sampled Gaussian Mechanism.
 
 Functionality for computing Renyi differential privacy (RDP) of an additive
-Sampled Gaussian Mechanism (SGM). Its public interface consists of two methods:
+Sampled Gaussian Mechanism (SGM). Its public interface consists of three methods:
   compute_rdp(q, noise_multiplier, T, orders) computes RDP for SGM iterated
                                    T times.
+  compute_rdp_grid(q, noise_multiplier, orders) computes RDP of one step of SGM
+                                   for all orders over a grid of sampling rates
+                                   and noise multipliers, memoizing the values.
   get_privacy_spent(orders, rdp, target_eps, target_delta) computes delta
                                    (or eps) given RDP at multiple orders and
                                    a target value for eps (or delta).
@@ -166,6 +169,189 @@ def _log_erfc(x):
       return math.log(r)
 
 
+##########################
+# VECTORIZED COMPUTATION #
+##########################
+
+# Orders used by default by the calibration and the streaming accountant.
+DEFAULT_ORDERS = ([1.25, 1.5, 1.75, 2., 2.25, 2.5, 3., 3.5, 4., 4.5] +
+                  list(range(5, 64)) + [128, 256, 512])
+
+# RDP of a single step of the Sampled Gaussian Mechanism, keyed by
+# (q, sigma, order). Hyperparameter sweeps evaluate the same grid many times.
+_RDP_CACHE = {}
+_RDP_CACHE_MAX_SIZE = 1000000
+
+
+def clear_rdp_cache():
+  """Empty the cache of RDP values of compute_rdp_grid."""
+  _RDP_CACHE.clear()
+
+
+def _log_comb(n, k):
+  """Compute log(abs(binom(n, k))) for real n and integer k."""
+  return (special.gammaln(n + 1) - special.gammaln(k + 1) -
+          special.gammaln(n - k + 1))
+
+
+def _compute_log_a_int_vec(q, sigma, alpha):
+  """Vectorized _compute_log_a_int over 1-D arrays of q, sigma and alpha.
+
+  Rows are grouped by orders of the same power of two, so that small orders do
+  not evaluate the terms of the largest one, and the binomial coefficients are
+  computed once per distinct order.
+  """
+  log_a = np.empty(len(alpha))
+  buckets = np.ceil(np.log2(alpha)).astype(int)
+  for bucket in np.unique(buckets):
+    rows = np.flatnonzero(buckets == bucket)
+    orders, order_index = np.unique(alpha[rows], return_inverse=True)
+    i = np.arange(int(orders.max()) + 1)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+      # Terms beyond alpha are 0 in the log space.
+      log_binom = np.where(i <= orders[:, None],
+                           _log_comb(orders[:, None], i), -np.inf)
+      q_, sigma_, alpha_ = q[rows, None], sigma[rows, None], alpha[rows, None]
+      s = (log_binom[order_index.ravel()] + i * np.log(q_) +
+           (alpha_ - i) * np.log(1 - q_) + (i * i - i) / (2 * (sigma_**2)))
+    log_a[rows] = special.logsumexp(s, axis=1)
+  return log_a
+
+
+def _log_add_signed(log_x, sign_x, log_y, sign_y):
+  """Add two arrays of signed numbers in the log space."""
+  return special.logsumexp(
+      np.stack([log_x, log_y], axis=1),
+      b=np.stack([sign_x, sign_y], axis=1),
+      axis=1,
+      return_sign=True)
+
+
+def _compute_log_a_frac_vec(q, sigma, alpha, num_terms=16):
+  """Vectorized _compute_log_a_frac over 1-D arrays of q, sigma and alpha.
+
+  The series of each row is cut after the same term as the scalar loop: the
+  first one where both parts drop below e^-30. Terms are evaluated in blocks of
+  growing size, for the rows whose series has not been cut yet.
+  """
+  log_a0, log_a1 = np.full(len(q), -np.inf), np.full(len(q), -np.inf)
+  sign_a0, sign_a1 = np.ones(len(q)), np.ones(len(q))
+  z0 = sigma**2 * np.log(1 / q - 1) + .5
+
+  rows = np.arange(len(q))
+  start = 0
+  while len(rows):
+    i = np.arange(start, start + num_terms)
+    q_, sigma_, alpha_, z0_ = (x[rows, None] for x in (q, sigma, alpha, z0))
+    j = alpha_ - i
+    # binom(alpha, i) has one negative factor (alpha - k) per k > alpha.
+    sign = np.where(np.maximum(i - np.floor(alpha_) - 1, 0) % 2 == 0, 1., -1.)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+      log_coef = _log_comb(alpha_, i)
+      log_t0 = log_coef + i * np.log(q_) + j * np.log(1 - q_)
+      log_t1 = log_coef + j * np.log(q_) + i * np.log(1 - q_)
+
+      log_e0 = math.log(.5) + _log_erfc((i - z0_) / (math.sqrt(2) * sigma_))
+      log_e1 = math.log(.5) + _log_erfc((z0_ - j) / (math.sqrt(2) * sigma_))
+
+      log_s0 = log_t0 + (i * i - i) / (2 * (sigma_**2)) + log_e0
+      log_s1 = log_t1 + (j * j - j) / (2 * (sigma_**2)) + log_e1
+      # Rows that went NaN would never stop, they stay NaN.
+      last = ((np.maximum(log_s0, log_s1) < -30) | np.isnan(log_s0) |
+              np.isnan(log_s1))
+
+      done = last.any(axis=1)
+      keep = np.arange(num_terms) <= np.where(done, last.argmax(axis=1),
+                                              num_terms)[:, None]
+      block0, block_sign0 = special.logsumexp(
+          np.where(keep, log_s0, -np.inf), b=sign, axis=1, return_sign=True)
+      block1, block_sign1 = special.logsumexp(
+          np.where(keep, log_s1, -np.inf), b=sign, axis=1, return_sign=True)
+      log_a0[rows], sign_a0[rows] = _log_add_signed(
+          log_a0[rows], sign_a0[rows], block0, block_sign0)
+      log_a1[rows], sign_a1[rows] = _log_add_signed(
+          log_a1[rows], sign_a1[rows], block1, block_sign1)
+
+    rows = rows[~done]
+    start += num_terms
+    num_terms *= 2
+
+  # Both parts are non-negative, up to rounding.
+  log_a0[sign_a0 < 0] = -np.inf
+  log_a1[sign_a1 < 0] = -np.inf
+  return np.logaddexp(log_a0, log_a1)
+
+
+def _compute_rdp_vec(q, sigma, alpha):
+  """Vectorized _compute_rdp over 1-D float arrays of q, sigma and alpha."""
+  rdp = np.zeros(len(alpha))
+
+  no_sampling = q == 1.
+  rdp[no_sampling] = alpha[no_sampling] / (2 * sigma[no_sampling]**2)
+
+  sampled = (q != 0) & ~no_sampling
+  rdp[sampled & np.isinf(alpha)] = np.inf
+
+  sampled &= np.isfinite(alpha)
+  integer = sampled & (alpha == np.floor(alpha))
+  fractional = sampled & ~integer
+  with np.errstate(divide='ignore', invalid='ignore'):
+    for mask, compute_log_a in ((integer, _compute_log_a_int_vec),
+                                (fractional, _compute_log_a_frac_vec)):
+      if mask.any():
+        rdp[mask] = compute_log_a(q[mask], sigma[mask],
+                                  alpha[mask]) / (alpha[mask] - 1)
+  return rdp
+
+
+def compute_rdp_grid(q, noise_multiplier, orders):
+  """Compute RDP of one step of the SGM over a grid of parameters.
+
+  All orders of all (q, noise_multiplier) pairs are evaluated at once. Values
+  are memoized per (q, noise_multiplier, order), only the ones that were never
+  computed before are evaluated.
+
+  Args:
+    q: An array (or a scalar) of sampling rates.
+    noise_multiplier: An array (or a scalar) of noise multipliers, broadcastable
+        with q.
+    orders: An array (or a scalar) of RDP orders.
+
+  Returns:
+    An array of shape `broadcast(q, noise_multiplier).shape + (len(orders),)`
+    with the RDP of a single step, can be np.inf.
+  """
+  q, sigma = np.broadcast_arrays(
+      np.asarray(q, dtype=float), np.asarray(noise_multiplier, dtype=float))
+  orders = np.atleast_1d(np.asarray(orders, dtype=float))
+  shape = q.shape + orders.shape
+
+  qs = np.repeat(q.ravel(), len(orders))
+  sigmas = np.repeat(sigma.ravel(), len(orders))
+  alphas = np.tile(orders, q.size)
+  keys = list(zip(qs.tolist(), sigmas.tolist(), alphas.tolist()))
+
+  cached = [_RDP_CACHE.get(key) for key in keys]
+  missing = np.array([value is None for value in cached], dtype=bool)
+  rdp = np.array([np.nan if value is None else value for value in cached],
+                 dtype=float)
+
+  if missing.any():
+    params, inverse = np.unique(
+        np.stack([qs[missing], sigmas[missing], alphas[missing]], axis=1),
+        axis=0, return_inverse=True)
+    values = _compute_rdp_vec(params[:, 0], params[:, 1], params[:, 2])
+    rdp[missing] = values[inverse.ravel()]
+
+    if len(_RDP_CACHE) + len(values) > _RDP_CACHE_MAX_SIZE:
+      _RDP_CACHE.clear()
+    _RDP_CACHE.update(zip(map(tuple, params.tolist()), values.tolist()))
+
+  return rdp.reshape(shape)
+
+
 def _compute_delta(orders, rdp, eps):
   """Compute delta given a list of RDP values and target epsilon.
 
@@ -255,11 +441,9 @@ def compute_rdp(q, noise_multiplier, steps, orders):
   Returns:
     The RDPs at all orders, can be np.inf.
   """
+  rdp = compute_rdp_grid(q, noise_multiplier, orders)
   if np.isscalar(orders):
-    rdp = _compute_rdp(q, noise_multiplier, orders)
-  else:
-    rdp = np.array([_compute_rdp(q, noise_multiplier, order)
-                    for order in orders])
+    rdp = rdp[0]
 
   return rdp * steps
 
@@ -333,12 +517,78 @@ def compute_rdp_from_ledger(ledger, orders):
   Returns:
     RDP at all orders, can be np.inf.
   """
-  total_rdp = np.zeros_like(orders, dtype=float)
+  accumulator = RdpAccumulator(orders)
   for sample in ledger:
     # Compute equivalent z from l2_clip_bounds and noise stddevs in sample.
     # See https://arxiv.org/pdf/1812.06210.pdf for derivation of this formula.
     effective_z = sum([
         (q.noise_stddev / q.l2_norm_bound)**-2 for q in sample.queries])**-0.5
-    total_rdp += compute_rdp(
-        sample.selection_probability, effective_z, 1, orders)
-  return total_rdp
+    accumulator.add_steps(sample.selection_probability, effective_z)
+  return accumulator.get_rdp().reshape(np.shape(orders))
+
+
+class RdpAccumulator(object):
+  """Running RDP of a sequence of Sampled Gaussian Mechanism steps.
+
+  Steps are folded into a running RDP vector over a fixed set of orders as they
+  happen. Consecutive steps with the same parameters are coalesced into a run
+  that is only folded when the parameters change, so adding a step costs O(1)
+  and memory does not grow with the number of steps. The privacy spent so far
+  can be queried at any time in O(len(orders)).
+  """
+
+  def __init__(self, orders):
+    """Initializes the RdpAccumulator.
+
+    Args:
+      orders: An array of RDP orders.
+    """
+    self._orders = np.atleast_1d(np.asarray(orders, dtype=float))
+    self._rdp = np.zeros_like(self._orders)
+    self._run_params = None
+    self._run_steps = 0
+    self._steps = 0
+
+  @property
+  def orders(self):
+    return self._orders
+
+  @property
+  def steps(self):
+    return self._steps
+
+  def add_steps(self, q, noise_multiplier, steps=1):
+    """Records steps of the Sampled Gaussian Mechanism.
+
+    Args:
+      q: The sampling rate.
+      noise_multiplier: The ratio of the standard deviation of the Gaussian
+        noise to the l2-sensitivity of the function to which it is added.
+      steps: The number of steps.
+    """
+    params = (float(q), float(noise_multiplier))
+    if params != self._run_params:
+      self._rdp = self.get_rdp()
+      self._run_params = params
+      self._run_steps = 0
+    self._run_steps += steps
+    self._steps += steps
+
+  def get_rdp(self):
+    """Returns the RDP at all orders of the steps recorded so far."""
+    if not self._run_steps:
+      return self._rdp.copy()
+    q, noise_multiplier = self._run_params
+    return self._rdp + self._run_steps * compute_rdp_grid(
+        q, noise_multiplier, self._orders)
+
+  def get_privacy_spent(self, target_eps=None, target_delta=None):
+    """Computes delta (or eps) of the steps recorded so far.
+
+    See get_privacy_spent.
+
+    Returns:
+      eps, delta, opt_order.
+    """
+    return get_privacy_spent(self._orders, self.get_rdp(), target_eps,
+                             target_delta)
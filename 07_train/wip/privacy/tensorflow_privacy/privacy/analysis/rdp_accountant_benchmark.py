@@ -0,0 +1,85 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+r"""Benchmark of the scalar and vectorized RDP computations.
+
+Evaluates the RDP of the Sampled Gaussian Mechanism over a grid of sampling
+rates and noise multipliers, as a hyperparameter sweep does, with the scalar
+per-order computation and with compute_rdp_grid, first with an empty cache and
+then a second time over the same grid.
+
+Example:
+  python rdp_accountant_benchmark.py --num_q=20 --num_sigma=20
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import time
+
+from absl import app
+from absl import flags
+import numpy as np
+
+from tensorflow_privacy.privacy.analysis import rdp_accountant
+
+# Opting out of loading all sibling packages and their dependencies.
+sys.skip_tf_privacy_import = True
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_integer('num_q', 20, 'Number of sampling rates of the grid')
+flags.DEFINE_integer('num_sigma', 20, 'Number of noise multipliers of the grid')
+
+ORDERS = ([1.25, 1.5, 1.75, 2., 2.25, 2.5, 3., 3.5, 4., 4.5] +
+          list(range(5, 64)) + [128, 256, 512])
+
+
+def _timed(fn):
+  start = time.perf_counter()
+  result = fn()
+  return time.perf_counter() - start, result
+
+
+def main(argv):
+  del argv  # argv is not used.
+
+  qs = np.geomspace(1e-4, .1, FLAGS.num_q)
+  sigmas = np.linspace(.5, 5., FLAGS.num_sigma)
+
+  scalar_seconds, scalar_rdp = _timed(lambda: np.array(
+      [[[rdp_accountant._compute_rdp(q, sigma, order) for order in ORDERS]
+        for sigma in sigmas] for q in qs]))
+
+  rdp_accountant.clear_rdp_cache()
+  cold_seconds, rdp = _timed(lambda: rdp_accountant.compute_rdp_grid(
+      qs[:, None], sigmas, ORDERS))
+  warm_seconds, _ = _timed(lambda: rdp_accountant.compute_rdp_grid(
+      qs[:, None], sigmas, ORDERS))
+
+  log_a_error = np.max(np.abs((rdp - scalar_rdp) * (np.array(ORDERS) - 1)))
+  print('{} (q, sigma) pairs x {} orders, max log(A) difference {:.1e}'.format(
+      len(qs) * len(sigmas), len(ORDERS), log_a_error))
+  print('{:<22} {:>10} {:>9}'.format('', 'seconds', 'speedup'))
+  for name, seconds in (('scalar', scalar_seconds),
+                        ('vectorized', cold_seconds),
+                        ('vectorized, memoized', warm_seconds)):
+    print('{:<22} {:>10.4f} {:>8.1f}x'.format(name, seconds,
+                                              scalar_seconds / seconds))
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -128,6 +128,53 @@ class TestGaussianMoments(parameterized.TestCase):
     log_a_mp = self._log_float_mp(self._compute_a_mp(sigma, q, order))
     np.testing.assert_allclose(log_a, log_a_mp, rtol=1e-4)
 
+  @parameterized.parameters(p for p in params)
+  def test_compute_rdp_grid_equals_scalar(self, q, sigma, order):
+    # Compared in the log space of A: where RDP is close to 0, both values are
+    # dominated by rounding and only agree in absolute terms.
+    rdp_accountant.clear_rdp_cache()
+    rdp = rdp_accountant.compute_rdp_grid(q, sigma, order)
+    self.assertEqual(rdp.shape, (1,))
+    np.testing.assert_allclose(
+        rdp[0] * (order - 1), rdp_accountant._compute_log_a(q, sigma, order),
+        rtol=1e-12, atol=1e-12)
+
+  @parameterized.parameters((1e-5,), (1e-3,), (.01,), (.1,), (.5,), (.99,))
+  def test_compute_rdp_grid_log_a_equals_scalar(self, q):
+    # log(A) of the vectorized computation matches the scalar series at every
+    # order up to rounding, including where RDP itself is close to 0.
+    orders = np.array([1.01, 1.1, 1.25, 1.5, 1.75, 2., 2.5, 3., 4., 5., 6., 7.,
+                       8., 10., 12., 14., 16., 20., 24., 28., 32., 64., 128.,
+                       256., 256.1])
+    sigmas = np.array([.1, .5, .8, 1., 2., 4., 10., 100.])
+    rdp_accountant.clear_rdp_cache()
+    rdp = rdp_accountant.compute_rdp_grid(q, sigmas[:, None], orders)
+    self.assertEqual(rdp.shape, (len(sigmas), 1, len(orders)))
+    for sigma, rdp_sigma in zip(sigmas, rdp[:, 0]):
+      log_a = [rdp_accountant._compute_log_a(q, sigma, order)
+               for order in orders]
+      np.testing.assert_allclose(
+          rdp_sigma * (orders - 1), log_a, rtol=1e-12, atol=1e-12)
+
+  def test_compute_rdp_grid_special_cases(self):
+    orders = [1.5, 2, 20, np.inf]
+    rdp = rdp_accountant.compute_rdp_grid([0, 1, .01], 10, orders)
+    np.testing.assert_array_equal(rdp[0], [0, 0, 0, 0])
+    np.testing.assert_array_equal(rdp[1], [.0075, .01, .1, np.inf])
+    self.assertEqual(rdp[2, -1], np.inf)
+
+  def test_compute_rdp_grid_memoized(self):
+    rdp_accountant.clear_rdp_cache()
+    orders = range(2, 33)
+    qs = [[.01], [.02]]
+    rdp = rdp_accountant.compute_rdp_grid(qs, [1., 2., 4.], orders)
+    self.assertEqual(rdp.shape, (2, 3, len(orders)))
+    self.assertLen(rdp_accountant._RDP_CACHE, 2 * 3 * len(orders))
+    rdp_again = rdp_accountant.compute_rdp_grid(qs, [1., 2., 4.], orders)
+    np.testing.assert_array_equal(rdp, rdp_again)
+    self.assertSequenceAlmostEqual(
+        rdp_accountant.compute_rdp(.02, 4., 1, orders), rdp[1, 2], delta=0)
+
   def test_get_privacy_spent_check_target_delta(self):
     orders = range(2, 33)
     rdp = rdp_accountant.compute_rdp(0.01, 4, 10000, orders)
@@ -182,6 +229,21 @@ class TestGaussianMoments(parameterized.TestCase):
     rdp_from_ledger = rdp_accountant.compute_rdp_from_ledger(ledger, orders)
     self.assertSequenceAlmostEqual(rdp, rdp_from_ledger)
 
+  def test_rdp_accumulator(self):
+    orders = range(2, 33)
+    accumulator = rdp_accountant.RdpAccumulator(orders)
+    for _ in range(100):
+      accumulator.add_steps(.01, 1.1)
+    accumulator.add_steps(.1, 2., steps=50)
+    eps = accumulator.get_privacy_spent(target_delta=1e-5)[0]
+    accumulator.add_steps(.01, 1.1, steps=10)
+
+    rdp = (rdp_accountant.compute_rdp(.01, 1.1, 110, orders) +
+           rdp_accountant.compute_rdp(.1, 2., 50, orders))
+    self.assertEqual(accumulator.steps, 160)
+    self.assertSequenceAlmostEqual(accumulator.get_rdp(), rdp)
+    self.assertLess(eps, accumulator.get_privacy_spent(target_delta=1e-5)[0])
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -0,0 +1,259 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Calibration of the Sampled Gaussian Mechanism to a privacy budget.
+
+Inverse of the RDP accountant: given a target (eps, delta), finds the smallest
+noise multiplier, the largest number of steps or the largest sampling rate for
+which the iterated Sampled Gaussian Mechanism satisfies (eps, delta)-DP, the
+other parameters being fixed.
+
+The number of steps is solved in closed form, since RDP is linear in it. The
+noise multiplier and the sampling rate are bracketed over a geometric grid and
+the bracket is then narrowed by evaluating a few points at once with
+rdp_accountant.compute_rdp_grid, which memoizes the RDP curves between
+iterations and calls.
+
+Example use:
+
+  result = rdp_calibration.calibrate_noise_multiplier(
+      target_eps=3., target_delta=1e-5, q=256 / 60000, steps=14063)
+  noise_multiplier, eps, opt_order = result
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import math
+
+import numpy as np
+
+from tensorflow_privacy.privacy.analysis import rdp_accountant
+
+DEFAULT_ORDERS = rdp_accountant.DEFAULT_ORDERS
+
+# `value` is the calibrated parameter, `eps` the privacy it achieves and
+# `opt_order` the RDP order at which that epsilon is attained.
+CalibrationResult = collections.namedtuple('CalibrationResult',
+                                           ['value', 'eps', 'opt_order'])
+
+
+def _compute_eps(q, noise_multiplier, steps, target_delta, orders):
+  """Epsilons and optimal orders over arrays of parameters.
+
+  Args:
+    q: An array (or a scalar) of sampling rates.
+    noise_multiplier: An array (or a scalar) of noise multipliers.
+    steps: An array (or a scalar) of numbers of steps.
+    target_delta: The delta for which epsilon is computed.
+    orders: An array of RDP orders.
+
+  Returns:
+    Pair of arrays (eps, opt_order) of the broadcast shape of the parameters.
+  """
+  orders = np.asarray(orders, dtype=float)
+  rdp = rdp_accountant.compute_rdp_grid(q, noise_multiplier, orders)
+  steps = np.asarray(steps, dtype=float)[..., None]
+  with np.errstate(invalid='ignore'):
+    eps = steps * rdp - math.log(target_delta) / (orders - 1)
+  # Same choice as rdp_accountant.get_privacy_spent, ignoring NaNs.
+  eps = np.where(np.isnan(eps), np.inf, eps)
+  idx_opt = np.argmin(eps, axis=-1)
+  return (np.take_along_axis(eps, idx_opt[..., None], axis=-1)[..., 0],
+          orders[idx_opt])
+
+
+def _result(value, q, noise_multiplier, steps, target_delta, orders):
+  eps, opt_order = _compute_eps(q, noise_multiplier, steps, target_delta,
+                                orders)
+  return CalibrationResult(value, float(eps), float(opt_order))
+
+
+def _narrow(compute_eps, failing, meeting, target_eps, tolerance, num_points):
+  """Narrows a bracket of a monotone parameter down to the relative tolerance.
+
+  Args:
+    compute_eps: Function from an array of parameter values to their epsilons.
+    failing: A value of the parameter for which eps > target_eps.
+    meeting: A value of the parameter for which eps <= target_eps.
+    target_eps: The target epsilon.
+    tolerance: Relative width of the final bracket.
+    num_points: Number of values evaluated at once in each iteration.
+
+  Returns:
+    The end of the final bracket that meets the target.
+  """
+  while abs(meeting - failing) > tolerance * abs(meeting):
+    values = np.linspace(failing, meeting, num_points + 2)[1:-1]
+    meets = compute_eps(values) <= target_eps
+    first = np.argmax(meets) if meets.any() else num_points
+    if first < num_points:
+      meeting = values[first]
+    if first > 0:
+      failing = values[first - 1]
+  return float(meeting)
+
+
+def calibrate_noise_multiplier(target_eps,
+                               target_delta,
+                               q,
+                               steps,
+                               orders=DEFAULT_ORDERS,
+                               min_noise=.1,
+                               max_noise=1000.,
+                               tolerance=1e-4,
+                               num_points=16):
+  """Smallest noise multiplier meeting a privacy budget.
+
+  Args:
+    target_eps: The target epsilon.
+    target_delta: The target delta.
+    q: The sampling rate.
+    steps: The number of steps.
+    orders: An array of RDP orders.
+    min_noise: Smallest noise multiplier considered.
+    max_noise: Largest noise multiplier considered.
+    tolerance: Relative precision of the noise multiplier. The returned value
+      always meets the budget, and is at most this much above the exact one.
+    num_points: Number of noise multipliers evaluated at once in each iteration.
+
+  Returns:
+    CalibrationResult(noise_multiplier, eps, opt_order).
+
+  Raises:
+    ValueError: If the budget cannot be met with max_noise.
+  """
+  compute_eps = lambda sigmas: _compute_eps(q, sigmas, steps, target_delta,
+                                            orders)[0]
+
+  # Epsilon decreases with the noise multiplier.
+  sigmas = np.geomspace(min_noise, max_noise, 4 * num_points)
+  meets = compute_eps(sigmas) <= target_eps
+  if not meets[-1]:
+    raise ValueError('eps={} cannot be reached with noise_multiplier <= {}.'
+                     .format(target_eps, max_noise))
+  first = np.argmax(meets)
+  if first == 0:
+    sigma = min_noise
+  else:
+    sigma = _narrow(compute_eps, sigmas[first - 1], sigmas[first], target_eps,
+                    tolerance, num_points)
+  return _result(sigma, q, sigma, steps, target_delta, orders)
+
+
+def calibrate_steps(target_eps, target_delta, q, noise_multiplier,
+                    orders=DEFAULT_ORDERS):
+  """Largest number of steps meeting a privacy budget.
+
+  RDP grows linearly with the number of steps, so at each order the largest
+  number of steps is solved for directly. The best order is the one allowing
+  the most steps.
+
+  Args:
+    target_eps: The target epsilon.
+    target_delta: The target delta.
+    q: The sampling rate.
+    noise_multiplier: The noise multiplier.
+    orders: An array of RDP orders.
+
+  Returns:
+    CalibrationResult(steps, eps, opt_order). Multiply steps by q to get epochs.
+
+  Raises:
+    ValueError: If not even one step meets the budget.
+  """
+  orders = np.asarray(orders, dtype=float)
+  rdp = rdp_accountant.compute_rdp_grid(q, noise_multiplier, orders)
+  budget = target_eps + math.log(target_delta) / (orders - 1)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    max_steps = np.where(budget < 0, -1., np.floor(budget / rdp))
+  max_steps = np.where(np.isnan(max_steps), -1., max_steps)
+
+  steps = max_steps.max()
+  if np.isinf(steps):
+    raise ValueError('Any number of steps meets the budget, q={} is 0.'
+                     .format(q))
+  steps = int(steps)
+  # Rounding of the division can be one step off in either direction.
+  meets = lambda steps: _compute_eps(q, noise_multiplier, steps, target_delta,
+                                     orders)[0] <= target_eps
+  while meets(steps + 1):
+    steps += 1
+  while steps >= 1 and not meets(steps):
+    steps -= 1
+  if steps < 1:
+    raise ValueError('eps={} cannot be reached with one step.'.format(
+        target_eps))
+  return _result(steps, q, noise_multiplier, steps, target_delta, orders)
+
+
+def calibrate_sampling_rate(target_eps,
+                            target_delta,
+                            noise_multiplier,
+                            steps=None,
+                            epochs=None,
+                            orders=DEFAULT_ORDERS,
+                            min_q=1e-6,
+                            tolerance=1e-4,
+                            num_points=16):
+  """Largest sampling rate meeting a privacy budget.
+
+  Exactly one of steps and epochs must be given. With a number of epochs, the
+  number of steps is ceil(epochs / q), as for a dataset of n examples read in
+  batches of q * n examples. The batch size is then floor(q * n).
+
+  Args:
+    target_eps: The target epsilon.
+    target_delta: The target delta.
+    noise_multiplier: The noise multiplier.
+    steps: The number of steps.
+    epochs: The number of epochs (may be fractional).
+    orders: An array of RDP orders.
+    min_q: Smallest sampling rate considered.
+    tolerance: Relative precision of the sampling rate. The returned value
+      always meets the budget, and is at most this much below the exact one.
+    num_points: Number of sampling rates evaluated at once in each iteration.
+
+  Returns:
+    CalibrationResult(q, eps, opt_order).
+
+  Raises:
+    ValueError: If steps and epochs are messed up or if the budget cannot be
+      met with min_q.
+  """
+  if (steps is None) == (epochs is None):
+    raise ValueError('Exactly one out of steps and epochs must be None.')
+
+  def steps_for(qs):
+    if steps is not None:
+      return steps
+    return np.ceil(epochs / np.asarray(qs))
+
+  compute_eps = lambda qs: _compute_eps(qs, noise_multiplier, steps_for(qs),
+                                        target_delta, orders)[0]
+
+  # Epsilon increases with the sampling rate.
+  qs = np.geomspace(1., min_q, 4 * num_points)
+  meets = compute_eps(qs) <= target_eps
+  if not meets[-1]:
+    raise ValueError('eps={} cannot be reached with q >= {}.'.format(
+        target_eps, min_q))
+  first = np.argmax(meets)
+  if first == 0:
+    q = 1.
+  else:
+    q = _narrow(compute_eps, qs[first - 1], qs[first], target_eps, tolerance,
+                num_points)
+  return _result(q, q, noise_multiplier, steps_for(q), target_delta, orders)
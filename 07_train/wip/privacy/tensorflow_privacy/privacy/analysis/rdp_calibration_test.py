@@ -0,0 +1,109 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for rdp_calibration.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import math
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+from tensorflow_privacy.privacy.analysis import rdp_accountant
+from tensorflow_privacy.privacy.analysis import rdp_calibration
+
+
+def _eps(q, noise_multiplier, steps, delta):
+  rdp = rdp_accountant.compute_rdp(q, noise_multiplier, steps,
+                                   rdp_calibration.DEFAULT_ORDERS)
+  eps, _, opt_order = rdp_accountant.get_privacy_spent(
+      rdp_calibration.DEFAULT_ORDERS, rdp, target_delta=delta)
+  return eps, opt_order
+
+
+class RdpCalibrationTest(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ('Mnist', 256 / 60000, 1.1, 14063, 1e-5),
+      ('SmallNoise', .01, .6, 1000, 1e-5),
+      ('LargeNoise', .1, 20., 100000, 1e-6),
+  )
+  def test_calibrate_noise_multiplier(self, q, noise_multiplier, steps, delta):
+    target_eps, _ = _eps(q, noise_multiplier, steps, delta)
+    result = rdp_calibration.calibrate_noise_multiplier(
+        target_eps, delta, q, steps, tolerance=1e-6)
+
+    self.assertAlmostEqual(result.value, noise_multiplier, delta=1e-5)
+    self.assertLessEqual(result.eps, target_eps)
+    self.assertEqual((result.eps, result.opt_order),
+                     _eps(q, result.value, steps, delta))
+
+  def test_calibrate_noise_multiplier_out_of_range(self):
+    with self.assertRaises(ValueError):
+      rdp_calibration.calibrate_noise_multiplier(
+          1e-3, 1e-5, .1, 10000, max_noise=10.)
+
+  @parameterized.named_parameters(
+      ('Mnist', 256 / 60000, 1.1, 14063, 1e-5),
+      ('SmallNoise', .01, .6, 1000, 1e-5),
+  )
+  def test_calibrate_steps(self, q, noise_multiplier, steps, delta):
+    target_eps, opt_order = _eps(q, noise_multiplier, steps, delta)
+    result = rdp_calibration.calibrate_steps(target_eps, delta, q,
+                                             noise_multiplier)
+
+    self.assertGreaterEqual(result.value, steps)
+    self.assertLessEqual(result.eps, target_eps)
+    self.assertEqual(result.opt_order, opt_order)
+    # One more step exceeds the budget.
+    self.assertGreater(
+        _eps(q, noise_multiplier, result.value + 1, delta)[0], target_eps)
+
+  def test_calibrate_steps_no_step(self):
+    with self.assertRaises(ValueError):
+      rdp_calibration.calibrate_steps(1e-3, 1e-5, .1, 1.)
+
+  def test_calibrate_sampling_rate_steps(self):
+    target_eps, _ = _eps(.02, 1.5, 5000, 1e-5)
+    result = rdp_calibration.calibrate_sampling_rate(
+        target_eps, 1e-5, 1.5, steps=5000, tolerance=1e-6)
+
+    self.assertAlmostEqual(result.value, .02, delta=1e-7)
+    self.assertLessEqual(result.eps, target_eps)
+
+  def test_calibrate_sampling_rate_epochs(self):
+    # Batches of 600 out of 60000 examples for 30 epochs.
+    target_eps, _ = _eps(.01, 1.1, 3000, 1e-5)
+    result = rdp_calibration.calibrate_sampling_rate(
+        target_eps, 1e-5, 1.1, epochs=30, tolerance=1e-6)
+
+    self.assertAlmostEqual(result.value, .01, delta=1e-8)
+    self.assertLessEqual(result.eps, target_eps)
+    self.assertEqual((result.eps, result.opt_order),
+                     _eps(result.value, 1.1, math.ceil(30 / result.value),
+                          1e-5))
+
+  def test_calibrate_sampling_rate_checks_arguments(self):
+    with self.assertRaises(ValueError):
+      rdp_calibration.calibrate_sampling_rate(1., 1e-5, 1.1)
+    with self.assertRaises(ValueError):
+      rdp_calibration.calibrate_sampling_rate(1., 1e-5, 1.1, steps=10,
+                                              epochs=1)
+
+
+if __name__ == '__main__':
+  absltest.main()
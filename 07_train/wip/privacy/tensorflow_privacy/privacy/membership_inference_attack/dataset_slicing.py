@@ -53,15 +53,13 @@ def _slice_data_by_indices(data: AttackInputData, idx_train,
   return result
 
 
-def _slice_by_class(data: AttackInputData, class_value: int) -> AttackInputData:
-  idx_train = data.labels_train == class_value
-  idx_test = data.labels_test == class_value
-  return _slice_data_by_indices(data, idx_train, idx_test)
+def _indices_by_class(data: AttackInputData, class_value: int):
+  return data.labels_train == class_value, data.labels_test == class_value
 
 
-def _slice_by_percentiles(data: AttackInputData, from_percentile: float,
-                          to_percentile: float):
-  """Slices samples by loss percentiles."""
+def _indices_by_percentiles(data: AttackInputData, from_percentile: float,
+                            to_percentile: float):
+  """Indices of the samples within loss percentiles."""
 
   # Find from_percentile and to_percentile percentiles in losses.
   loss_train = data.get_loss_train()
@@ -73,7 +71,7 @@ def _slice_by_percentiles(data: AttackInputData, from_percentile: float,
   idx_train = (from_loss <= loss_train) & (loss_train <= to_loss)
   idx_test = (from_loss <= loss_test) & (loss_test <= to_loss)
 
-  return _slice_data_by_indices(data, idx_train, idx_test)
+  return idx_train, idx_test
 
 
 def _indices_by_classification(logits_or_probs, labels, correctly_classified):
@@ -81,14 +79,14 @@ def _indices_by_classification(logits_or_probs, labels, correctly_classified):
   return idx_correct if correctly_classified else np.invert(idx_correct)
 
 
-def _slice_by_classification_correctness(data: AttackInputData,
-                                         correctly_classified: bool):
+def _indices_by_classification_correctness(data: AttackInputData,
+                                           correctly_classified: bool):
   idx_train = _indices_by_classification(data.logits_or_probs_train,
                                          data.labels_train,
                                          correctly_classified)
   idx_test = _indices_by_classification(data.logits_or_probs_test,
                                         data.labels_test, correctly_classified)
-  return _slice_data_by_indices(data, idx_train, idx_test)
+  return idx_train, idx_test
 
 
 def get_single_slice_specs(slicing_spec: SlicingSpec,
@@ -129,20 +127,50 @@ def get_single_slice_specs(slicing_spec: SlicingSpec,
   return result
 
 
-def get_slice(data: AttackInputData,
-              slice_spec: SingleSliceSpec) -> AttackInputData:
-  """Returns a single slice of data according to slice_spec."""
-  if slice_spec.entire_dataset:
-    data_slice = copy.copy(data)
-  elif slice_spec.feature == SlicingFeature.CLASS:
-    data_slice = _slice_by_class(data, slice_spec.value)
+def get_slice_indices(data: AttackInputData, slice_spec: SingleSliceSpec):
+  """Returns the indices of the train and test samples of a slice.
+
+  Args:
+    data: The data to slice.
+    slice_spec: The slice, which must not be the entire dataset.
+
+  Returns:
+    Pair of integer index arrays into the train and test samples.
+  """
+  if slice_spec.feature == SlicingFeature.CLASS:
+    idx_train, idx_test = _indices_by_class(data, slice_spec.value)
   elif slice_spec.feature == SlicingFeature.PERCENTILE:
     from_percentile, to_percentile = slice_spec.value
-    data_slice = _slice_by_percentiles(data, from_percentile, to_percentile)
+    idx_train, idx_test = _indices_by_percentiles(data, from_percentile,
+                                                  to_percentile)
   elif slice_spec.feature == SlicingFeature.CORRECTLY_CLASSIFIED:
-    data_slice = _slice_by_classification_correctness(data, slice_spec.value)
+    idx_train, idx_test = _indices_by_classification_correctness(
+        data, slice_spec.value)
   else:
     raise ValueError('Unknown slice spec feature "%s"' % slice_spec.feature)
+  return np.flatnonzero(idx_train), np.flatnonzero(idx_test)
+
+
+def get_slice(data: AttackInputData,
+              slice_spec: SingleSliceSpec,
+              indices=None) -> AttackInputData:
+  """Returns a single slice of data according to slice_spec.
+
+  Args:
+    data: The data to slice.
+    slice_spec: The slice.
+    indices: Indices of the slice returned by get_slice_indices, if already
+      computed.
+
+  Returns:
+    The slice of data.
+  """
+  if slice_spec.entire_dataset:
+    data_slice = copy.copy(data)
+  else:
+    if indices is None:
+      indices = get_slice_indices(data, slice_spec)
+    data_slice = _slice_data_by_indices(data, *indices)
 
   data_slice.slice_spec = slice_spec
   return data_slice
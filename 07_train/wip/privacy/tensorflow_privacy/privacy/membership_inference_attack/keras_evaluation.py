@@ -19,12 +19,14 @@ import os
 from typing import Iterable
 from absl import logging
 
+import numpy as np
 import tensorflow.compat.v1 as tf
 
 from tensorflow_privacy.privacy.membership_inference_attack import membership_inference_attack as mia
 from tensorflow_privacy.privacy.membership_inference_attack.data_structures import AttackInputData
 from tensorflow_privacy.privacy.membership_inference_attack.data_structures import AttackType
 from tensorflow_privacy.privacy.membership_inference_attack.data_structures import get_flattened_attack_metrics
+from tensorflow_privacy.privacy.membership_inference_attack.data_structures import PrivacyReportMetadata
 from tensorflow_privacy.privacy.membership_inference_attack.data_structures import SlicingSpec
 from tensorflow_privacy.privacy.membership_inference_attack.utils import log_loss
 from tensorflow_privacy.privacy.membership_inference_attack.utils_tensorboard import write_results_to_tensorboard
@@ -47,6 +49,156 @@ def calculate_losses(model, data, labels):
   return pred, loss
 
 
+def _to_dataset(data, batch_size):
+  """Returns data as a tf.data.Dataset of (samples, labels) batches.
+
+  Args:
+    data: a tf.data.Dataset of batches of (samples, labels), which is returned
+      as is, or a (samples, labels) tuple of arrays, which is batched.
+    batch_size: size of the batches of a tuple of arrays
+  """
+  if isinstance(data, tf.compat.v2.data.Dataset):
+    return data
+  return tf.data.Dataset.from_tensor_slices(tuple(data)).batch(batch_size)
+
+
+def _subsample(dataset, sample_fraction, seed, batch_size):
+  """Keeps each sample of a dataset of batches with probability sample_fraction.
+
+  Whether a sample is kept only depends on the seed and on its position in the
+  dataset, so that the same samples are kept each time the dataset is iterated.
+  The kept samples are batched again by batch_size.
+  """
+
+  def keep(index, unused_example):
+    uniform = tf.random.stateless_uniform([], seed=tf.stack(
+        [tf.constant(seed, tf.int64), index]))
+    return uniform < sample_fraction
+
+  return (dataset.unbatch().enumerate().filter(keep)
+          .map(lambda unused_index, example: example)
+          .batch(batch_size))
+
+
+def _per_example_statistics(predictions, labels, from_logits):
+  """Cross entropy loss and modified prediction entropy of each sample.
+
+  Matches log_loss and AttackInputData._get_entropy.
+  """
+  predictions = tf.cast(predictions, tf.float64)
+  probs = tf.nn.softmax(predictions) if from_logits else predictions
+  labels = tf.cast(tf.reshape(labels, [-1]), tf.int32)
+  true_probs = tf.gather(probs, labels, axis=1, batch_dims=1)
+  loss = -tf.math.log(tf.maximum(true_probs, 1e-8))
+  # See the Equation (8) in https://arxiv.org/pdf/2003.10595.pdf
+  log_probs = -tf.math.log(tf.maximum(probs, 1e-30))
+  log_reverse_probs = -tf.math.log(tf.maximum(1 - probs, 1e-30))
+  one_hot = tf.one_hot(labels, tf.shape(probs)[1], dtype=probs.dtype)
+  entropy = tf.reduce_sum(
+      one_hot * (1 - probs) * log_probs +
+      (1 - one_hot) * probs * log_reverse_probs, axis=1)
+  return loss, entropy
+
+
+def make_evaluation_function(model, from_logits=False):
+  """Builds the function computing the statistics of a batch of samples.
+
+  The function is a tf.function, so it should be built once per model and
+  reused across calls of calculate_losses_streaming, rather than traced again
+  on every call.
+
+  Args:
+    model: model to make prediction
+    from_logits: whether the model outputs logits rather than probabilities
+
+  Returns:
+    A function of (samples, labels) returning the predictions, the cross
+    entropy loss, the modified prediction entropy and whether the prediction is
+    correct, for each sample.
+  """
+
+  @tf.function(reduce_retracing=True)
+  def evaluate(samples, labels):
+    predictions = model(samples, training=False)
+    loss, entropy = _per_example_statistics(predictions, labels, from_logits)
+    correct = tf.equal(tf.argmax(predictions, axis=1),
+                       tf.cast(tf.reshape(labels, [-1]), tf.int64))
+    return predictions, loss, entropy, correct
+
+  return evaluate
+
+
+def calculate_losses_streaming(model, data, batch_size=1024,
+                               sample_fraction=None, seed=0,
+                               from_logits=False, keep_predictions=True,
+                               evaluate_fn=None):
+  """Calculates losses and entropies of model predictions batch by batch.
+
+  Unlike calculate_losses, the losses, entropies and correctness are computed in
+  the graph of each batch, and only them, the labels and optionally the
+  predictions are copied to host memory.
+
+  Args:
+    model: model to make prediction
+    data: a tf.data.Dataset of batches of (samples, labels), or a
+      (samples, labels) tuple of arrays. Labels are integer valued.
+    batch_size: size of the batches of a tuple of arrays, and of the batches of
+      subsamples
+    sample_fraction: if set, each sample is kept with this probability
+    seed: seed of the subsampling. A given seed always keeps the same samples.
+    from_logits: whether the model outputs logits rather than probabilities
+    keep_predictions: whether to return the predictions
+    evaluate_fn: function built by make_evaluation_function for this model and
+      from_logits. If None, a new one is built, which is traced again.
+
+  Returns:
+    preds: prediction vector of each sample, or None if not keep_predictions
+    loss: cross entropy loss of each sample
+    entropy: modified prediction entropy of each sample
+    labels: label of each sample
+    correct: whether the prediction of each sample is its label
+    All of them are empty if the dataset, or its subsample, has no samples.
+  """
+  dataset = _to_dataset(data, batch_size)
+  if sample_fraction is not None:
+    dataset = _subsample(dataset, sample_fraction, seed, batch_size)
+  if evaluate_fn is None:
+    evaluate_fn = make_evaluation_function(model, from_logits)
+
+  preds, losses, entropies, all_labels, corrects = [], [], [], [], []
+  for samples, labels in dataset:
+    predictions, loss, entropy, correct = evaluate_fn(samples, labels)
+    if keep_predictions:
+      preds.append(predictions.numpy())
+    losses.append(loss.numpy())
+    entropies.append(entropy.numpy())
+    all_labels.append(np.reshape(labels.numpy(), [-1]))
+    corrects.append(correct.numpy())
+
+  if not losses:
+    # np.concatenate fails on an empty list, so the empty results are shaped
+    # from the output signature of the evaluation function instead.
+    samples_spec, labels_spec = dataset.element_spec
+    predictions, loss, _, _ = evaluate_fn.get_concrete_function(
+        samples_spec, labels_spec).structured_outputs
+    empty_preds = np.zeros([0] + predictions.shape[1:].as_list(),
+                           predictions.dtype.as_numpy_dtype)
+    empty_stats = np.zeros([0], loss.dtype.as_numpy_dtype)
+    return (empty_preds if keep_predictions else None, empty_stats,
+            empty_stats.copy(), np.zeros([0], labels_spec.dtype.as_numpy_dtype),
+            np.zeros([0], bool))
+  return (np.concatenate(preds) if keep_predictions else None,
+          np.concatenate(losses), np.concatenate(entropies),
+          np.concatenate(all_labels), np.concatenate(corrects))
+
+
+def _needs_predictions(slicing_spec, attack_types):
+  """Whether the attacks or slices use the predictions of the model."""
+  return (any(attack_type.is_trained_attack for attack_type in attack_types) or
+          (slicing_spec is not None and
+           slicing_spec.by_classification_correctness))
+
+
 class MembershipInferenceCallback(tf.keras.callbacks.Callback):
   """Callback to perform membership inference attack on epoch end."""
 
@@ -56,23 +208,43 @@ class MembershipInferenceCallback(tf.keras.callbacks.Callback):
       slicing_spec: SlicingSpec = None,
       attack_types: Iterable[AttackType] = (AttackType.THRESHOLD_ATTACK,),
       tensorboard_dir=None,
-      tensorboard_merge_classifiers=False):
+      tensorboard_merge_classifiers=False,
+      every_n_epochs=1,
+      batch_size=1024,
+      sample_fraction=None,
+      seed=0,
+      from_logits=False):
     """Initalizes the callback.
 
     Args:
-      in_train: (in_training samples, in_training labels)
-      out_train: (out_training samples, out_training labels)
+      in_train: (in_training samples, in_training labels), or a tf.data.Dataset
+        of batches of them
+      out_train: (out_training samples, out_training labels), or a
+        tf.data.Dataset of batches of them
       slicing_spec: slicing specification of the attack
       attack_types: a list of attacks, each of type AttackType
       tensorboard_dir: directory for tensorboard summary
       tensorboard_merge_classifiers: if true, plot different classifiers with
       the same slicing_spec and metric in the same figure
+      every_n_epochs: the attack runs at the end of every n-th epoch
+      batch_size: size of the batches of samples given as arrays
+      sample_fraction: if set, the attack runs on a random subset of the
+        samples, each kept with this probability
+      seed: seed of the subsampling, which keeps the same samples every epoch
+      from_logits: whether the model outputs logits rather than probabilities
     """
-    self._in_train_data, self._in_train_labels = in_train
-    self._out_train_data, self._out_train_labels = out_train
+    self._in_train = in_train
+    self._out_train = out_train
+    self._every_n_epochs = every_n_epochs
+    self._batch_size = batch_size
+    self._sample_fraction = sample_fraction
+    self._seed = seed
+    self._from_logits = from_logits
     self._slicing_spec = slicing_spec
     self._attack_types = attack_types
     self._tensorboard_merge_classifiers = tensorboard_merge_classifiers
+    # Built on the first attack, once the callback is attached to its model.
+    self._evaluate_fn = None
     if tensorboard_dir:
       if tensorboard_merge_classifiers:
         self._writers = {}
@@ -89,12 +261,22 @@ class MembershipInferenceCallback(tf.keras.callbacks.Callback):
       self._writers = None
 
   def on_epoch_end(self, epoch, logs=None):
+    if (epoch + 1) % self._every_n_epochs:
+      return
+    if self._evaluate_fn is None:
+      self._evaluate_fn = make_evaluation_function(self.model,
+                                                   self._from_logits)
     results = run_attack_on_keras_model(
         self.model,
-        (self._in_train_data, self._in_train_labels),
-        (self._out_train_data, self._out_train_labels),
+        self._in_train,
+        self._out_train,
         self._slicing_spec,
-        self._attack_types)
+        self._attack_types,
+        batch_size=self._batch_size,
+        sample_fraction=self._sample_fraction,
+        seed=self._seed,
+        from_logits=self._from_logits,
+        evaluate_fn=self._evaluate_fn)
     logging.info(results)
 
     att_types, att_slices, att_metrics, att_values = get_flattened_attack_metrics(
@@ -112,32 +294,66 @@ class MembershipInferenceCallback(tf.keras.callbacks.Callback):
 def run_attack_on_keras_model(
     model, in_train, out_train,
     slicing_spec: SlicingSpec = None,
-    attack_types: Iterable[AttackType] = (AttackType.THRESHOLD_ATTACK,)):
+    attack_types: Iterable[AttackType] = (AttackType.THRESHOLD_ATTACK,),
+    batch_size=1024,
+    sample_fraction=None,
+    seed=0,
+    from_logits=False,
+    evaluate_fn=None):
   """Performs the attack on a trained model.
 
+  The losses, entropies and correctness are computed batch by batch with
+  calculate_losses_streaming. The predictions are only kept if the trained
+  attacks or the slices by classification correctness need them, the accuracies
+  of the privacy report are computed from the correctness.
+
   Args:
     model: model to be tested
-    in_train: a (in_training samples, in_training labels) tuple
-    out_train: a (out_training samples, out_training labels) tuple
+    in_train: a (in_training samples, in_training labels) tuple, or a
+      tf.data.Dataset of batches of them
+    out_train: a (out_training samples, out_training labels) tuple, or a
+      tf.data.Dataset of batches of them
     slicing_spec: slicing specification of the attack
     attack_types: a list of attacks, each of type AttackType
+    batch_size: size of the batches of samples given as arrays
+    sample_fraction: if set, the attack runs on a random subset of the samples,
+      each kept with this probability
+    seed: seed of the subsampling
+    from_logits: whether the model outputs logits rather than probabilities
+    evaluate_fn: function built by make_evaluation_function for this model and
+      from_logits. If None, one is built for both the in and out samples.
   Returns:
     Results of the attack
+  Raises:
+    ValueError: if the in or out training samples, after subsampling, are
+      empty.
   """
-  in_train_data, in_train_labels = in_train
-  out_train_data, out_train_labels = out_train
-
-  # Compute predictions and losses
-  in_train_pred, in_train_loss = calculate_losses(model, in_train_data,
-                                                  in_train_labels)
-  out_train_pred, out_train_loss = calculate_losses(model, out_train_data,
-                                                    out_train_labels)
+  keep_predictions = _needs_predictions(slicing_spec, attack_types)
+  if evaluate_fn is None:
+    evaluate_fn = make_evaluation_function(model, from_logits)
+  (in_train_pred, in_train_loss, in_train_entropy, in_train_labels,
+   in_train_correct) = calculate_losses_streaming(
+       model, in_train, batch_size, sample_fraction, seed, from_logits,
+       keep_predictions, evaluate_fn)
+  (out_train_pred, out_train_loss, out_train_entropy, out_train_labels,
+   out_train_correct) = calculate_losses_streaming(
+       model, out_train, batch_size, sample_fraction, seed, from_logits,
+       keep_predictions, evaluate_fn)
+  if not in_train_loss.size or not out_train_loss.size:
+    raise ValueError('No samples to attack: %d in training and %d out of '
+                     'training samples are left after subsampling.' %
+                     (in_train_loss.size, out_train_loss.size))
   attack_input = AttackInputData(
       logits_train=in_train_pred, logits_test=out_train_pred,
       labels_train=in_train_labels, labels_test=out_train_labels,
-      loss_train=in_train_loss, loss_test=out_train_loss
+      loss_train=in_train_loss, loss_test=out_train_loss,
+      entropy_train=in_train_entropy, entropy_test=out_train_entropy
   )
+  privacy_report_metadata = PrivacyReportMetadata(
+      accuracy_train=np.mean(in_train_correct),
+      accuracy_test=np.mean(out_train_correct))
   results = mia.run_attacks(attack_input,
                             slicing_spec=slicing_spec,
-                            attack_types=attack_types)
+                            attack_types=attack_types,
+                            privacy_report_metadata=privacy_report_metadata)
   return results
@@ -15,12 +15,15 @@
 # Lint as: python3
 """Tests for tensorflow_privacy.privacy.membership_inference_attack.keras_evaluation."""
 
+from unittest import mock
+
 from absl.testing import absltest
 
 import numpy as np
 import tensorflow.compat.v1 as tf
 
 from tensorflow_privacy.privacy.membership_inference_attack import keras_evaluation
+from tensorflow_privacy.privacy.membership_inference_attack.data_structures import AttackInputData
 from tensorflow_privacy.privacy.membership_inference_attack.data_structures import AttackResults
 from tensorflow_privacy.privacy.membership_inference_attack.data_structures import AttackType
 from tensorflow_privacy.privacy.membership_inference_attack.data_structures import get_flattened_attack_metrics
@@ -59,6 +62,102 @@ class UtilsTest(absltest.TestCase):
     self.assertEqual(pred.shape, (self.ntest, self.nclass))
     self.assertEqual(loss.shape, (self.ntest,))
 
+  def test_calculate_losses_streaming(self):
+    """Test calculating the loss and entropy batch by batch."""
+    model = tf.keras.Sequential(
+        [tf.keras.layers.Dense(self.nclass, activation='softmax')])
+    expected_pred, expected_loss = keras_evaluation.calculate_losses(
+        model, self.train_data, self.train_labels)
+    expected_entropy = AttackInputData(
+        logits_train=expected_pred,
+        labels_train=self.train_labels).get_entropy_train()
+
+    dataset = tf.data.Dataset.from_tensor_slices(
+        (self.train_data, self.train_labels)).batch(16)
+    for data in (dataset, (self.train_data, self.train_labels)):
+      pred, loss, entropy, labels, correct = (
+          keras_evaluation.calculate_losses_streaming(
+              model, data, batch_size=16))
+      np.testing.assert_allclose(pred, expected_pred, rtol=1e-5)
+      np.testing.assert_allclose(loss, expected_loss, rtol=1e-5)
+      np.testing.assert_allclose(entropy, expected_entropy, rtol=1e-5)
+      np.testing.assert_array_equal(labels, self.train_labels)
+      np.testing.assert_array_equal(
+          correct, np.argmax(expected_pred, axis=1) == self.train_labels)
+
+  def test_calculate_losses_streaming_from_logits(self):
+    """Test calculating the loss and entropy from logits."""
+    pred, loss, _, _, _ = keras_evaluation.calculate_losses_streaming(
+        self.model, (self.train_data, self.train_labels), from_logits=True)
+    expected_loss = tf.keras.losses.sparse_categorical_crossentropy(
+        self.train_labels, pred, from_logits=True)
+    np.testing.assert_allclose(loss, expected_loss, rtol=1e-5)
+
+  def test_calculate_losses_streaming_subsample(self):
+    """Test that subsampling keeps the same samples for a given seed."""
+    data = (self.test_data, np.arange(self.ntest) % self.nclass)
+    _, loss, _, labels, _ = keras_evaluation.calculate_losses_streaming(
+        self.model, data, batch_size=8, sample_fraction=0.5, seed=1,
+        keep_predictions=False)
+    self.assertLess(loss.size, self.ntest)
+    self.assertEqual(loss.shape, labels.shape)
+
+    pred, loss_again, _, labels_again, _ = (
+        keras_evaluation.calculate_losses_streaming(
+            self.model, data, batch_size=32, sample_fraction=0.5, seed=1,
+            keep_predictions=False))
+    self.assertIsNone(pred)
+    np.testing.assert_allclose(loss_again, loss)
+    np.testing.assert_array_equal(labels_again, labels)
+
+  def test_calculate_losses_streaming_without_samples(self):
+    """Test that an empty dataset or subsample gives empty results."""
+    empty = tf.data.Dataset.from_tensor_slices(
+        (self.train_data[:0], self.train_labels[:0])).batch(8)
+    for data, sample_fraction in ((empty, None),
+                                  ((self.train_data, self.train_labels), 0.)):
+      pred, loss, entropy, labels, correct = (
+          keras_evaluation.calculate_losses_streaming(
+              self.model, data, sample_fraction=sample_fraction))
+      self.assertEqual(pred.shape, (0, self.nclass))
+      self.assertEqual(loss.shape, (0,))
+      self.assertEqual(entropy.shape, (0,))
+      self.assertEqual(labels.shape, (0,))
+      self.assertEqual(correct.shape, (0,))
+
+    with self.assertRaisesRegex(ValueError, 'No samples to attack'):
+      keras_evaluation.run_attack_on_keras_model(
+          self.model, (self.train_data, self.train_labels),
+          (self.test_data, self.test_labels), sample_fraction=0.)
+
+  def test_callback_traces_evaluation_once(self):
+    """Test that the callback reuses its evaluation function every epoch."""
+    callback = keras_evaluation.MembershipInferenceCallback(
+        (self.train_data, self.train_labels),
+        (self.test_data, self.test_labels))
+    self.model.fit(self.train_data, self.train_labels, epochs=1, verbose=0,
+                   callbacks=[callback])
+    evaluate_fn = callback._evaluate_fn
+    tracing_count = evaluate_fn.experimental_get_tracing_count()
+    self.model.fit(self.train_data, self.train_labels, epochs=3, verbose=0,
+                   callbacks=[callback])
+    self.assertIs(callback._evaluate_fn, evaluate_fn)
+    self.assertEqual(evaluate_fn.experimental_get_tracing_count(),
+                     tracing_count)
+
+  def test_callback_every_n_epochs(self):
+    """Test that the callback only runs the attack every n epochs."""
+    callback = keras_evaluation.MembershipInferenceCallback(
+        (self.train_data, self.train_labels),
+        (self.test_data, self.test_labels),
+        every_n_epochs=2)
+    with mock.patch.object(
+        keras_evaluation, 'run_attack_on_keras_model') as run_attack:
+      run_attack.return_value = AttackResults(single_attack_results=[])
+      self.model.fit(self.train_data, self.train_labels, epochs=5, verbose=0,
+                     callbacks=[callback])
+    self.assertEqual(run_attack.call_count, 2)
+
   def test_run_attack_on_keras_model(self):
     """Test the attack."""
     results = keras_evaluation.run_attack_on_keras_model(
@@ -74,6 +173,25 @@ class UtilsTest(absltest.TestCase):
     self.assertLen(att_metrics, 2)
     self.assertLen(att_values, 2)
 
+  def test_run_attack_on_keras_model_reports_accuracy(self):
+    """Test that the accuracies are reported without keeping predictions."""
+    results = keras_evaluation.run_attack_on_keras_model(
+        self.model,
+        (self.train_data, self.train_labels),
+        (self.test_data, self.test_labels),
+        attack_types=[AttackType.THRESHOLD_ATTACK])
+    metadata = results.privacy_report_metadata
+    self.assertIsNotNone(metadata.accuracy_train)
+    self.assertIsNotNone(metadata.accuracy_test)
+    self.assertAlmostEqual(
+        metadata.accuracy_train,
+        np.mean(np.argmax(self.model.predict(self.train_data), axis=1) ==
+                self.train_labels))
+    self.assertAlmostEqual(
+        metadata.accuracy_test,
+        np.mean(np.argmax(self.model.predict(self.test_data), axis=1) ==
+                self.test_labels))
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -19,6 +19,9 @@ This file belongs to the new API for membership inference attacks. This file
 will be renamed to membership_inference_attack.py after the old API is removed.
 """
 
+from concurrent import futures
+import copy
+import os
 from typing import Iterable
 import numpy as np
 from sklearn import metrics
@@ -35,6 +38,11 @@ from tensorflow_privacy.privacy.membership_inference_attack.data_structures impo
 from tensorflow_privacy.privacy.membership_inference_attack.data_structures import SlicingSpec
 from tensorflow_privacy.privacy.membership_inference_attack.dataset_slicing import get_single_slice_specs
 from tensorflow_privacy.privacy.membership_inference_attack.dataset_slicing import get_slice
+from tensorflow_privacy.privacy.membership_inference_attack.dataset_slicing import get_slice_indices
+
+# Attack input and attacker features of the worker processes of run_attacks,
+# sent once per worker rather than once per job.
+_worker_state = {}
 
 
 def _get_slice_spec(data: AttackInputData) -> SingleSliceSpec:
@@ -45,24 +53,36 @@ def _get_slice_spec(data: AttackInputData) -> SingleSliceSpec:
 
 def _run_trained_attack(attack_input: AttackInputData,
                         attack_type: AttackType,
-                        balance_attacker_training: bool = True):
+                        balance_attacker_training: bool = True,
+                        attacker_features=None,
+                        seed: int = None,
+                        n_jobs: int = None):
   """Classification attack done by ML models."""
   attacker = None
 
   if attack_type == AttackType.LOGISTIC_REGRESSION:
-    attacker = models.LogisticRegressionAttacker()
+    attacker = models.LogisticRegressionAttacker(n_jobs, seed)
   elif attack_type == AttackType.MULTI_LAYERED_PERCEPTRON:
-    attacker = models.MultilayerPerceptronAttacker()
+    attacker = models.MultilayerPerceptronAttacker(n_jobs, seed)
   elif attack_type == AttackType.RANDOM_FOREST:
-    attacker = models.RandomForestAttacker()
+    attacker = models.RandomForestAttacker(n_jobs, seed)
   elif attack_type == AttackType.K_NEAREST_NEIGHBORS:
-    attacker = models.KNearestNeighborsAttacker()
+    attacker = models.KNearestNeighborsAttacker(n_jobs, seed)
   else:
     raise NotImplementedError('Attack type %s not implemented yet.' %
                               attack_type)
 
-  prepared_attacker_data = models.create_attacker_data(
-      attack_input, balance=balance_attacker_training)
+  random_state = None if seed is None else np.random.RandomState(seed)
+  if attacker_features is None:
+    prepared_attacker_data = models.create_attacker_data(
+        attack_input,
+        balance=balance_attacker_training,
+        random_state=random_state)
+  else:
+    prepared_attacker_data = models.create_attacker_data_from_features(
+        *attacker_features,
+        balance=balance_attacker_training,
+        random_state=random_state)
 
   attacker.train_model(prepared_attacker_data.features_train,
                        prepared_attacker_data.is_training_labels_train)
@@ -114,27 +134,113 @@ def _run_threshold_entropy_attack(attack_input: AttackInputData):
 
 def _run_attack(attack_input: AttackInputData,
                 attack_type: AttackType,
-                balance_attacker_training: bool = True):
+                balance_attacker_training: bool = True,
+                attacker_features=None,
+                seed: int = None,
+                n_jobs: int = None):
   attack_input.validate()
   if attack_type.is_trained_attack:
     return _run_trained_attack(attack_input, attack_type,
-                               balance_attacker_training)
+                               balance_attacker_training, attacker_features,
+                               seed, n_jobs)
   if attack_type == AttackType.THRESHOLD_ENTROPY_ATTACK:
     return _run_threshold_entropy_attack(attack_input)
   return _run_threshold_attack(attack_input)
 
 
+def _prepare_attack_input(attack_input: AttackInputData,
+                          attack_types: Iterable[AttackType]):
+  """Computes the losses and entropies once for all slices.
+
+  Args:
+    attack_input: input data for running an attack
+    attack_types: attacks to run
+
+  Returns:
+    Pair of a copy of attack_input with the losses and, if needed, the entropies
+    set, and of the features of the trained attacks (None if there are none).
+  """
+  prepared = copy.copy(attack_input)
+  if prepared.labels_train is not None and (
+      prepared.logits_or_probs_train is not None):
+    prepared.get_loss_train()
+    prepared.get_loss_test()
+  if (AttackType.THRESHOLD_ENTROPY_ATTACK in attack_types and
+      prepared.entropy_train is None and prepared.logits_train is not None):
+    prepared.entropy_train = prepared.get_entropy_train()
+    prepared.entropy_test = prepared.get_entropy_test()
+
+  attacker_features = None
+  if any(attack_type.is_trained_attack for attack_type in attack_types):
+    attacker_features = models.get_attacker_features(prepared)
+  return prepared, attacker_features
+
+
+def _run_attack_job(attack_input: AttackInputData, attacker_features, job,
+                    n_jobs: int = None):
+  """Runs one attack on one slice.
+
+  Args:
+    attack_input: input data prepared by _prepare_attack_input
+    attacker_features: features of the trained attacks on attack_input
+    job: tuple (slice spec, slice indices or None for the entire dataset,
+      attack type, balance_attacker_training, seed)
+    n_jobs: number of jobs of the cross-validation of trained attacks
+
+  Returns:
+    SingleAttackResult.
+  """
+  slice_spec, indices, attack_type, balance_attacker_training, seed = job
+  attack_input_slice = get_slice(attack_input, slice_spec, indices)
+  if attacker_features is not None and indices is not None:
+    idx_train, idx_test = indices
+    attacker_features = (attacker_features[0][idx_train],
+                         attacker_features[1][idx_test])
+  return _run_attack(attack_input_slice, attack_type,
+                     balance_attacker_training, attacker_features, seed,
+                     n_jobs)
+
+
+def _init_worker(attack_input: AttackInputData, attacker_features):
+  # Forked workers inherit the global numpy random state, so without a seed
+  # they would all draw the same random numbers.
+  np.random.seed(np.random.SeedSequence().generate_state(4))
+  _worker_state['attack_input'] = attack_input
+  _worker_state['attacker_features'] = attacker_features
+
+
+def _run_attack_job_in_worker(job):
+  # Jobs run in parallel, so each trained attack uses a single process.
+  return _run_attack_job(_worker_state['attack_input'],
+                         _worker_state['attacker_features'], job, n_jobs=1)
+
+
+def _get_job_seed(seed: int, slice_index: int, attack_index: int):
+  """Seed of a job, independent of the order in which jobs run."""
+  if seed is None:
+    return None
+  return int(
+      np.random.SeedSequence(
+          seed, spawn_key=(slice_index, attack_index)).generate_state(1)[0])
+
+
 def run_attacks(attack_input: AttackInputData,
                 slicing_spec: SlicingSpec = None,
                 attack_types: Iterable[AttackType] = (
                     AttackType.THRESHOLD_ATTACK,),
                 privacy_report_metadata: PrivacyReportMetadata = None,
-                balance_attacker_training: bool = True) -> AttackResults:
+                balance_attacker_training: bool = True,
+                n_jobs: int = 1,
+                seed: int = None) -> AttackResults:
   """Runs membership inference attacks on a classification model.
 
   It runs attacks specified by attack_types on each attack_input slice which is
    specified by slicing_spec.
 
+  Losses, entropies and the features of the trained attacks are computed once
+  for the whole attack_input, and each slice takes its rows by index. With
+  n_jobs != 1, each pair of a slice and an attack is a job of a process pool.
+
   Args:
     attack_input: input data for running an attack
     slicing_spec: specifies attack_input slices to run attack on
@@ -144,23 +250,49 @@ def run_attacks(attack_input: AttackInputData,
           membership inference attacker should have a balanced (roughly equal)
           number of samples from the training and test sets used to develop
           the model under attack.
+    n_jobs: number of processes running the attacks, -1 for one per core.
+          The cross-validation of trained attacks then uses a single process.
+    seed: seed of the trained attacks. Each job gets its own seed derived from
+          it, so results are the same for any n_jobs. None uses the global
+          numpy random state, which every worker process reseeds from fresh
+          entropy.
 
   Returns:
     the attack result.
   """
   attack_input.validate()
-  attack_results = []
+  attack_types = tuple(attack_types)
 
   if slicing_spec is None:
     slicing_spec = SlicingSpec(entire_dataset=True)
   input_slice_specs = get_single_slice_specs(slicing_spec,
                                              attack_input.num_classes)
-  for single_slice_spec in input_slice_specs:
-    attack_input_slice = get_slice(attack_input, single_slice_spec)
-    for attack_type in attack_types:
-      attack_results.append(
-          _run_attack(attack_input_slice, attack_type,
-                      balance_attacker_training))
+  prepared_input, attacker_features = _prepare_attack_input(
+      attack_input, attack_types)
+
+  jobs = []
+  for slice_index, single_slice_spec in enumerate(input_slice_specs):
+    indices = None
+    if not single_slice_spec.entire_dataset:
+      indices = get_slice_indices(prepared_input, single_slice_spec)
+    for attack_index, attack_type in enumerate(attack_types):
+      jobs.append((single_slice_spec, indices, attack_type,
+                   balance_attacker_training,
+                   _get_job_seed(seed, slice_index, attack_index)))
+
+  if n_jobs is None or n_jobs < 0:
+    n_jobs = os.cpu_count() or 1
+  if n_jobs == 1 or len(jobs) <= 1:
+    attack_results = [
+        _run_attack_job(prepared_input, attacker_features, job)
+        for job in jobs
+    ]
+  else:
+    with futures.ProcessPoolExecutor(
+        max_workers=min(n_jobs, len(jobs)),
+        initializer=_init_worker,
+        initargs=(prepared_input, attacker_features)) as executor:
+      attack_results = list(executor.map(_run_attack_job_in_worker, jobs))
 
   privacy_report_metadata = _compute_missing_privacy_report_metadata(
       privacy_report_metadata, attack_input)
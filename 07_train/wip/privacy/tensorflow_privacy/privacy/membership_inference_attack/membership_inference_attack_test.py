@@ -88,6 +88,69 @@ class RunAttacksTest(absltest.TestCase):
     expected_slice = SingleSliceSpec(SlicingFeature.CLASS, 2)
     self.assertEqual(result.single_attack_results[3].slice_spec, expected_slice)
 
+  def test_run_attacks_parallel_equals_serial(self):
+    attack_input = get_test_input(100, 100)
+    slicing_spec = SlicingSpec(
+        by_class=True,
+        by_percentiles=True,
+        by_classification_correctness=True)
+    attack_types = (AttackType.THRESHOLD_ATTACK,
+                    AttackType.THRESHOLD_ENTROPY_ATTACK,
+                    AttackType.LOGISTIC_REGRESSION,
+                    AttackType.K_NEAREST_NEIGHBORS)
+
+    serial = mia.run_attacks(
+        attack_input, slicing_spec, attack_types, seed=7)
+    parallel = mia.run_attacks(
+        attack_input, slicing_spec, attack_types, n_jobs=2, seed=7)
+
+    self.assertLen(serial.single_attack_results, 18 * 4)
+    self.assertLen(parallel.single_attack_results, 18 * 4)
+    for expected, result in zip(serial.single_attack_results,
+                                parallel.single_attack_results):
+      self.assertEqual(result.slice_spec, expected.slice_spec)
+      self.assertEqual(result.attack_type, expected.attack_type)
+      np.testing.assert_array_equal(result.roc_curve.fpr,
+                                    expected.roc_curve.fpr)
+      np.testing.assert_array_equal(result.roc_curve.tpr,
+                                    expected.roc_curve.tpr)
+
+  def test_run_attacks_equals_unprepared_slices(self):
+    attack_input = get_test_input(100, 100)
+    slicing_spec = SlicingSpec(by_class=True, by_percentiles=True)
+    attack_types = (AttackType.THRESHOLD_ATTACK,
+                    AttackType.THRESHOLD_ENTROPY_ATTACK)
+
+    result = mia.run_attacks(attack_input, slicing_spec, attack_types)
+
+    results = iter(result.single_attack_results)
+    for slice_spec in mia.get_single_slice_specs(slicing_spec, 5):
+      for attack_type in attack_types:
+        expected = mia._run_attack(
+            mia.get_slice(attack_input, slice_spec), attack_type)
+        np.testing.assert_array_equal(next(results).roc_curve.tpr,
+                                      expected.roc_curve.tpr)
+
+  def test_run_attacks_seed(self):
+    attack_input = get_test_input(100, 100)
+    results = [
+        mia.run_attacks(
+            attack_input,
+            attack_types=(AttackType.LOGISTIC_REGRESSION,),
+            seed=seed).single_attack_results[0].roc_curve.get_auc()
+        for seed in (3, 3, 4)
+    ]
+    self.assertEqual(results[0], results[1])
+    self.assertNotEqual(results[0], results[2])
+
+  def test_init_worker_reseeds_global_random_state(self):
+    draws = []
+    for _ in range(2):
+      np.random.seed(0)
+      mia._init_worker(None, None)
+      draws.append(np.random.rand())
+    self.assertNotEqual(draws[0], draws[1])
+
   def test_accuracy(self):
     predictions = [[0.5, 0.2, 0.3], [0.1, 0.6, 0.3], [0.5, 0.2, 0.3]]
     logits = [[1, -1, -3], [-3, -1, -2], [9, 8, 8.5]]
@@ -22,6 +22,7 @@ from sklearn import linear_model
 from sklearn import model_selection
 from sklearn import neighbors
 from sklearn import neural_network
+from sklearn import utils
 
 from tensorflow_privacy.privacy.membership_inference_attack.data_structures import AttackInputData
 
@@ -44,7 +45,8 @@ class AttackerData:
 
 def create_attacker_data(attack_input_data: AttackInputData,
                          test_fraction: float = 0.25,
-                         balance: bool = True) -> AttackerData:
+                         balance: bool = True,
+                         random_state=None) -> AttackerData:
   """Prepare AttackInputData to train ML attackers.
 
   Combines logits and losses and performs a random train-test split.
@@ -56,22 +58,42 @@ def create_attacker_data(attack_input_data: AttackInputData,
               attacker should have a balanced (roughly equal) number of samples
               from the training and test sets used to develop the model
               under attack.
+    random_state: Seed or np.random.RandomState of the sampling and of the
+              split. None uses the global numpy random state.
 
   Returns:
     AttackerData.
   """
-  attack_input_train = _column_stack(attack_input_data.logits_or_probs_train,
-                                     attack_input_data.get_loss_train())
-  attack_input_test = _column_stack(attack_input_data.logits_or_probs_test,
-                                    attack_input_data.get_loss_test())
+  features_train, features_test = get_attacker_features(attack_input_data)
+  return create_attacker_data_from_features(features_train, features_test,
+                                            test_fraction, balance,
+                                            random_state)
+
+
+def get_attacker_features(attack_input_data: AttackInputData):
+  """Returns the stacked logits and losses of the train and test sets."""
+  return (_column_stack(attack_input_data.logits_or_probs_train,
+                        attack_input_data.get_loss_train()),
+          _column_stack(attack_input_data.logits_or_probs_test,
+                        attack_input_data.get_loss_test()))
+
+
+def create_attacker_data_from_features(features_train: np.ndarray,
+                                       features_test: np.ndarray,
+                                       test_fraction: float = 0.25,
+                                       balance: bool = True,
+                                       random_state=None) -> AttackerData:
+  """Same as create_attacker_data, from features of get_attacker_features."""
+  random_state = utils.check_random_state(random_state)
+  attack_input_train = features_train
+  attack_input_test = features_test
 
   if balance:
-    min_size = min(attack_input_data.get_train_size(),
-                   attack_input_data.get_test_size())
-    attack_input_train = _sample_multidimensional_array(attack_input_train,
-                                                        min_size)
-    attack_input_test = _sample_multidimensional_array(attack_input_test,
-                                                       min_size)
+    min_size = min(len(attack_input_train), len(attack_input_test))
+    attack_input_train = _sample_multidimensional_array(
+        attack_input_train, min_size, random_state)
+    attack_input_test = _sample_multidimensional_array(
+        attack_input_test, min_size, random_state)
 
   features_all = np.concatenate((attack_input_train, attack_input_test))
 
@@ -82,13 +104,14 @@ def create_attacker_data(attack_input_data: AttackInputData,
   features_train, features_test, \
   is_training_labels_train, is_training_labels_test = \
     model_selection.train_test_split(
-        features_all, labels_all, test_size=test_fraction, stratify=labels_all)
+        features_all, labels_all, test_size=test_fraction, stratify=labels_all,
+        random_state=random_state)
   return AttackerData(features_train, is_training_labels_train, features_test,
                       is_training_labels_test)
 
 
-def _sample_multidimensional_array(array, size):
-  indices = np.random.choice(len(array), size, replace=False)
+def _sample_multidimensional_array(array, size, random_state):
+  indices = random_state.choice(len(array), size, replace=False)
   return array[indices]
 
 
@@ -114,6 +137,21 @@ class TrainedAttacker:
   """Base class for training attack models."""
   model = None
 
+  def __init__(self, n_jobs: int = None, random_state=None):
+    """Initializes the attacker.
+
+    Args:
+      n_jobs: Number of jobs of the cross-validation. None uses the default of
+        the attacker.
+      random_state: Seed or np.random.RandomState of the model. None uses the
+        global numpy random state.
+    """
+    self.n_jobs = n_jobs
+    self.random_state = random_state
+
+  def _get_n_jobs(self, default):
+    return default if self.n_jobs is None else self.n_jobs
+
   def train_model(self, input_features, is_training_labels):
     """Train an attacker model.
 
@@ -146,12 +184,13 @@ class LogisticRegressionAttacker(TrainedAttacker):
   """Logistic regression attacker."""
 
   def train_model(self, input_features, is_training_labels):
-    lr = linear_model.LogisticRegression(solver='lbfgs')
+    lr = linear_model.LogisticRegression(
+        solver='lbfgs', random_state=self.random_state)
     param_grid = {
         'C': np.logspace(-4, 2, 10),
     }
     model = model_selection.GridSearchCV(
-        lr, param_grid=param_grid, cv=3, n_jobs=1, verbose=0)
+        lr, param_grid=param_grid, cv=3, n_jobs=self._get_n_jobs(1), verbose=0)
     model.fit(input_features, is_training_labels)
     self.model = model
 
@@ -160,13 +199,13 @@ class MultilayerPerceptronAttacker(TrainedAttacker):
   """Multilayer perceptron attacker."""
 
   def train_model(self, input_features, is_training_labels):
-    mlp_model = neural_network.MLPClassifier()
+    mlp_model = neural_network.MLPClassifier(random_state=self.random_state)
     param_grid = {
         'hidden_layer_sizes': [(64,), (32, 32)],
         'solver': ['adam'],
         'alpha': [0.0001, 0.001, 0.01],
     }
-    n_jobs = -1
+    n_jobs = self._get_n_jobs(-1)
     model = model_selection.GridSearchCV(
         mlp_model, param_grid=param_grid, cv=3, n_jobs=n_jobs, verbose=0)
     model.fit(input_features, is_training_labels)
@@ -178,7 +217,7 @@ class RandomForestAttacker(TrainedAttacker):
 
   def train_model(self, input_features, is_training_labels):
     """Setup a random forest pipeline with cross-validation."""
-    rf_model = ensemble.RandomForestClassifier()
+    rf_model = ensemble.RandomForestClassifier(random_state=self.random_state)
 
     param_grid = {
         'n_estimators': [100],
@@ -187,7 +226,7 @@ class RandomForestAttacker(TrainedAttacker):
         'min_samples_split': [2, 5, 10],
         'min_samples_leaf': [1, 2, 4]
     }
-    n_jobs = -1
+    n_jobs = self._get_n_jobs(-1)
     model = model_selection.GridSearchCV(
         rf_model, param_grid=param_grid, cv=3, n_jobs=n_jobs, verbose=0)
     model.fit(input_features, is_training_labels)
@@ -203,6 +242,7 @@ class KNearestNeighborsAttacker(TrainedAttacker):
         'n_neighbors': [3, 5, 7],
     }
     model = model_selection.GridSearchCV(
-        knn_model, param_grid=param_grid, cv=3, n_jobs=1, verbose=0)
+        knn_model, param_grid=param_grid, cv=3, n_jobs=self._get_n_jobs(1),
+        verbose=0)
     model.fit(input_features, is_training_labels)
     self.model = model
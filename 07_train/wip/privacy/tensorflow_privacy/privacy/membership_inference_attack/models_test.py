@@ -70,6 +70,35 @@ class TrainedAttackerTest(absltest.TestCase):
       expected = feature[:2] not in attack_input.logits_train
       self.assertEqual(attacker_data.is_training_labels_train[i], expected)
 
+  def test_create_attacker_data_random_state(self):
+    attack_input = AttackInputData(
+        loss_train=np.arange(10.), loss_test=np.arange(10., 30.))
+    attacker_data = [
+        models.create_attacker_data(attack_input, random_state=seed)
+        for seed in (0, 0, 1)
+    ]
+    np.testing.assert_array_equal(attacker_data[0].features_train,
+                                  attacker_data[1].features_train)
+    self.assertFalse(
+        np.array_equal(attacker_data[0].features_train,
+                       attacker_data[2].features_train))
+
+  def test_create_attacker_data_from_features(self):
+    attack_input = AttackInputData(
+        logits_train=np.array([[1, 2], [5, 6], [8, 9]]),
+        logits_test=np.array([[10, 11], [14, 15]]),
+        loss_train=np.array([3, 7, 10]),
+        loss_test=np.array([12, 16]))
+    expected = models.create_attacker_data(
+        attack_input, 0.5, balance=False, random_state=0)
+    attacker_data = models.create_attacker_data_from_features(
+        *models.get_attacker_features(attack_input), 0.5, balance=False,
+        random_state=0)
+    np.testing.assert_array_equal(attacker_data.features_train,
+                                  expected.features_train)
+    np.testing.assert_array_equal(attacker_data.is_training_labels_test,
+                                  expected.is_training_labels_test)
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -20,7 +20,9 @@ from __future__ import print_function
 
 import tensorflow as tf
 
+from tensorflow_privacy.privacy.analysis import privacy_ledger
 from tensorflow_privacy.privacy.dp_query import gaussian_query
+from tensorflow_privacy.privacy.optimizers import ghost_clipping
 
 
 def make_keras_optimizer_class(cls):
@@ -53,13 +55,20 @@ def make_keras_optimizer_class(cls):
         noise_multiplier: Ratio of the standard deviation to the clipping norm
         num_microbatches: The number of microbatches into which each minibatch
           is split.
+        **kwargs: May contain `ledger`, a PrivacyLedger or a
+          StreamingPrivacyLedger to which each step is recorded.
       """
+      ledger = kwargs.pop('ledger', None)
       super(DPOptimizerClass, self).__init__(*args, **kwargs)
       self._l2_norm_clip = l2_norm_clip
       self._noise_multiplier = noise_multiplier
       self._num_microbatches = num_microbatches
       self._dp_sum_query = gaussian_query.GaussianSumQuery(
           l2_norm_clip, l2_norm_clip * noise_multiplier)
+      if ledger:
+        self._dp_sum_query = privacy_ledger.QueryWithLedger(
+            self._dp_sum_query, ledger=ledger)
+      self._ledger = ledger
       self._global_state = None
       self._was_dp_gradients_called = False
 
@@ -117,8 +126,76 @@ def make_keras_optimizer_class(cls):
         final_gradients = tf.nest.map_structure(reduce_noise_normalize_batch,
                                                 clipped_gradients)
 
+      final_gradients = self._record_to_ledger(final_gradients)
       return list(zip(final_gradients, var_list))
 
+    def compute_ghost_clipped_gradients(self, model, inputs, labels, loss_fn):
+      """DP gradients of a Sequential model with per-example ghost clipping.
+
+      Computes the norms of the per-example gradients from the inputs and
+      output gradients of the layers instead of materializing the gradients,
+      see ghost_clipping.py. Only Sequential models whose trainable layers are
+      Dense or Embedding layers are supported. Each example is a microbatch,
+      so num_microbatches must be None or the batch size.
+
+      Args:
+        model: A tf.keras.Sequential model.
+        inputs: A batch of inputs of the model.
+        labels: The labels of the batch.
+        loss_fn: Function from (labels, predictions) to per-example losses,
+          e.g. a tf.keras.losses.Loss with reduction NONE.
+
+      Returns:
+        A list of (gradient, variable) pairs, to be passed to apply_gradients.
+      """
+      self._was_dp_gradients_called = True
+      var_list = model.trainable_variables
+      with tf.keras.backend.name_scope(self._name + '/gradients'):
+        summed_gradients, norms = ghost_clipping.compute_clipped_gradients(
+            model, inputs, labels, loss_fn, self._l2_norm_clip)
+        batch_size = tf.shape(norms)[0]
+        assertions = []
+        if self._num_microbatches is not None:
+          assertions.append(tf.debugging.assert_equal(
+              batch_size, self._num_microbatches,
+              message='Ghost clipping needs one microbatch per example.'))
+
+        def noise_and_normalize(g):
+          # Embedding gradients are sparse, but the noise is not.
+          g = tf.convert_to_tensor(g)
+          noise_stddev = self._l2_norm_clip * self._noise_multiplier
+          noise = tf.random.normal(tf.shape(g), stddev=noise_stddev,
+                                   dtype=g.dtype)
+          with tf.control_dependencies(assertions):
+            return (g + noise) / tf.cast(batch_size, g.dtype)
+
+        final_gradients = [noise_and_normalize(g) for g in summed_gradients]
+
+      final_gradients = self._record_to_ledger(final_gradients)
+      return list(zip(final_gradients, var_list))
+
+    def _record_to_ledger(self, final_gradients):
+      """Records a step to the ledger, if any, once gradients are computed.
+
+      For the code paths adding the noise themselves rather than through
+      `_dp_sum_query`.
+
+      Args:
+        final_gradients: List of the noised gradients of the step.
+
+      Returns:
+        The gradients, depending on the step being recorded.
+      """
+      if not self._ledger:
+        return final_gradients
+      with tf.control_dependencies(final_gradients):
+        record = self._ledger.record_sum_query(
+            self._l2_norm_clip, self._l2_norm_clip * self._noise_multiplier)
+      with tf.control_dependencies([record]):
+        finalize = self._ledger.finalize_sample()
+      with tf.control_dependencies([finalize]):
+        return [tf.identity(g) for g in final_gradients]
+
     def get_gradients(self, loss, params):
       """DP version of superclass method."""
 
@@ -169,6 +246,10 @@ def make_keras_optimizer_class(cls):
       return super(DPOptimizerClass,
                    self).apply_gradients(grads_and_vars, global_step, name)
 
+    @property
+    def ledger(self):
+      return self._ledger
+
   return DPOptimizerClass
 
 
@@ -0,0 +1,147 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+r"""Benchmark of the DP Keras optimizers in eager mode.
+
+Trains a small text classifier on synthetic data with a non-private SGD
+optimizer, with DPKerasSGDOptimizer and with VectorizedDPKerasSGDOptimizer at
+several numbers of microbatches, and reports the examples processed per second.
+When there is one microbatch per example, it also trains with the ghost
+clipping of compute_ghost_clipped_gradients. The training step runs in a
+tf.function.
+
+With --model=embedding the classifier averages token embeddings before two
+dense layers, and the dense per-microbatch gradients of the embedding dominate
+the cost of both DP optimizers. With --model=dense it is a multilayer
+perceptron over bag-of-words features.
+
+Example:
+  python dp_optimizer_keras_benchmark.py --model=dense --batch_size=64 \
+      --num_microbatches=1,8,64
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+from absl import app
+from absl import flags
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_privacy.privacy.optimizers import dp_optimizer_keras
+from tensorflow_privacy.privacy.optimizers import dp_optimizer_keras_vectorized
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_enum('model', 'embedding', ['embedding', 'dense'],
+                  'Architecture of the classifier')
+flags.DEFINE_integer('batch_size', 64, 'Batch size')
+flags.DEFINE_list('num_microbatches', ['1', '8', '64'],
+                  'Numbers of microbatches to benchmark')
+flags.DEFINE_integer('vocab_size', 10000, 'Size of the vocabulary')
+flags.DEFINE_integer('seq_length', 128, 'Number of tokens per example')
+flags.DEFINE_integer('steps', 20, 'Number of timed training steps')
+
+
+def _make_model():
+  if FLAGS.model == 'embedding':
+    return tf.keras.Sequential([
+        tf.keras.layers.Embedding(FLAGS.vocab_size, 32),
+        tf.keras.layers.GlobalAveragePooling1D(),
+        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dense(2),
+    ])
+  return tf.keras.Sequential([
+      tf.keras.layers.Dense(256, activation='relu'),
+      tf.keras.layers.Dense(64, activation='relu'),
+      tf.keras.layers.Dense(2),
+  ])
+
+
+def _make_inputs(rng):
+  """Inputs of all timed steps, token ids or bag-of-words features."""
+  tokens = rng.randint(
+      FLAGS.vocab_size,
+      size=(FLAGS.steps, FLAGS.batch_size, FLAGS.seq_length)).astype(np.int32)
+  if FLAGS.model == 'embedding':
+    return tokens
+  return np.stack([
+      np.apply_along_axis(np.bincount, 1, batch, minlength=FLAGS.vocab_size)
+      for batch in tokens
+  ]).astype(np.float32)
+
+
+def _examples_per_second(optimizer, inputs, labels, ghost_clipping=False):
+  """Trains a fresh model and returns the examples processed per second."""
+  model = _make_model()
+  model.build((None,) + inputs.shape[2:])
+  loss_object = tf.keras.losses.SparseCategoricalCrossentropy(
+      from_logits=True, reduction=tf.keras.losses.Reduction.NONE)
+
+  @tf.function
+  def train_step(x, y):
+    if ghost_clipping:
+      optimizer.apply_gradients(
+          optimizer.compute_ghost_clipped_gradients(model, x, y, loss_object))
+    else:
+      loss = lambda: loss_object(y, model(x, training=True))
+      optimizer.minimize(loss, model.trainable_variables)
+
+  # The first step traces the function.
+  train_step(inputs[0], labels[0])
+  start = time.perf_counter()
+  for step in range(FLAGS.steps):
+    train_step(inputs[step], labels[step])
+  seconds = time.perf_counter() - start
+  return FLAGS.steps * FLAGS.batch_size / seconds
+
+
+def main(argv):
+  del argv  # argv is not used.
+
+  rng = np.random.RandomState(0)
+  inputs = _make_inputs(rng)
+  labels = rng.randint(2, size=(FLAGS.steps, FLAGS.batch_size))
+
+  baseline = _examples_per_second(
+      tf.keras.optimizers.SGD(learning_rate=.1), inputs, labels)
+  print('{:<12} {:>8} {:>12} {:>10}'.format('optimizer', 'micro', 'examples/s',
+                                            'vs non-DP'))
+  print('{:<12} {:>8} {:>12.1f} {:>10.2f}'.format('SGD', '-', baseline, 1.))
+
+  for num_microbatches in FLAGS.num_microbatches:
+    num_microbatches = int(num_microbatches)
+    runs = [('DP', dp_optimizer_keras.DPKerasSGDOptimizer, False),
+            ('Vectorized',
+             dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer, False)]
+    if num_microbatches == FLAGS.batch_size:
+      runs.append(('Ghost', dp_optimizer_keras.DPKerasSGDOptimizer, True))
+    for name, cls, ghost_clipping in runs:
+      optimizer = cls(
+          l2_norm_clip=1.0,
+          noise_multiplier=1.1,
+          num_microbatches=num_microbatches,
+          learning_rate=.1)
+      examples_per_second = _examples_per_second(optimizer, inputs, labels,
+                                                 ghost_clipping)
+      print('{:<12} {:>8} {:>12.1f} {:>10.2f}'.format(
+          name, num_microbatches, examples_per_second,
+          examples_per_second / baseline))
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,141 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Vectorized differentially private version of Keras optimizer v2."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from tensorflow_privacy.privacy.optimizers import dp_optimizer_keras
+
+
+def make_vectorized_keras_optimizer_class(cls):
+  """Constructs a vectorized DP Keras optimizer class from an existing one."""
+
+  class DPOptimizerClass(dp_optimizer_keras.make_keras_optimizer_class(cls)):
+    """Vectorized differentially private subclass of given class cls.
+
+    The gradients of all microbatches are computed at once, with
+    `GradientTape.jacobian` in eager mode and `tf.vectorized_map` in graph mode.
+    They are then clipped and summed together: the global norms of all
+    microbatch gradients are computed in one pass, and each variable gets the
+    sum of its clipped gradients as a single product with the vector of
+    clipping factors. Noise is added once per batch to these sums.
+
+    If `num_microbatches` is None, each example is its own microbatch.
+    """
+
+    def _clip_and_sum(self, stacked_gradients):
+      """Sums microbatch gradients clipped to a global norm of l2_norm_clip.
+
+      Args:
+        stacked_gradients: List of gradients of the variables, each stacked
+          over microbatches along the first axis.
+
+      Returns:
+        List of the sums over microbatches of the clipped gradients.
+      """
+      squared_norms = [
+          tf.reduce_sum(tf.reshape(tf.square(g), [tf.shape(g)[0], -1]), axis=1)
+          for g in stacked_gradients
+      ]
+      global_norms = tf.sqrt(tf.add_n(squared_norms))
+      scales = 1. / tf.maximum(global_norms / self._l2_norm_clip, 1.)
+      return [
+          tf.tensordot(tf.cast(scales, g.dtype), g, axes=1)
+          for g in stacked_gradients
+      ]
+
+    def _noise_and_normalize(self, summed_gradients, num_microbatches):
+      noise_stddev = self._l2_norm_clip * self._noise_multiplier
+
+      def noise_and_normalize(g):
+        noise = tf.random.normal(tf.shape(g), stddev=noise_stddev,
+                                 dtype=g.dtype)
+        return (g + noise) / tf.cast(num_microbatches, g.dtype)
+
+      return [noise_and_normalize(g) for g in summed_gradients]
+
+    def _compute_gradients(self, loss, var_list, grad_loss=None, tape=None):
+      """DP version of superclass method."""
+
+      self._was_dp_gradients_called = True
+      # Compute loss.
+      if not callable(loss) and tape is None:
+        raise ValueError('`tape` is required when a `Tensor` loss is passed.')
+      tape = tape if tape is not None else tf.GradientTape()
+
+      if callable(loss):
+        with tape:
+          if not callable(var_list):
+            tape.watch(var_list)
+          loss = loss()
+          if callable(var_list):
+            var_list = var_list()
+
+      var_list = tf.nest.flatten(var_list)
+      num_microbatches = self._num_microbatches
+      if num_microbatches is None:
+        num_microbatches = tf.shape(input=loss)[0]
+      with tape:
+        microbatch_losses = tf.reduce_mean(
+            tf.reshape(loss, [num_microbatches, -1]), axis=1)
+
+      with tf.keras.backend.name_scope(self._name + '/gradients'):
+        jacobian = tape.jacobian(
+            microbatch_losses,
+            var_list,
+            unconnected_gradients=tf.UnconnectedGradients.ZERO)
+        final_gradients = self._noise_and_normalize(
+            self._clip_and_sum(jacobian), num_microbatches)
+
+      final_gradients = self._record_to_ledger(final_gradients)
+      return list(zip(final_gradients, var_list))
+
+    def get_gradients(self, loss, params):
+      """DP version of superclass method."""
+
+      self._was_dp_gradients_called = True
+      num_microbatches = self._num_microbatches
+      if num_microbatches is None:
+        num_microbatches = tf.shape(input=loss)[0]
+      microbatch_losses = tf.reshape(loss, [num_microbatches, -1])
+
+      def process_microbatch(microbatch_loss):
+        """Gradients of one microbatch."""
+        mean_loss = tf.reduce_mean(input_tensor=microbatch_loss)
+        grads = tf.gradients(mean_loss, params)
+        return [
+            g if g is not None else tf.zeros_like(v)
+            for (g, v) in zip(grads, params)
+        ]
+
+      stacked_gradients = tf.vectorized_map(process_microbatch,
+                                            microbatch_losses)
+      final_gradients = self._noise_and_normalize(
+          self._clip_and_sum(stacked_gradients), num_microbatches)
+      return self._record_to_ledger(final_gradients)
+
+  return DPOptimizerClass
+
+
+VectorizedDPKerasAdagradOptimizer = make_vectorized_keras_optimizer_class(
+    tf.keras.optimizers.Adagrad)
+VectorizedDPKerasAdamOptimizer = make_vectorized_keras_optimizer_class(
+    tf.keras.optimizers.Adam)
+VectorizedDPKerasSGDOptimizer = make_vectorized_keras_optimizer_class(
+    tf.keras.optimizers.SGD)
@@ -0,0 +1,257 @@
+# Copyright 2020, The TensorFlow Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for dp_optimizer_keras_vectorized.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_privacy.privacy.analysis import privacy_ledger
+from tensorflow_privacy.privacy.analysis import rdp_accountant
+from tensorflow_privacy.privacy.optimizers import dp_optimizer_keras
+from tensorflow_privacy.privacy.optimizers import dp_optimizer_keras_vectorized
+
+
+class VectorizedDPOptimizerComputeGradientsTest(tf.test.TestCase,
+                                                parameterized.TestCase):
+  """Tests for _compute_gradients method."""
+
+  def _loss(self, val0, val1):
+    """Loss function whose derivative w.r.t val1 is val1 - val0."""
+    return 0.5 * tf.reduce_sum(
+        input_tensor=tf.math.squared_difference(val0, val1), axis=1)
+
+  # Parameters for testing: optimizer, num_microbatches, expected gradient for
+  # var0, expected gradient for var1.
+  @parameterized.named_parameters(
+      ('DPGradientDescent 1',
+       dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer, 1,
+       [-2.5, -2.5], [-0.5]),
+      ('DPAdam 2', dp_optimizer_keras_vectorized.VectorizedDPKerasAdamOptimizer,
+       2, [-2.5, -2.5], [-0.5]),
+      ('DPAdagrad 4',
+       dp_optimizer_keras_vectorized.VectorizedDPKerasAdagradOptimizer, 4,
+       [-2.5, -2.5], [-0.5]),
+      ('DPGradientDescent None',
+       dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer, None,
+       [-2.5, -2.5], [-0.5]),
+  )
+  def testBaselineWithCallableLoss(self, cls, num_microbatches, expected_grad0,
+                                   expected_grad1):
+    var0 = tf.Variable([1.0, 2.0])
+    var1 = tf.Variable([3.0])
+    data0 = tf.Variable([[3.0, 4.0], [5.0, 6.0], [7.0, 8.0], [-1.0, 0.0]])
+    data1 = tf.Variable([[8.0], [2.0], [3.0], [1.0]])
+
+    opt = cls(
+        l2_norm_clip=100.0,
+        noise_multiplier=0.0,
+        num_microbatches=num_microbatches,
+        learning_rate=2.0)
+
+    loss = lambda: self._loss(data0, var0) + self._loss(data1, var1)
+
+    grads_and_vars = opt._compute_gradients(loss, [var0, var1])
+    self.assertAllCloseAccordingToType(expected_grad0, grads_and_vars[0][0])
+    self.assertAllCloseAccordingToType(expected_grad1, grads_and_vars[1][0])
+
+  @parameterized.named_parameters(
+      ('DPGradientDescent 1',
+       dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer, 1),
+      ('DPGradientDescent 4',
+       dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer, 4),
+  )
+  def testBaselineWithTensorLoss(self, cls, num_microbatches):
+    var0 = tf.Variable([1.0, 2.0])
+    data0 = tf.Variable([[3.0, 4.0], [5.0, 6.0], [7.0, 8.0], [-1.0, 0.0]])
+
+    opt = cls(
+        l2_norm_clip=100.0,
+        noise_multiplier=0.0,
+        num_microbatches=num_microbatches,
+        learning_rate=2.0)
+
+    tape = tf.GradientTape()
+    with tape:
+      loss = self._loss(data0, var0)
+
+    grads_and_vars = opt._compute_gradients(loss, [var0], tape=tape)
+    self.assertAllCloseAccordingToType([-2.5, -2.5], grads_and_vars[0][0])
+
+  @parameterized.named_parameters(
+      ('1', 1, [-0.6, -0.8]),
+      ('2', 2, [-0.6, -0.8]),
+      ('None', None, [-0.6, -0.8]),
+  )
+  def testClippingNorm(self, num_microbatches, expected_grad):
+    var0 = tf.Variable([0.0, 0.0])
+    data0 = tf.Variable([[3.0, 4.0], [6.0, 8.0]])
+
+    opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+        l2_norm_clip=1.0,
+        noise_multiplier=0.0,
+        num_microbatches=num_microbatches,
+        learning_rate=2.0)
+
+    loss = lambda: self._loss(data0, var0)
+    grads_and_vars = opt._compute_gradients(loss, [var0])
+    self.assertAllCloseAccordingToType(expected_grad, grads_and_vars[0][0])
+
+  def testClippingIsGlobalAcrossVariables(self):
+    var0 = tf.Variable([0.0])
+    var1 = tf.Variable([0.0])
+    data0 = tf.Variable([[3.0], [0.3]])
+    data1 = tf.Variable([[4.0], [0.4]])
+
+    opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+        l2_norm_clip=1.0,
+        noise_multiplier=0.0,
+        num_microbatches=2,
+        learning_rate=2.0)
+
+    loss = lambda: self._loss(data0, var0) + self._loss(data1, var1)
+    # The first gradient is clipped to norm 1, the second is not.
+    grads_and_vars = opt._compute_gradients(loss, [var0, var1])
+    self.assertAllCloseAccordingToType([-0.45], grads_and_vars[0][0])
+    self.assertAllCloseAccordingToType([-0.6], grads_and_vars[1][0])
+
+  @parameterized.named_parameters(
+      ('1', 1),
+      ('4', 4),
+  )
+  def testMatchesDPKerasOptimizer(self, num_microbatches):
+    var0 = tf.Variable([1.0, -2.0, 0.5])
+    data0 = tf.Variable(np.random.normal(size=(8, 3)).astype(np.float32))
+    loss = lambda: self._loss(data0, var0)
+
+    grads = []
+    for cls in (dp_optimizer_keras.DPKerasSGDOptimizer,
+                dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer):
+      opt = cls(
+          l2_norm_clip=1.0,
+          noise_multiplier=0.0,
+          num_microbatches=num_microbatches,
+          learning_rate=2.0)
+      grads.append(opt._compute_gradients(loss, [var0])[0][0])
+    self.assertAllClose(grads[0], grads[1])
+
+  @parameterized.named_parameters(
+      ('2 4 1', 2.0, 4.0, 1),
+      ('4 1 4', 4.0, 1.0, 4),
+  )
+  def testNoiseMultiplier(self, l2_norm_clip, noise_multiplier,
+                          num_microbatches):
+    var0 = tf.Variable(tf.zeros([1000], dtype=tf.float32))
+    data0 = tf.Variable(tf.zeros([16, 1000], dtype=tf.float32))
+
+    opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+        l2_norm_clip=l2_norm_clip,
+        noise_multiplier=noise_multiplier,
+        num_microbatches=num_microbatches,
+        learning_rate=2.0)
+
+    loss = lambda: self._loss(data0, var0)
+    grads_and_vars = opt._compute_gradients(loss, [var0])
+    grads = grads_and_vars[0][0].numpy()
+
+    # Test standard deviation is close to l2_norm_clip * noise_multiplier.
+    self.assertNear(
+        np.std(grads), l2_norm_clip * noise_multiplier / num_microbatches, 0.5)
+
+  def testLedger(self):
+    orders = range(2, 33)
+    ledger = privacy_ledger.StreamingPrivacyLedger(100, 0.04, orders)
+    var0 = tf.Variable([0.0])
+    data0 = tf.Variable([[1.0], [2.0], [3.0], [4.0]])
+
+    opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+        l2_norm_clip=2.0,
+        noise_multiplier=1.5,
+        num_microbatches=2,
+        learning_rate=2.0,
+        ledger=ledger)
+
+    loss = lambda: self._loss(data0, var0)
+    for _ in range(3):
+      opt.apply_gradients(opt._compute_gradients(loss, [var0]))
+    self.assertEqual(ledger.steps, 3)
+    self.assertAllClose(ledger.get_rdp(),
+                        rdp_accountant.compute_rdp(0.04, 1.5, 3, orders))
+
+  def testAssertOnNoCallOfComputeGradients(self):
+    """Tests that assertion fails when DP gradients are not computed."""
+    opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+        l2_norm_clip=100.0,
+        noise_multiplier=0.0,
+        num_microbatches=1,
+        learning_rate=2.0)
+
+    with self.assertRaises(AssertionError):
+      grads_and_vars = tf.Variable([0.0])
+      opt.apply_gradients(grads_and_vars)
+
+
+class VectorizedDPOptimizerGetGradientsTest(tf.test.TestCase,
+                                            parameterized.TestCase):
+  """Tests for get_gradients method, which runs in graph mode."""
+
+  @parameterized.named_parameters(
+      ('1', 1, [-2.5, -2.5]),
+      ('2', 2, [-2.5, -2.5]),
+      ('None', None, [-2.5, -2.5]),
+  )
+  def testBaseline(self, num_microbatches, expected_grad):
+    with tf.Graph().as_default():
+      var0 = tf.compat.v1.Variable([1.0, 2.0])
+      data0 = tf.constant([[3.0, 4.0], [5.0, 6.0], [7.0, 8.0], [-1.0, 0.0]])
+      loss = 0.5 * tf.reduce_sum(
+          input_tensor=tf.math.squared_difference(data0, var0), axis=1)
+
+      opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+          l2_norm_clip=100.0,
+          noise_multiplier=0.0,
+          num_microbatches=num_microbatches,
+          learning_rate=2.0)
+      grads = opt.get_gradients(loss, [var0])
+
+      with self.cached_session() as sess:
+        sess.run(tf.compat.v1.global_variables_initializer())
+        self.assertAllCloseAccordingToType(expected_grad, sess.run(grads[0]))
+
+  def testClippingNorm(self):
+    with tf.Graph().as_default():
+      var0 = tf.compat.v1.Variable([1.0, 2.0])
+      data0 = tf.constant([[3.0, 4.0], [5.0, 6.0], [7.0, 8.0], [-1.0, 0.0]])
+      loss = 0.5 * tf.reduce_sum(
+          input_tensor=tf.math.squared_difference(data0, var0), axis=1)
+
+      opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+          l2_norm_clip=1.0,
+          noise_multiplier=0.0,
+          num_microbatches=2,
+          learning_rate=2.0)
+      grads = opt.get_gradients(loss, [var0])
+
+      # Both microbatch gradients, [-2, -2] and [-3, -3], are clipped.
+      with self.cached_session() as sess:
+        sess.run(tf.compat.v1.global_variables_initializer())
+        self.assertAllClose([-0.5**0.5, -0.5**0.5], sess.run(grads[0]))
+
+
+if __name__ == '__main__':
+  tf.test.main()
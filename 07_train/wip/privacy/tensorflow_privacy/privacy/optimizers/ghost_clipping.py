@@ -0,0 +1,247 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Per-example gradient clipping without per-example gradients.
+
+The gradient of the loss of one example with respect to the kernel of a dense
+layer is a sum over positions t of outer products x_t g_t^T, where x_t are the
+inputs of the layer and g_t the gradients of the loss with respect to its
+outputs (before the activation). Its squared norm
+
+  ||sum_t x_t g_t^T||^2 = sum_{t, s} (x_t . x_s) (g_t . g_s)
+
+only takes the inputs and output gradients of the layer, which backpropagation
+computes anyway for the whole batch. Likewise the gradient with respect to an
+embedding table has one row per distinct token of the example, the sum of the
+output gradients at the positions of that token.
+
+compute_gradient_norms uses this "ghost norm" trick to get the norms of all
+per-example gradients of a model from a single backward pass to the layer
+outputs. compute_clipped_gradients then clips them with a second backward pass,
+of the losses reweighted by their clipping factors, whose result is the sum of
+the clipped per-example gradients. Neither materializes per-example gradients,
+except for dense layers on sequences long enough for the outer products to be
+smaller than the Gram matrices.
+
+Only tf.keras.Sequential models are supported, whose trainable layers are all
+tf.keras.layers.Dense or tf.keras.layers.Embedding. Layers mixing examples of
+the batch, such as batch normalization, are not supported.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+
+def _dense_squared_norms(inputs, output_grads):
+  """Squared norms of the per-example kernel gradients of a dense layer.
+
+  Args:
+    inputs: Inputs of the layer, of shape [batch_size, ..., input_dim].
+    output_grads: Gradients with respect to the outputs of the layer before the
+      activation, of shape [batch_size, ..., units].
+
+  Returns:
+    Tensor of shape [batch_size].
+  """
+  input_dim = inputs.shape[-1]
+  units = output_grads.shape[-1]
+  num_positions = inputs.shape[1:-1].num_elements()
+  batch_size = tf.shape(inputs)[0]
+  inputs = tf.reshape(inputs, [batch_size, -1, input_dim])
+  output_grads = tf.reshape(output_grads, [batch_size, -1, units])
+
+  if num_positions == 1:
+    return (tf.reduce_sum(tf.square(inputs), axis=[1, 2]) *
+            tf.reduce_sum(tf.square(output_grads), axis=[1, 2]))
+  if (num_positions is None or
+      num_positions**2 * (input_dim + units) <= input_dim * units):
+    input_gram = tf.matmul(inputs, inputs, transpose_b=True)
+    output_grad_gram = tf.matmul(output_grads, output_grads, transpose_b=True)
+    return tf.reduce_sum(input_gram * output_grad_gram, axis=[1, 2])
+  # Gram matrices of long sequences are larger than the gradients.
+  grads = tf.matmul(inputs, output_grads, transpose_a=True)
+  return tf.reduce_sum(tf.square(grads), axis=[1, 2])
+
+
+def _bias_squared_norms(output_grads):
+  """Squared norms of the per-example bias gradients of a dense layer."""
+  batch_size = tf.shape(output_grads)[0]
+  output_grads = tf.reshape(output_grads,
+                            [batch_size, -1, output_grads.shape[-1]])
+  return tf.reduce_sum(tf.square(tf.reduce_sum(output_grads, axis=1)), axis=1)
+
+
+def _embedding_squared_norms(ids, output_grads, vocab_size):
+  """Squared norms of the per-example gradients of an embedding table.
+
+  Args:
+    ids: Token ids of shape [batch_size, ...].
+    output_grads: Gradients with respect to the embeddings, of shape
+      [batch_size, ..., output_dim].
+    vocab_size: Number of rows of the embedding table.
+
+  Returns:
+    Tensor of shape [batch_size].
+  """
+  batch_size = tf.shape(ids)[0]
+  ids = tf.cast(tf.reshape(ids, [batch_size, -1]), tf.int64)
+  output_grads = tf.reshape(output_grads, [-1, output_grads.shape[-1]])
+  # One row per distinct (example, token) pair.
+  examples = tf.broadcast_to(
+      tf.range(tf.cast(batch_size, tf.int64))[:, None], tf.shape(ids))
+  keys, rows = tf.unique(tf.reshape(examples * vocab_size + ids, [-1]))
+  row_grads = tf.math.unsorted_segment_sum(output_grads, rows, tf.size(keys))
+  return tf.math.unsorted_segment_sum(
+      tf.reduce_sum(tf.square(row_grads), axis=1), keys // vocab_size,
+      batch_size)
+
+
+def _forward(model, inputs, training):
+  """Runs a Sequential model, keeping the tensors needed for ghost norms.
+
+  Args:
+    model: A tf.keras.Sequential model.
+    inputs: A batch of inputs of the model.
+    training: Whether the layers run in training mode.
+
+  Returns:
+    The outputs of the model and a list of (layer, layer inputs, layer outputs
+    before the activation) for its Dense and Embedding layers.
+
+  Raises:
+    ValueError: If the model is not Sequential or has other trainable layers.
+  """
+  if not isinstance(model, tf.keras.Sequential):
+    raise ValueError('Ghost clipping only supports tf.keras.Sequential models.')
+  outputs = tf.convert_to_tensor(inputs)
+  records = []
+  for layer in model.layers:
+    if not layer.built:
+      layer.build(outputs.shape)
+    if not layer.trainable_weights:
+      outputs = layer(outputs, training=training)
+    elif isinstance(layer, tf.keras.layers.Dense):
+      layer_inputs = tf.cast(outputs, layer.kernel.dtype)
+      base_outputs = tf.tensordot(layer_inputs, layer.kernel, axes=1)
+      if layer.use_bias:
+        base_outputs += layer.bias
+      records.append((layer, layer_inputs, base_outputs))
+      outputs = layer.activation(base_outputs)
+    elif isinstance(layer, tf.keras.layers.Embedding):
+      if layer.mask_zero:
+        raise ValueError('Ghost clipping does not propagate masks, '
+                         'Embedding layers must have mask_zero=False.')
+      if not outputs.dtype.is_integer:
+        outputs = tf.cast(outputs, tf.int32)
+      base_outputs = tf.nn.embedding_lookup(layer.embeddings, outputs)
+      records.append((layer, outputs, base_outputs))
+      outputs = base_outputs
+    else:
+      raise ValueError('Ghost clipping does not support trainable layers of '
+                       'type {}.'.format(type(layer).__name__))
+  return outputs, records
+
+
+def _squared_norms(records, base_output_grads):
+  """Squared norms of the per-example gradients of all recorded layers."""
+  squared_norms = []
+  for (layer, layer_inputs, _), grads in zip(records, base_output_grads):
+    if isinstance(layer, tf.keras.layers.Dense):
+      squared_norms.append(_dense_squared_norms(layer_inputs, grads))
+      if layer.use_bias:
+        squared_norms.append(_bias_squared_norms(grads))
+    else:
+      squared_norms.append(
+          _embedding_squared_norms(layer_inputs, grads, layer.input_dim))
+  return tf.add_n(squared_norms)
+
+
+def _per_example_losses(model, inputs, labels, loss_fn, training):
+  outputs, records = _forward(model, inputs, training)
+  losses = loss_fn(labels, outputs)
+  losses = tf.reduce_sum(
+      tf.reshape(losses, [tf.shape(losses)[0], -1]), axis=1)
+  return losses, records
+
+
+def compute_gradient_norms(model, inputs, labels, loss_fn, training=True):
+  """Norms of the per-example gradients of a model.
+
+  Args:
+    model: A tf.keras.Sequential model, whose trainable layers are Dense or
+      Embedding layers.
+    inputs: A batch of inputs of the model.
+    labels: The labels of the batch.
+    loss_fn: Function from (labels, predictions) to per-example losses, e.g.
+      a tf.keras.losses.Loss with reduction NONE. Losses with more than one
+      value per example are summed.
+    training: Whether the layers run in training mode.
+
+  Returns:
+    Tensor of shape [batch_size] of the l2 norms of the gradients of the
+    per-example losses with respect to all trainable variables.
+  """
+  with tf.GradientTape() as tape:
+    losses, records = _per_example_losses(model, inputs, labels, loss_fn,
+                                          training)
+  base_output_grads = tape.gradient(
+      losses, [base_outputs for _, _, base_outputs in records])
+  return tf.sqrt(_squared_norms(records, base_output_grads))
+
+
+def compute_clipped_gradients(model,
+                              inputs,
+                              labels,
+                              loss_fn,
+                              l2_norm_clip,
+                              training=True):
+  """Sum of the per-example gradients of a model clipped to l2_norm_clip.
+
+  Both backward passes share one forward pass, so that random layers such as
+  dropout behave the same in both.
+
+  Args:
+    model: A tf.keras.Sequential model, whose trainable layers are Dense or
+      Embedding layers.
+    inputs: A batch of inputs of the model.
+    labels: The labels of the batch.
+    loss_fn: Function from (labels, predictions) to per-example losses, e.g.
+      a tf.keras.losses.Loss with reduction NONE. Losses with more than one
+      value per example are summed.
+    l2_norm_clip: Maximum l2 norm of the per-example gradients.
+    training: Whether the layers run in training mode.
+
+  Returns:
+    Pair of the list of the summed clipped gradients, aligned with
+    model.trainable_variables, and of the per-example gradient norms.
+  """
+  with tf.GradientTape(persistent=True) as tape:
+    losses, records = _per_example_losses(model, inputs, labels, loss_fn,
+                                          training)
+  # Both backward passes run outside of the tape's context, so that neither of
+  # them is recorded on the persistent tape.
+  base_output_grads = tape.gradient(
+      losses, [base_outputs for _, _, base_outputs in records])
+  norms = tf.sqrt(_squared_norms(records, base_output_grads))
+  clip_factors = tf.minimum(1., l2_norm_clip / tf.maximum(norms, 1e-12))
+  grads = tape.gradient(
+      losses,
+      model.trainable_variables,
+      output_gradients=clip_factors,
+      unconnected_gradients=tf.UnconnectedGradients.ZERO)
+  del tape
+  return grads, norms
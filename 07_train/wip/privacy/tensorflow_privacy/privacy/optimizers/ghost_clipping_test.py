@@ -0,0 +1,161 @@
+# Copyright 2020, The TensorFlow Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for ghost_clipping.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_privacy.privacy.optimizers import dp_optimizer_keras_vectorized
+from tensorflow_privacy.privacy.optimizers import ghost_clipping
+
+
+def _make_model(name):
+  """Small models and a batch of inputs for them."""
+  rng = np.random.RandomState(0)
+  if name == 'mlp':
+    model = tf.keras.Sequential([
+        tf.keras.layers.Dense(5, activation='relu'),
+        tf.keras.layers.Dense(3, use_bias=False),
+        tf.keras.layers.Dense(2),
+    ])
+    inputs = rng.normal(size=(6, 4)).astype(np.float32)
+  elif name == 'short_sequence':
+    # The norms of the dense layers come from Gram matrices.
+    model = tf.keras.Sequential([
+        tf.keras.layers.Dense(8, activation='tanh'),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(2),
+    ])
+    inputs = rng.normal(size=(6, 2, 8)).astype(np.float32)
+  elif name == 'long_sequence':
+    # The norms of the first dense layer come from per-example gradients.
+    model = tf.keras.Sequential([
+        tf.keras.layers.Dense(3, activation='tanh'),
+        tf.keras.layers.GlobalAveragePooling1D(),
+        tf.keras.layers.Dense(2),
+    ])
+    inputs = rng.normal(size=(6, 10, 2)).astype(np.float32)
+  else:
+    # Tokens repeat within examples.
+    model = tf.keras.Sequential([
+        tf.keras.layers.Embedding(7, 4),
+        tf.keras.layers.GlobalAveragePooling1D(),
+        tf.keras.layers.Dense(2),
+    ])
+    inputs = rng.randint(7, size=(6, 5)).astype(np.int32)
+  model.build(inputs.shape)
+  labels = rng.randint(2, size=6)
+  return model, inputs, labels
+
+
+_LOSS = tf.keras.losses.SparseCategoricalCrossentropy(
+    from_logits=True, reduction=tf.keras.losses.Reduction.NONE)
+
+
+def _per_example_gradients(model, inputs, labels):
+  """Per-example gradients of all variables, flattened and concatenated."""
+  with tf.GradientTape() as tape:
+    losses = _LOSS(labels, model(inputs, training=True))
+  jacobian = tape.jacobian(
+      losses,
+      model.trainable_variables,
+      unconnected_gradients=tf.UnconnectedGradients.ZERO)
+  return np.concatenate(
+      [np.reshape(j, [len(inputs), -1]) for j in jacobian], axis=1)
+
+
+class GhostClippingTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters('mlp', 'short_sequence', 'long_sequence',
+                            'embedding')
+  def testGradientNorms(self, name):
+    model, inputs, labels = _make_model(name)
+    norms = ghost_clipping.compute_gradient_norms(model, inputs, labels, _LOSS)
+
+    expected_norms = np.linalg.norm(
+        _per_example_gradients(model, inputs, labels), axis=1)
+    self.assertAllClose(expected_norms, norms, rtol=1e-5)
+
+  @parameterized.parameters('mlp', 'short_sequence', 'long_sequence',
+                            'embedding')
+  def testClippedGradients(self, name):
+    model, inputs, labels = _make_model(name)
+    per_example_gradients = _per_example_gradients(model, inputs, labels)
+    norms = np.linalg.norm(per_example_gradients, axis=1)
+    l2_norm_clip = np.median(norms)
+
+    grads, ghost_norms = ghost_clipping.compute_clipped_gradients(
+        model, inputs, labels, _LOSS, l2_norm_clip)
+
+    clip_factors = np.minimum(1., l2_norm_clip / norms)
+    expected = np.sum(clip_factors[:, None] * per_example_gradients, axis=0)
+    flat_grads = np.concatenate(
+        [np.reshape(tf.convert_to_tensor(g), [-1]) for g in grads])
+    self.assertAllClose(norms, ghost_norms, rtol=1e-5)
+    self.assertAllClose(expected, flat_grads, rtol=1e-5, atol=1e-6)
+
+  def testMatchesVectorizedOptimizer(self):
+    model, inputs, labels = _make_model('embedding')
+    kwargs = dict(l2_norm_clip=.1, noise_multiplier=0., learning_rate=1.)
+
+    opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+        num_microbatches=None, **kwargs)
+    loss = lambda: _LOSS(labels, model(inputs, training=True))
+    expected = opt._compute_gradients(loss, model.trainable_variables)
+
+    ghost_opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+        num_microbatches=len(inputs), **kwargs)
+    grads_and_vars = ghost_opt.compute_ghost_clipped_gradients(
+        model, inputs, labels, _LOSS)
+    for (grad, var), (expected_grad, expected_var) in zip(
+        grads_and_vars, expected):
+      self.assertIs(var, expected_var)
+      self.assertAllClose(expected_grad, grad, rtol=1e-5, atol=1e-7)
+    ghost_opt.apply_gradients(grads_and_vars)
+
+  def testNoiseMultiplier(self):
+    model = tf.keras.Sequential([tf.keras.layers.Dense(1000)])
+    model.build((None, 1))
+    inputs = np.zeros((16, 1), dtype=np.float32)
+    labels = np.zeros((16, 1000), dtype=np.float32)
+    loss = lambda y, pred: tf.reduce_sum(tf.square(y - pred), axis=1)
+
+    opt = dp_optimizer_keras_vectorized.VectorizedDPKerasSGDOptimizer(
+        l2_norm_clip=4., noise_multiplier=2., learning_rate=1.)
+    grads_and_vars = opt.compute_ghost_clipped_gradients(
+        model, inputs, labels, loss)
+    self.assertNear(np.std(grads_and_vars[1][0]), 4. * 2. / 16, 0.1)
+
+  def testUnsupportedLayer(self):
+    model = tf.keras.Sequential([tf.keras.layers.Conv1D(2, 3)])
+    model.build((None, 5, 2))
+    with self.assertRaisesRegex(ValueError, 'Conv1D'):
+      ghost_clipping.compute_gradient_norms(
+          model, np.zeros((2, 5, 2), np.float32), np.zeros(2), _LOSS)
+
+  def testUnsupportedModel(self):
+    inputs = tf.keras.Input(shape=(4,))
+    model = tf.keras.Model(inputs, tf.keras.layers.Dense(2)(inputs))
+    with self.assertRaisesRegex(ValueError, 'Sequential'):
+      ghost_clipping.compute_gradient_norms(
+          model, np.zeros((2, 4), np.float32), np.zeros(2), _LOSS)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -5,7 +5,10 @@ import boto3
 import s3fs
 import io
 
-from scipy.sparse import lil_matrix
+from scipy.sparse import csr_matrix
+
+# S3 multipart uploads require every part but the last to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
 
 
 def convert_sparse_matrix(df, nb_rows, nb_customer, nb_products):
@@ -17,14 +20,17 @@ def convert_sparse_matrix(df, nb_rows, nb_customer, nb_products):
     print("# of rows = {}".format(str(nb_rows)))
     print("# of cols = {}".format(str(nb_cols)))
 
-    # extract customers and ratings
-    df_X = df_val[:, 0:2]
-    # Features are one-hot encoded in a sparse matrix
-    X = lil_matrix((nb_rows, nb_cols)).astype('float32')
-    df_X[:, 1] = nb_customer + df_X[:, 1]
-    coords = df_X[:, 0:2]
-    X[np.arange(nb_rows), coords[:, 0]] = 1
-    X[np.arange(nb_rows), coords[:, 1]] = 1
+    # extract customers and products
+    customers = df_val[:, 0].astype(np.int64)
+    products = nb_customer + df_val[:, 1].astype(np.int64)
+
+    # Features are one-hot encoded in a sparse matrix: every row has exactly
+    # two ones, the customer column followed by the product column, so the
+    # CSR arrays can be built directly from the index arrays
+    indices = np.column_stack((customers, products)).ravel()
+    indptr = np.arange(0, 2 * nb_rows + 1, 2)
+    data = np.ones(2 * nb_rows, dtype='float32')
+    X = csr_matrix((data, indices, indptr), shape=(nb_rows, nb_cols))
 
     # create label with ratings
     Y = df_val[:, 2].astype('float32')
@@ -38,10 +44,15 @@ def convert_sparse_matrix(df, nb_rows, nb_customer, nb_products):
     return X, Y
 
 
-def save_as_protobuf(X, Y, bucket, key):
+def save_as_protobuf(X, Y, bucket, key, chunk_size=10000,
+                     part_size=8 * 1024 * 1024):
     """Converts features and predictions matrices to recordio protobuf and
        writes to S3
 
+    The matrices are serialized chunk_size rows at a time and streamed to S3
+    with a multipart upload, so the memory needed is bounded by the chunk and
+    part size instead of the size of the whole file.
+
     Args:
         X:
           2D numpy matrix with features
@@ -49,19 +60,52 @@ def save_as_protobuf(X, Y, bucket, key):
           1D numpy matrix with predictions
         bucket:
           s3 bucket where recordio protobuf file will be staged
-        prefix:
-          s3 url prefix to stage prepared data to use for training the model
         key:
           protobuf file name to be staged
+        chunk_size:
+          number of rows serialized at a time
+        part_size:
+          minimum size in bytes of an uploaded part, at least 5 MiB
 
     Returns:
         s3 url with key to the protobuf data
     """
-    buf = io.BytesIO()
-    smac.write_spmatrix_to_sparse_tensor(buf, X, Y)
-    buf.seek(0)
+    part_size = max(part_size, MIN_PART_SIZE)
     obj = '{}'.format(key)
-    boto3.resource('s3').Bucket(bucket).Object(obj).upload_fileobj(buf)
+    s3 = boto3.client('s3')
+    upload_id = s3.create_multipart_upload(Bucket=bucket, Key=obj)['UploadId']
+    parts = []
+
+    def upload_part(buf):
+        response = s3.upload_part(Bucket=bucket,
+                                  Key=obj,
+                                  PartNumber=len(parts) + 1,
+                                  UploadId=upload_id,
+                                  Body=buf.getvalue())
+        parts.append({'PartNumber': len(parts) + 1,
+                      'ETag': response['ETag']})
+
+    try:
+        buf = io.BytesIO()
+        # slice one chunk at a time, slicing a sparse matrix copies the rows
+        for start in range(0, X.shape[0], chunk_size):
+            smac.write_spmatrix_to_sparse_tensor(buf,
+                                                 X[start: start + chunk_size],
+                                                 Y[start: start + chunk_size])
+            if buf.tell() >= part_size:
+                upload_part(buf)
+                buf = io.BytesIO()
+        # the last part may be smaller than the minimum part size
+        if buf.tell() > 0 or not parts:
+            upload_part(buf)
+
+        s3.complete_multipart_upload(Bucket=bucket,
+                                     Key=obj,
+                                     UploadId=upload_id,
+                                     MultipartUpload={'Parts': parts})
+    except Exception:
+        s3.abort_multipart_upload(Bucket=bucket, Key=obj, UploadId=upload_id)
+        raise
     return 's3://{}/{}'.format(bucket, obj)
 
 
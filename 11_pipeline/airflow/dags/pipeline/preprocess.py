@@ -3,15 +3,120 @@ import numpy as np
 import s3fs
 
 
+# rows read from the input file and written to the output files at a time
+CHUNKSIZE = 1000000
+
+
+class IdIndexer(object):
+    """Assigns consecutive integer codes to ids seen across chunks"""
+
+    def __init__(self):
+        self.ids = pd.Index([])
+
+    def get_codes(self, values):
+        uniques = pd.unique(values)
+        new_ids = uniques[self.ids.get_indexer(uniques) == -1]
+        if len(new_ids) > 0:
+            self.ids = self.ids.append(pd.Index(new_ids))
+        return self.ids.get_indexer(values)
+
+
+def read_ratings(s3_in_url, delimiter, chunksize=CHUNKSIZE):
+    """Reads customer, product and rating of every review chunk by chunk
+
+    Only compact integer codes are kept in memory, so the delimited file
+    (including review texts and product titles) can be larger than memory.
+
+    Returns:
+        customer codes, product codes and star ratings as numpy arrays
+    """
+    customer_indexer = IdIndexer()
+    product_indexer = IdIndexer()
+    customers, products, ratings = [], [], []
+    try:
+        reader = pd.read_csv(s3_in_url,
+                             sep=delimiter,
+                             usecols=['customer_id', 'product_id',
+                                      'star_rating'],
+                             chunksize=chunksize,
+                             error_bad_lines=False)
+    except pd.errors.EmptyDataError:
+        reader = []
+    for chunk in reader:
+        chunk = chunk.dropna()
+        customers.append(
+            customer_indexer.get_codes(chunk['customer_id'].values)
+            .astype(np.int32))
+        products.append(
+            product_indexer.get_codes(chunk['product_id'].values)
+            .astype(np.int32))
+        ratings.append(chunk['star_rating'].values.astype(np.int8))
+    if not ratings:
+        return (np.array([], dtype=np.int32),
+                np.array([], dtype=np.int32),
+                np.array([], dtype=np.int8))
+    return (np.concatenate(customers),
+            np.concatenate(products),
+            np.concatenate(ratings))
+
+
+def drop_duplicate_ratings(customers, products):
+    """Returns a mask keeping the first rating of a customer for a product"""
+    nb_products = products.max() + 1 if len(products) else 0
+    pairs = customers.astype(np.int64) * nb_products + products
+    _, first = np.unique(pairs, return_index=True)
+    mask = np.zeros(len(pairs), dtype=bool)
+    mask[first] = True
+    return mask
+
+
+def filter_long_tail(customers, products, mask, min_customer_ratings,
+                     min_product_ratings):
+    """Removes customers and products with too few ratings until a fixpoint
+
+    Removing products can push customers below their threshold and vice
+    versa, so the thresholds are applied repeatedly until no more ratings
+    are removed.
+
+    Returns:
+        mask of the ratings to keep
+    """
+    nb_customers = customers.max() + 1 if len(customers) else 0
+    nb_products = products.max() + 1 if len(products) else 0
+    while True:
+        customer_counts = np.bincount(customers[mask], minlength=nb_customers)
+        product_counts = np.bincount(products[mask], minlength=nb_products)
+        keep = mask \
+            & (customer_counts[customers] >= min_customer_ratings) \
+            & (product_counts[products] >= min_product_ratings)
+        if keep.sum() == mask.sum():
+            return keep
+        mask = keep
+
+
+def write_csv(fs, s3_url, df, chunksize=CHUNKSIZE):
+    """Writes the dataframe as delimited file chunk by chunk"""
+    with fs.open(s3_url, "w") as f:
+        for start in range(0, max(len(df), 1), chunksize):
+            df.iloc[start:start + chunksize].to_csv(
+                f, sep=str(','), index=False, header=start == 0)
+
+
 def preprocess(s3_in_url,
                s3_out_bucket,
                s3_out_prefix,
-               delimiter=","):
+               delimiter=",",
+               min_customer_ratings=5,
+               min_product_ratings=10,
+               chunksize=CHUNKSIZE,
+               random_state=None):
     """Preprocesses data based on business logic
 
-    - Reads delimited file passed as s3_url and preprocess data by filtering
-    long tail in the customer ratings data i.e. keep customers who have rated 5
-    or more videos, and videos that have been rated by 9+ customers
+    - Reads delimited file passed as s3_url chunk by chunk and preprocess data
+    by filtering long tail in the customer ratings data i.e. keep customers who
+    have rated 5 or more videos, and videos that have been rated by 10+
+    customers. The thresholds are applied until every remaining customer and
+    video meets them.
     - Preprocessed data is then written to output
 
     Args:
@@ -27,6 +132,14 @@ def preprocess(s3_in_url,
         delimiter:
           delimiter to be used for parsing the file. Defaults to "," if none
           provided
+        min_customer_ratings:
+          minimum number of videos a customer has rated
+        min_product_ratings:
+          minimum number of customers that have rated a video
+        chunksize:
+          number of rows read and written at a time
+        random_state:
+          seed used to shuffle the data before splitting it
 
     Returns:
         status of preprocessed data
@@ -36,63 +149,46 @@ def preprocess(s3_in_url,
     """
     try:
         print("preprocessing data from {}".format(s3_in_url))
-        # read s3 url into pandas dataframe
+        # read s3 url chunk by chunk, keeping customer_id, product_id, and
+        # star_rating as integer codes
         # pandas internally uses s3fs to read s3 file directory
-        df = pd.read_csv(s3_in_url, delimiter, error_bad_lines=False)
+        customers, products, ratings = read_ratings(
+            s3_in_url, delimiter, chunksize)
+        print("# of rows before the long tail = {:10d}".format(len(ratings)))
 
-        # limit dataframe to customer_id, product_id, and star_rating
-        # `product_title` will be useful validating recommendations
-        df = df[['customer_id', 'product_id', 'star_rating', 'product_title']]
+        mask = drop_duplicate_ratings(customers, products)
+        print("# of rows after removing duplicates = {:10d}".format(
+            mask.sum()))
 
         # clean out the long tail because most people haven't seen most videos,
         # and people rate fewer videos than they actually watch
-        customers = df['customer_id'].value_counts()
-        products = df['product_id'].value_counts()
-
         # based on data exploration only about 5% of customers have rated 5 or
         # more videos, and only 25% of videos have been rated by 9+ customers
-        customers = customers[customers >= 5]
-        products = products[products >= 10]
-        print("# of rows before the long tail = {:10d}".format(df.shape[0]))
-        reduced_df = df \
-            .merge(pd.DataFrame({'customer_id': customers.index})) \
-            .merge(pd.DataFrame({'product_id': products.index}))
-        print("# of rows after the long tail = {:10d}".format(
-            reduced_df.shape[0]))
-        reduced_df = reduced_df.drop_duplicates(['customer_id', 'product_id'])
-        print("# of rows after removing duplicates = {:10d}".format(
-            reduced_df.shape[0]))
-
-        # recreate customer and product lists since there are customers with
-        # more than 5 reviews, but all of their reviews are on products with
-        # less than 5 reviews (and vice versa)
-        customers = reduced_df['customer_id'].value_counts()
-        products = reduced_df['product_id'].value_counts()
+        mask = filter_long_tail(customers, products, mask,
+                                min_customer_ratings, min_product_ratings)
+        print("# of rows after the long tail = {:10d}".format(mask.sum()))
 
         # sequentially index each user and item to hold the sparse format where
         # the indices indicate the row and column in our ratings matrix
-        customer_index = pd.DataFrame({
-            'customer_id': customers.index,
-            'customer': np.arange(customers.shape[0])})
-        product_index = pd.DataFrame({
-            'product_id': products.index,
-            'product': np.arange(products.shape[0])})
-        reduced_df = reduced_df \
-            .merge(customer_index) \
-            .merge(product_index)
-
-        nb_customer = reduced_df['customer'].max() + 1
-        nb_products = reduced_df['product'].max() + 1
+        customer, customer_ids = pd.factorize(customers[mask])
+        product, product_ids = pd.factorize(products[mask])
+        product_df = pd.DataFrame({'customer': customer,
+                                   'product': product,
+                                   'star_rating': ratings[mask]})
+
+        nb_customer = len(customer_ids)
+        nb_products = len(product_ids)
         feature_dim = nb_customer + nb_products
         print(nb_customer, nb_products, feature_dim)
 
-        product_df = reduced_df[['customer', 'product', 'star_rating']]
-
         # split into train, validation and test data sets
-        train_df, validate_df, test_df = np.split(
-            product_df.sample(frac=1),
-            [int(.6*len(product_df)), int(.8*len(product_df))]
-        )
+        order = np.random.RandomState(random_state).permutation(
+            len(product_df))
+        train_idx, validate_idx, test_idx = np.split(
+            order, [int(.6*len(product_df)), int(.8*len(product_df))])
+        train_df = product_df.iloc[train_idx]
+        validate_df = product_df.iloc[validate_idx]
+        test_df = product_df.iloc[test_idx]
 
         print("# of rows train data set = {:10d}".format(
             train_df.shape[0]))
@@ -101,14 +197,6 @@ def preprocess(s3_in_url,
         print("# of rows test data set = {:10d}".format(
             test_df.shape[0]))
 
-        # select columns required for training the model
-        # excluding columns "customer_id", "product_id", "product_title" to
-        # keep files small
-        cols = ["customer", "product", "star_rating"]
-        train_df = train_df[cols]
-        validate_df = validate_df[cols]
-        test_df = test_df[cols]
-
         # write output to s3 as delimited file
         fs = s3fs.S3FileSystem(anon=False)
         s3_out_prefix = s3_out_prefix[:-1] \
@@ -116,20 +204,17 @@ def preprocess(s3_in_url,
         s3_out_train = "s3://{}/{}/{}".format(
             s3_out_bucket, s3_out_prefix, "train/train.csv")
         print("writing training data to {}".format(s3_out_train))
-        with fs.open(s3_out_train, "w") as f:
-            train_df.to_csv(f, sep=str(','), index=False)
+        write_csv(fs, s3_out_train, train_df, chunksize)
 
         s3_out_validate = "s3://{}/{}/{}".format(
             s3_out_bucket, s3_out_prefix, "validate/validate.csv")
         print("writing test data to {}".format(s3_out_validate))
-        with fs.open(s3_out_validate, "w") as f:
-            validate_df.to_csv(f, sep=str(','), index=False)
+        write_csv(fs, s3_out_validate, validate_df, chunksize)
 
         s3_out_test = "s3://{}/{}/{}".format(
             s3_out_bucket, s3_out_prefix, "test/test.csv")
         print("writing test data to {}".format(s3_out_test))
-        with fs.open(s3_out_test, "w") as f:
-            test_df.to_csv(f, sep=str(','), index=False)
+        write_csv(fs, s3_out_test, test_df, chunksize)
 
         print("preprocessing completed")
         return "SUCCESS"